@@ -0,0 +1,90 @@
+"""
+Benchmark of the blob storage upload/download paths against Azurite.
+
+Start the emulator first (`npx azurite-blob`), then from the backend directory:
+
+    python benchmarks/bench_blob.py --scale 10
+
+Uploads the checked-in crawl (optionally replicated `--scale` times) in
+"pages" mode at several concurrency levels and in "bundle" mode, downloads
+each back through `get_scraped_content`, and prints the timings as JSON.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("AZURE_STORAGE_CONNECTION_STRING", "UseDevelopmentStorage=true")
+
+import scraper  # noqa: E402
+from scraper import ScrapedPage  # noqa: E402
+from page_store import iter_pages, latest_crawl  # noqa: E402
+from azure.storage.blob import BlobServiceClient  # noqa: E402
+
+
+def load_pages(scale: int) -> list:
+    """Checked-in crawl, replicated `scale` times with distinct URLs."""
+    base = list(iter_pages(latest_crawl(BACKEND_DIR / "Scraped")))
+    pages = []
+    for copy in range(scale):
+        for page in base:
+            pages.append(ScrapedPage(
+                url=f"{page['url']}#copy{copy}",
+                title=page.get("title", ""),
+                content=page.get("content", ""),
+                links=page.get("links", []),
+                images=page.get("images", []),
+                metadata=page.get("metadata", {})
+            ))
+    return pages
+
+
+def run_case(pages: list, mode: str, concurrency: int) -> dict:
+    """Uploads and downloads one crawl into a fresh container."""
+    scraper.CONTAINER_NAME = f"bench-{mode}-{concurrency}-{int(time.time() * 1000)}"
+    service = BlobServiceClient.from_connection_string(scraper.STORAGE_CONNECTION_STRING)
+    try:
+        started = time.perf_counter()
+        result = scraper.run_blocking(scraper.upload_to_blob(pages, mode, concurrency))
+        upload_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        downloaded = scraper.get_scraped_content()
+        download_seconds = time.perf_counter() - started
+
+        return {
+            "mode": mode,
+            "concurrency": concurrency,
+            "pages": len(pages),
+            "blobs": result["blobs"],
+            "uploadSeconds": round(upload_seconds, 4),
+            "downloadSeconds": round(download_seconds, 4),
+            "roundTripOk": len(downloaded) == len(pages)
+        }
+    finally:
+        service.delete_container(scraper.CONTAINER_NAME)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the checked-in crawl N times")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--output", type=Path, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    pages = load_pages(args.scale)
+    results = [run_case(pages, "pages", c) for c in args.concurrency]
+    results.append(run_case(pages, "bundle", 1))
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark of the GraphRAG knowledge graph: build/load time and traversal cost per query.
+
+From the backend directory:
+
+    python benchmarks/bench_graph.py --scale 10
+
+Builds the page/entity graph over the checked-in crawl (optionally replicated
+`--scale` times, links rewritten so every copy is its own subgraph), then
+times `KnowledgeGraph.expand` for a set of queries at each hop depth and
+prints the timings as JSON.
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from page_store import iter_pages, latest_crawl  # noqa: E402
+from knowledge_store import CorpusSnapshot  # noqa: E402
+from knowledge_graph import KnowledgeGraph  # noqa: E402
+
+QUERIES = [
+    "kitkat chocolate",
+    "hot chocolate recipe",
+    "coffee mate creamer flavours",
+    "ice cream drumstick",
+    "boost nutrition drink for kids",
+    "easter treats smarties",
+    "gluten free baking",
+    "nescafe coffee",
+]
+
+
+def load_items(scale: int) -> list:
+    """Checked-in crawl, replicated `scale` times with distinct URLs and links."""
+    base = list(iter_pages(latest_crawl(BACKEND_DIR / "Scraped")))
+    items = []
+    for copy in range(scale):
+        suffix = f"-copy{copy}" if copy else ""
+        for page in base:
+            items.append({
+                **page,
+                "url": page["url"].rstrip("/") + suffix,
+                "links": [link.rstrip("/") + suffix for link in page.get("links", [])]
+            })
+    return items
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the checked-in crawl N times")
+    parser.add_argument("--hops", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per query and hop depth")
+    parser.add_argument("--output", type=Path, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    items = load_items(args.scale)
+    snapshot = CorpusSnapshot(items)
+
+    started = time.perf_counter()
+    graph = KnowledgeGraph.build(items)
+    build_seconds = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / "knowledge_graph.json"
+        graph.save(cache_path, "bench")
+        started = time.perf_counter()
+        KnowledgeGraph.load(cache_path, "bench")
+        load_seconds = time.perf_counter() - started
+
+    seeds = {
+        query: list(dict.fromkeys(snapshot.passages[i]["page"] for i, _ in snapshot.bm25.top_k(query, 5)))
+        for query in QUERIES
+    }
+
+    traversal = []
+    for hops in args.hops:
+        timings, reached = [], []
+        for query in QUERIES:
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                expanded = graph.expand(seeds[query], max_hops=hops)
+                timings.append((time.perf_counter() - started) * 1000)
+            reached.append(len(expanded))
+        traversal.append({
+            "hops": hops,
+            "meanMs": round(statistics.mean(timings), 4),
+            "p95Ms": round(percentile(timings, 0.95), 4),
+            "meanPagesReached": round(statistics.mean(reached), 1)
+        })
+
+    results = {
+        "pages": len(items),
+        "nodes": len(graph.adjacency),
+        "edges": sum(len(neighbors) for neighbors in graph.adjacency.values()),
+        "buildSeconds": round(build_seconds, 4),
+        "loadSeconds": round(load_seconds, 4),
+        "traversal": traversal
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
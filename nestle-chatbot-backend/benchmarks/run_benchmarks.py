@@ -0,0 +1,298 @@
+"""
+Microbenchmark suite for the retrieval, parsing and indexing hot paths.
+
+From the backend directory:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scales 1 10 --compare benchmarks/results/<commit>.json
+
+Runs every case against the checked-in crawl and synthetic corpora made by
+replicating it `--scales` times, with no network access: embeddings come
+from a deterministic stub backend and chat history goes to a throwaway SQLite
+file. Cases:
+
+- find_relevant_facts: BM25 seeds plus graph expansion, per query
+- corpus_snapshot: building the passage index and knowledge graph
+- extract_page: BeautifulSoup extraction and keyword counting of the scraper,
+  over HTML rendered back from the scraped pages
+- prepare_search_documents: chunking and document assembly for indexing
+- history_save / history_load: MessageHistory appends + flush, and reloads
+
+Results are written as JSON to benchmarks/results/<commit>.json (or
+`--output`). `--compare` prints the change of every median against an
+earlier results file and exits non-zero when one regressed by more than
+`--threshold`.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import logging
+import shutil
+import platform
+import argparse
+import statistics
+import subprocess
+import tempfile
+from html import escape
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Keep the suite offline and away from the live caches: set before the services are imported
+_SCRATCH_DIR = Path(tempfile.mkdtemp(prefix="nestle-bench-"))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ["EMBEDDING_BACKEND"] = "azure"
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+os.environ["HISTORY_DB_PATH"] = str(_SCRATCH_DIR / "chat_history.sqlite3")
+
+import openai_service  # noqa: E402
+from embedding_backends import EmbeddingBackend  # noqa: E402
+from page_store import iter_pages, latest_crawl  # noqa: E402
+from knowledge_store import CorpusSnapshot  # noqa: E402
+from graphRAG import find_relevant_facts  # noqa: E402
+from scraper import extract_page  # noqa: E402
+from indexer_service import prepare_search_documents  # noqa: E402
+from history_store import HistoryStore  # noqa: E402
+from openai_service import MessageHistory  # noqa: E402
+
+QUERIES = [
+    "kitkat chocolate",
+    "hot chocolate recipe",
+    "coffee mate creamer flavours",
+    "ice cream drumstick",
+    "boost nutrition drink for kids",
+    "easter treats smarties",
+    "gluten free baking",
+    "nescafe coffee",
+]
+
+# Chat history workload per scale unit
+HISTORY_SESSIONS = 20
+HISTORY_TURNS = 10
+
+
+class StubEmbeddingBackend(EmbeddingBackend):
+    """Deterministic, network-free embeddings; small vectors so the stub itself costs next to nothing."""
+
+    name = "benchmark-stub"
+    dimensions = 8
+    max_concurrency = 4
+
+    def embed_batch(self, texts):
+        return [[(zlib.crc32(text.encode(), seed) & 0xFF) / 255.0 for seed in range(self.dimensions)] for text in texts]
+
+
+def load_items(scale: int) -> list:
+    """Checked-in crawl, replicated `scale` times with distinct URLs and links."""
+    base = list(iter_pages(latest_crawl(BACKEND_DIR / "Scraped")))
+    items = []
+    for copy in range(scale):
+        suffix = f"-copy{copy}" if copy else ""
+        for page in base:
+            items.append({
+                **page,
+                "url": page["url"].rstrip("/") + suffix,
+                "links": [link.rstrip("/") + suffix for link in page.get("links", [])]
+            })
+    return items
+
+
+def render_html(item: dict) -> str:
+    """Rebuilds a rendered page from a scraped item: head metadata, script noise, paragraphs, links and images."""
+    metadata = item.get("metadata", {})
+    sentences = [s for s in item.get("content", "").split(". ") if s]
+    paragraphs = "\n".join(f"<p>{escape(s)}.</p>" for s in sentences)
+    links = "\n".join(f'<li><a href="{escape(link)}">{escape(link)}</a></li>' for link in item.get("links", []))
+    images = "\n".join(f'<img src="{escape(src)}" alt="">' for src in item.get("images", []))
+    return (
+        "<html><head>"
+        f"<title>{escape(item.get('title', ''))}</title>"
+        f'<meta name="description" content="{escape(metadata.get("description", ""))}">'
+        f'<meta name="keywords" content="{escape(",".join(metadata.get("keywords", [])))}">'
+        "<style>body { font-family: sans-serif; }</style>"
+        "</head><body>"
+        "<script>window.dataLayer = window.dataLayer || [];</script>"
+        f"<nav><ul>{links}</ul></nav>"
+        f"<main><h1>{escape(item.get('title', ''))}</h1>{paragraphs}{images}</main>"
+        "</body></html>"
+    )
+
+
+def summarize(timings: list, items: int) -> dict:
+    """Timing statistics in milliseconds, plus throughput in items per second."""
+    ordered = sorted(timings)
+    median = statistics.median(ordered)
+    return {
+        "runs": len(ordered),
+        "items": items,
+        "meanMs": round(statistics.mean(ordered) * 1000, 4),
+        "medianMs": round(median * 1000, 4),
+        "minMs": round(ordered[0] * 1000, 4),
+        "p95Ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 4),
+        "itemsPerSecond": round(items / median, 1) if median > 0 else None
+    }
+
+
+def timed(fn, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_find_relevant_facts(items: list, repeat: int) -> dict:
+    snapshot = CorpusSnapshot(items)
+    timings = []
+    for query in QUERIES:
+        timings.extend(timed(lambda: find_relevant_facts(query, snapshot), repeat))
+    return summarize(timings, 1)
+
+
+def bench_corpus_snapshot(items: list, repeat: int) -> dict:
+    return summarize(timed(lambda: CorpusSnapshot(items), repeat), len(items))
+
+
+def bench_extract_page(items: list, repeat: int) -> dict:
+    documents = [(item["url"], render_html(item)) for item in items]
+    return summarize(timed(lambda: [extract_page(url, html) for url, html in documents], repeat), len(documents))
+
+
+def bench_prepare_search_documents(items: list, repeat: int) -> dict:
+    return summarize(timed(lambda: prepare_search_documents(items), repeat), len(items))
+
+
+def bench_history(scale: int, repeat: int) -> dict:
+    sessions = [f"bench-{i}" for i in range(HISTORY_SESSIONS * scale)]
+    messages = len(sessions) * HISTORY_TURNS * 2
+    save_timings, load_timings = [], []
+
+    for run in range(repeat):
+        # Fresh database per run, flushed on demand only (no background flusher interference)
+        store = HistoryStore(_SCRATCH_DIR / f"history-{scale}-{run}.sqlite3", flush_interval=3600)
+        try:
+            started = time.perf_counter()
+            for session_id in sessions:
+                history = MessageHistory(max_messages=openai_service.HISTORY_MAX_MESSAGES, session_id=session_id, store=store)
+                for turn in range(HISTORY_TURNS):
+                    history.add_message("user", f"Question {turn} about {QUERIES[turn % len(QUERIES)]}?")
+                    history.add_message("assistant", f"Answer {turn}: " + "Nestlé product details. " * 20)
+            store.flush()
+            save_timings.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for session_id in sessions:
+                history = MessageHistory(max_messages=openai_service.HISTORY_MAX_MESSAGES, session_id=session_id, store=store)
+                history.load_history()
+            load_timings.append(time.perf_counter() - started)
+        finally:
+            store.close()
+
+    return {
+        "history_save": summarize(save_timings, messages),
+        "history_load": summarize(load_timings, len(sessions))
+    }
+
+
+def run_suite(scales: list, repeat: int, cases: set) -> dict:
+    results = {}
+    for scale in scales:
+        items = load_items(scale)
+        # Large corpora take seconds per pass; fewer runs keep the suite practical
+        runs = max(1, repeat // scale) if scale > 1 else repeat
+        scale_results = {"pages": len(items)}
+        if "find_relevant_facts" in cases:
+            scale_results["find_relevant_facts"] = bench_find_relevant_facts(items, repeat)
+        if "corpus_snapshot" in cases:
+            scale_results["corpus_snapshot"] = bench_corpus_snapshot(items, runs)
+        if "extract_page" in cases:
+            scale_results["extract_page"] = bench_extract_page(items, runs)
+        if "prepare_search_documents" in cases:
+            scale_results["prepare_search_documents"] = bench_prepare_search_documents(items, runs)
+        if "history" in cases:
+            scale_results.update(bench_history(scale, runs))
+        results[f"{scale}x"] = scale_results
+        print(f"✅ Finished {scale}x ({len(items)} pages)", file=sys.stderr)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """Prints the median change of every case against a baseline; returns True when any regressed."""
+    regressed = False
+    for scale, cases in results["results"].items():
+        for case, stats in cases.items():
+            before = baseline.get("results", {}).get(scale, {}).get(case)
+            if not isinstance(stats, dict) or not isinstance(before, dict) or not before.get("medianMs"):
+                continue
+            change = stats["medianMs"] / before["medianMs"] - 1.0
+            marker = "❌" if change > threshold else "✅"
+            regressed |= change > threshold
+            print(f"{marker} {scale:>5} {case:<26} {before['medianMs']:>11.3f} -> {stats['medianMs']:>11.3f} ms "
+                  f"({change:+.1%})")
+    return regressed
+
+
+CASES = ("find_relevant_facts", "corpus_snapshot", "extract_page", "prepare_search_documents", "history")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="Corpus replication factors")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case at 1x (fewer at larger scales)")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare medians against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Median slowdown counted as a regression")
+    args = parser.parse_args()
+
+    # Per-call info logs would dominate the cheaper cases
+    logging.disable(logging.INFO)
+
+    # Embedding calls hit the stub instead of Azure OpenAI
+    openai_service.embedding_backend = StubEmbeddingBackend()
+    openai_service.embedding_cache = None
+
+    try:
+        commit = git_commit()
+        results = {
+            "commit": commit,
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "results": run_suite(args.scales, args.repeat, set(args.cases))
+        }
+    finally:
+        openai_service.history_store.close()
+        shutil.rmtree(_SCRATCH_DIR, ignore_errors=True)
+
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"💾 Results saved to {output}", file=sys.stderr)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        print(f"\nMedian change vs {baseline.get('commit', args.compare)}:")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Inverted index with Okapi BM25 ranking.
+
+Postings (term -> [(doc id, term frequency)]) are built once from the corpus
+and folded into a sparse doc-term matrix of precomputed BM25 weights, so a
+query is scored for every document with a single sparse column sum.
+"""
+
+import re
+from collections import Counter
+from typing import List, Dict, Tuple
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Common English words that carry no ranking signal
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i in is it its me my
+of on or our so than that the their them there these they this to was we what
+when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases and splits text into word tokens, dropping stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    BM25 index over a fixed list of documents.
+
+    Args:
+        documents (List[str]): Raw document texts; position is the doc id.
+        k1 (float): Term-frequency saturation parameter.
+        b (float): Document-length normalization parameter.
+    """
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        doc_lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc_id, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            doc_lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                if term not in self.vocabulary:
+                    self.vocabulary[term] = len(self.vocabulary)
+                    self.postings[term] = []
+                self.postings[term].append((doc_id, tf))
+
+        self.doc_count = len(documents)
+        self.avg_doc_length = float(doc_lengths.mean()) if self.doc_count else 0.0
+        self.matrix = self._build_matrix(doc_lengths)
+
+    def _build_matrix(self, doc_lengths: np.ndarray) -> sparse.csc_matrix:
+        """Builds the (docs x terms) matrix of BM25 term weights."""
+        rows, cols, tfs, idfs = [], [], [], []
+        for term, postings in self.postings.items():
+            term_id = self.vocabulary[term]
+            df = len(postings)
+            idf = np.log(1.0 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings:
+                rows.append(doc_id)
+                cols.append(term_id)
+                tfs.append(tf)
+                idfs.append(idf)
+
+        if not rows:
+            return sparse.csc_matrix((self.doc_count, 0), dtype=np.float32)
+
+        rows = np.asarray(rows)
+        tfs = np.asarray(tfs, dtype=np.float32)
+        norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[rows] / self.avg_doc_length)
+        weights = np.asarray(idfs, dtype=np.float32) * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        return sparse.csc_matrix(
+            (weights, (rows, np.asarray(cols))),
+            shape=(self.doc_count, len(self.vocabulary)),
+            dtype=np.float32
+        )
+
+    def score(self, query: str) -> np.ndarray:
+        """Returns the BM25 score of every document for the query."""
+        term_ids = [self.vocabulary[t] for t in set(tokenize(query)) if t in self.vocabulary]
+        if not term_ids:
+            return np.zeros(self.doc_count, dtype=np.float32)
+        return np.asarray(self.matrix[:, term_ids].sum(axis=1)).ravel()
+
+    def top_k(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Returns the k best-scoring documents for the query.
+
+        Returns:
+            List[Tuple[int, float]]: (doc id, score) pairs with a positive score, best first.
+        """
+        return self.rank(self.score(query), k)
+
+    def rank(self, scores: np.ndarray, k: int = 5) -> List[Tuple[int, float]]:
+        """`top_k` over scores already computed with `score`, for callers that also need every score."""
+        if k <= 0 or not scores.any():
+            return []
+
+        k = min(k, self.doc_count)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [(int(i), float(scores[i])) for i in ranked if scores[i] > 0]
@@ -0,0 +1,95 @@
+"""
+Token-aware chunking of scraped pages.
+
+Page content is split into overlapping windows of at most CHUNK_TOKENS
+tokens. Each chunk keeps the character offsets of its span in the page
+content, so a retrieved passage can always be traced back to its parent page.
+Token boundaries come from tiktoken (the encoding of the embedding model)
+when it is installed, otherwise from a word/punctuation approximation.
+"""
+
+import os
+import re
+from typing import List, Dict, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+try:
+    import tiktoken
+except ImportError:  # Optional: exact token boundaries for OpenAI models
+    tiktoken = None
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+CHUNK_ENCODING = os.getenv("CHUNK_ENCODING", "cl100k_base")  # Encoding used by text-embedding-ada-002
+
+# Fallback tokenizer: words and individual punctuation marks
+TOKEN_SPAN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        _encoding = tiktoken.get_encoding(CHUNK_ENCODING)
+    return _encoding
+
+
+def token_spans(text: str) -> List[Tuple[int, int]]:
+    """Returns the (start, end) character span of every token in `text`."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return [match.span() for match in TOKEN_SPAN_PATTERN.finditer(text)]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    _, starts = encoding.decode_with_offsets(tokens)
+    ends = starts[1:] + [len(text)]
+    return [(start, end) for start, end in zip(starts, ends) if end > start]
+
+
+def chunk_text(text: str, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Dict]:
+    """
+    Splits text into overlapping token windows.
+
+    Args:
+        text (str): Text to split.
+        chunk_tokens (int): Maximum tokens per chunk.
+        overlap_tokens (int): Tokens shared by consecutive chunks.
+
+    Returns:
+        List[Dict]: Chunks with `text`, `start` and `end` character offsets and `tokens` count.
+    """
+    spans = token_spans(text or "")
+    if not spans:
+        return []
+
+    chunk_tokens = max(1, chunk_tokens)
+    step = max(1, chunk_tokens - max(0, overlap_tokens))
+    chunks = []
+    for first in range(0, len(spans), step):
+        window = spans[first:first + chunk_tokens]
+        start, end = window[0][0], window[-1][1]
+        chunks.append({"text": text[start:end], "start": start, "end": end, "tokens": len(window)})
+        if first + chunk_tokens >= len(spans):
+            break
+    return chunks
+
+
+def chunk_page(page: Dict, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Dict]:
+    """
+    Chunks a scraped page's content. Pages without content yield a single
+    chunk holding the description, so every page stays retrievable.
+
+    Returns:
+        List[Dict]: Chunks as returned by `chunk_text`, plus their `index` within the page.
+    """
+    chunks = chunk_text(page.get("content", ""), chunk_tokens, overlap_tokens)
+    if not chunks:
+        fallback = page.get("metadata", {}).get("description", "") or page.get("title", "")
+        chunks = [{"text": fallback, "start": 0, "end": 0, "tokens": len(token_spans(fallback))}]
+    for index, chunk in enumerate(chunks):
+        chunk["index"] = index
+    return chunks
@@ -0,0 +1,238 @@
+"""
+Ingest-time cleaning of scraped pages: boilerplate stripping and
+near-duplicate detection.
+
+Every page of the site carries the same navigation menu, footer and cookie
+banner text, and several brand landing pages are near-identical. Left in,
+they are embedded once per page and crowd real content out of prompts.
+
+- Boilerplate: page text is cut into overlapping word shingles; shingles
+  found on at least BOILERPLATE_MIN_SHARE of the pages (and at least
+  BOILERPLATE_MIN_PAGES pages) are site furniture, and every run of words
+  they cover is removed.
+- Near-duplicates: each stripped page gets a MinHash signature; candidate
+  pairs come from LSH banding and a page whose estimated Jaccard similarity
+  to an earlier kept page reaches DEDUP_THRESHOLD is dropped, its URL
+  recorded on the kept page as `metadata["duplicate_urls"]`.
+
+The model is fitted on the whole corpus, so the indexer and the knowledge
+store, fitting on the same crawl, produce identical cleaned pages and chunk
+offsets.
+"""
+
+import os
+import re
+import zlib
+import logging
+from collections import Counter, defaultdict
+from typing import List, Dict, Tuple, Optional, Callable, Iterable
+
+import numpy as np
+from dotenv import load_dotenv
+
+from chunker import token_spans
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONTENT_CLEANING_ENABLED = os.getenv("CONTENT_CLEANING_ENABLED", "true").lower() == "true"
+
+# Boilerplate detection
+BOILERPLATE_SHINGLE_WORDS = int(os.getenv("BOILERPLATE_SHINGLE_WORDS", "8"))
+BOILERPLATE_MIN_SHARE = float(os.getenv("BOILERPLATE_MIN_SHARE", "0.3"))  # Share of pages a shingle must appear on
+BOILERPLATE_MIN_PAGES = int(os.getenv("BOILERPLATE_MIN_PAGES", "3"))
+
+# Near-duplicate detection (MinHash + LSH)
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))  # Estimated Jaccard similarity of word shingles
+DEDUP_SHINGLE_WORDS = int(os.getenv("DEDUP_SHINGLE_WORDS", "5"))
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16  # 16 bands x 4 rows: pairs above ~0.5 similarity become candidates
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_random = np.random.RandomState(20250529)
+# Multipliers stay below 2**31 so (a * crc32 + b) never overflows 64 bits
+_PERMUTATION_A = _random.randint(1, 1 << 31, size=MINHASH_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+_PERMUTATION_B = _random.randint(0, 1 << 60, size=MINHASH_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+WORD_PATTERN = re.compile(r"\S+")
+
+
+def _words(text: str) -> List[re.Match]:
+    return list(WORD_PATTERN.finditer(text or ""))
+
+
+def _boilerplate_shingles(words: List[str], size: int = BOILERPLATE_SHINGLE_WORDS) -> List[int]:
+    """
+    Hash of every `size`-word window, by starting word. CRC32 rather than the
+    builtin (per-process salted) hash, so fitted shingle sets are comparable
+    across processes and can be persisted.
+    """
+    lowered = [w.lower() for w in words]
+    return [zlib.crc32(" ".join(lowered[i:i + size]).encode("utf-8")) for i in range(len(lowered) - size + 1)]
+
+
+def minhash_signature(text: str, shingle_words: int = DEDUP_SHINGLE_WORDS) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a text's word shingles.
+
+    Returns:
+        np.ndarray: MINHASH_PERMUTATIONS minimum hash values, or None for texts too short to shingle.
+    """
+    words = (text or "").lower().split()
+    if len(words) < shingle_words:
+        return None
+    shingles = {" ".join(words[i:i + shingle_words]) for i in range(len(words) - shingle_words + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = (np.outer(hashes, _PERMUTATION_A) + _PERMUTATION_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def estimated_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.mean(a == b))
+
+
+class CorpusCleaner:
+    """
+    Boilerplate model and near-duplicate map of one corpus.
+
+    Build it with `fit`, then pass every page through `clean`; `report`
+    summarizes what was removed.
+
+    Args:
+        boilerplate (set): Shingle hashes considered boilerplate.
+        duplicates (Dict[str, Tuple[str, float]]): Duplicate URL -> (kept URL, similarity).
+    """
+
+    def __init__(self, boilerplate: set, duplicates: Dict[str, Tuple[str, float]]):
+        self.boilerplate = boilerplate
+        self.duplicates = duplicates
+        self.aliases: Dict[str, List[str]] = defaultdict(list)
+        for url, (kept, _) in duplicates.items():
+            self.aliases[kept].append(url)
+        self.stats = Counter()
+
+    @classmethod
+    def fit(cls, pages: Callable[[], Iterable[Dict]]) -> "CorpusCleaner":
+        """
+        Learns the boilerplate shingles and near-duplicate pages of a corpus.
+
+        Args:
+            pages (Callable): Returns a fresh iterable of page dicts; it is read
+                twice (shingle counts, then signatures of the stripped pages), so
+                large corpora can be streamed.
+        """
+        page_count = 0
+        document_frequency = Counter()
+        for page in pages():
+            page_count += 1
+            words = [m.group() for m in _words(page.get("content", ""))]
+            document_frequency.update(set(_boilerplate_shingles(words)))
+
+        min_pages = max(BOILERPLATE_MIN_PAGES, BOILERPLATE_MIN_SHARE * page_count)
+        boilerplate = {shingle for shingle, count in document_frequency.items() if count >= min_pages}
+        cleaner = cls(boilerplate, {})
+
+        # Signatures of the stripped pages; each page is compared with earlier kept pages sharing an LSH band
+        rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+        buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        kept: List[Tuple[str, np.ndarray]] = []
+        duplicates = {}
+        for page in pages():
+            url = page.get("url", "")
+            signature = minhash_signature(cleaner.strip(page.get("content", "")))
+            if signature is None or url in duplicates:
+                continue
+            keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(MINHASH_BANDS)]
+
+            match = None
+            for position in dict.fromkeys(p for key in keys for p in buckets.get(key, [])):
+                similarity = estimated_similarity(signature, kept[position][1])
+                if similarity >= DEDUP_THRESHOLD:
+                    match = (kept[position][0], similarity)
+                    break
+            if match is not None:
+                duplicates[url] = match
+                continue
+
+            for key in keys:
+                buckets[key].append(len(kept))
+            kept.append((url, signature))
+
+        return cls(boilerplate, duplicates)
+
+    def strip(self, text: str) -> str:
+        """Removes every run of words covered by boilerplate shingles."""
+        matches = _words(text)
+        if not self.boilerplate or len(matches) < BOILERPLATE_SHINGLE_WORDS:
+            return text or ""
+
+        covered = bytearray(len(matches))
+        for start, shingle in enumerate(_boilerplate_shingles([m.group() for m in matches])):
+            if shingle in self.boilerplate:
+                covered[start:start + BOILERPLATE_SHINGLE_WORDS] = b"\x01" * BOILERPLATE_SHINGLE_WORDS
+
+        # Keep the original text of every uncovered run of words
+        segments, run_start = [], None
+        for i, match in enumerate(matches):
+            if not covered[i] and run_start is None:
+                run_start = match.start()
+            elif covered[i] and run_start is not None:
+                segments.append(text[run_start:matches[i - 1].end()])
+                run_start = None
+        if run_start is not None:
+            segments.append(text[run_start:matches[-1].end()])
+        return " ".join(segments)
+
+    def clean(self, page: Dict) -> Optional[Dict]:
+        """
+        Returns the page with boilerplate stripped, or None when it is a near-duplicate of a kept page.
+        """
+        content = page.get("content", "") or ""
+        tokens_before = len(token_spans(content))
+        self.stats["pages"] += 1
+        self.stats["bytes_before"] += len(content.encode("utf-8"))
+        self.stats["tokens_before"] += tokens_before
+
+        url = page.get("url", "")
+        if url in self.duplicates:
+            return None
+
+        cleaned = self.strip(content)
+        self.stats["bytes_after"] += len(cleaned.encode("utf-8"))
+        self.stats["tokens_after"] += len(token_spans(cleaned)) if cleaned != content else tokens_before
+
+        page = {**page, "content": cleaned}
+        if url in self.aliases:
+            page["metadata"] = {**page.get("metadata", {}), "duplicate_urls": list(self.aliases[url])}
+        return page
+
+    def report(self) -> Dict:
+        """Pages seen by `clean` so far, the bytes and tokens removed, and the corpus's near-duplicates."""
+        return {
+            "pages": self.stats["pages"],
+            "duplicates_dropped": len(self.duplicates),
+            "boilerplate_shingles": len(self.boilerplate),
+            "bytes_saved": self.stats["bytes_before"] - self.stats["bytes_after"],
+            "tokens_saved": self.stats["tokens_before"] - self.stats["tokens_after"],
+            "duplicates": {url: kept for url, (kept, _) in self.duplicates.items()}
+        }
+
+
+def clean_pages(pages: List[Dict]) -> Tuple[List[Dict], Dict]:
+    """
+    Strips boilerplate from an in-memory corpus and drops its near-duplicate pages.
+
+    Returns:
+        Tuple[List[Dict], Dict]: The kept pages, in order, and the cleaning report.
+    """
+    cleaner = CorpusCleaner.fit(lambda: pages)
+    cleaned = [page for page in map(cleaner.clean, pages) if page is not None]
+    report = cleaner.report()
+    logger.info(
+        f"🧹 Cleaned {report['pages']} pages: {report['duplicates_dropped']} near-duplicates dropped, "
+        f"{report['bytes_saved']} bytes / {report['tokens_saved']} tokens of boilerplate removed"
+    )
+    return cleaned, report
@@ -0,0 +1,121 @@
+"""
+Pluggable embedding backends.
+
+`openai_service` embeds through whichever backend EMBEDDING_BACKEND selects:
+
+- "azure": Azure OpenAI embeddings deployment (network call per batch)
+- "local": sentence-transformers model run on the CPU, fully offline once
+  the model files are available locally
+
+Every backend exposes the same small interface, so indexing, query embedding
+and the caches do not care where vectors come from. Vectors from different
+backends live in different spaces: switching backends requires a full
+re-index (`POST /index?full=true`).
+"""
+
+import os
+import abc
+import time
+import logging
+import threading
+from typing import List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "azure").lower()  # "azure" or "local"
+
+# Local sentence-transformers backend tuning
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))  # 0 keeps torch's default
+
+
+class EmbeddingBackend(abc.ABC):
+    """
+    Interface of an embedding backend.
+
+    Attributes:
+        name (str): Model identifier; also the embedding cache namespace.
+        dimensions (int): Length of the vectors produced.
+        max_concurrency (int): Batches that may be embedded in parallel.
+    """
+
+    name = ""
+    dimensions = 0
+    max_concurrency = 1
+
+    @abc.abstractmethod
+    def embed_batch(self, texts: List[str]) -> List[list]:
+        """Embeds a batch of texts, one vector per input, in order. Raises on failure."""
+
+    def warm_up(self) -> None:
+        """Prepares the backend (loads models, opens connections) before the first request."""
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """
+    Local CPU embeddings with a sentence-transformers model.
+
+    The model is loaded lazily (or by `warm_up`) and shared by all threads;
+    inference is serialized because torch already parallelizes each batch
+    across LOCAL_EMBEDDING_THREADS intra-op threads.
+
+    Args:
+        model_name (str): Hugging Face model id or local path.
+        device (str): Torch device, "cpu" by default.
+        batch_size (int): Texts per forward pass.
+        threads (int): Torch intra-op threads; 0 keeps the default.
+    """
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL, device: str = LOCAL_EMBEDDING_DEVICE,
+                 batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE, threads: int = LOCAL_EMBEDDING_THREADS):
+        self.name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.threads = threads
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._inference_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    try:
+                        import torch
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError as e:
+                        raise Exception("EMBEDDING_BACKEND=local requires the 'sentence-transformers' package") from e
+
+                    if self.threads > 0:
+                        torch.set_num_threads(self.threads)
+                    started = time.perf_counter()
+                    self._model = SentenceTransformer(self.name, device=self.device)
+                    logger.info(f"✅ Loaded embedding model {self.name} in {time.perf_counter() - started:.1f}s")
+        return self._model
+
+    @property
+    def dimensions(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed_batch(self, texts: List[str]) -> List[list]:
+        with self._inference_lock:
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        return vectors.tolist()
+
+    def warm_up(self) -> None:
+        """Loads the model and runs one forward pass so the first request pays no start-up cost."""
+        self.embed_batch(["warm-up"])
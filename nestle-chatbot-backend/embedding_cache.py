@@ -0,0 +1,162 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Vectors are stored as float32 blobs in SQLite, keyed by
+(deployment, sha256 of the input text). The cache is bounded by total
+vector bytes and evicts least-recently-used entries once the bound is hit.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", "./Scraped/embedding_cache.sqlite3"))
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+
+
+def text_key(text: str) -> str:
+    """Content address of an embedding input."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed LRU cache of embedding vectors with hit/miss counters.
+
+    Args:
+        path (Path): SQLite database file.
+        max_bytes (int): Upper bound on the total size of stored vectors.
+    """
+
+    def __init__(self, path: Path = EMBEDDING_CACHE_PATH, max_bytes: int = int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                deployment TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (deployment, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_lru ON embeddings (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def get_many(self, deployment: str, texts: List[str]) -> Dict[int, list]:
+        """
+        Looks up cached vectors for a list of inputs.
+
+        Returns:
+            Dict[int, list]: Input position -> vector, for inputs found in the cache.
+        """
+        keys = [text_key(text) for text in texts]
+        found: Dict[int, list] = {}
+        with self._lock:
+            # Chunk the IN clause to stay under SQLite's bound-parameter limit
+            rows = {}
+            unique_keys = list(set(keys))
+            for i in range(0, len(unique_keys), 500):
+                chunk = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.update(self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE deployment = ? AND text_hash IN ({placeholders})",
+                    [deployment, *chunk]
+                ).fetchall())
+
+            for position, key in enumerate(keys):
+                if key in rows:
+                    found[position] = np.frombuffer(rows[key], dtype=np.float32).tolist()
+
+            if rows:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE deployment = ? AND text_hash = ?",
+                    [(now, deployment, key) for key in rows]
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def get(self, deployment: str, text: str) -> Optional[list]:
+        """Returns the cached vector for one input, or None."""
+        return self.get_many(deployment, [text]).get(0)
+
+    def put_many(self, deployment: str, texts: List[str], vectors: List[list]) -> None:
+        """Stores vectors for the given inputs, evicting LRU entries past the size bound."""
+        now = time.time()
+        # One row per distinct input, so a text repeated in the batch is only counted once
+        unique = {text_key(text): vector for text, vector in zip(texts, vectors) if vector}
+        rows = [
+            (deployment, key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in unique.items()
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            for deployment_name, key, blob, _ in rows:
+                previous = self._conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE deployment = ? AND text_hash = ?",
+                    (deployment_name, key)
+                ).fetchone()
+                self._total_bytes += len(blob) - (previous[0] if previous else 0)
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def put(self, deployment: str, text: str, vector: list) -> None:
+        self.put_many(deployment, [text], [vector])
+
+    def _evict(self) -> None:
+        """Drops least-recently-used entries until the cache fits its size bound."""
+        while self._total_bytes > self.max_bytes:
+            victims = self._conn.execute(
+                "SELECT deployment, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not victims:
+                self._total_bytes = 0
+                return
+            for deployment, key, size in victims:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE deployment = ? AND text_hash = ?", (deployment, key)
+                )
+                self._total_bytes -= size
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
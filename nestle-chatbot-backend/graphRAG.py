@@ -1,10 +1,14 @@
 import os
-import json
 import logging
-from typing import List, Dict
+from typing import List, Dict, Union, Optional, AsyncIterator, Tuple
 from dotenv import load_dotenv
 
-from openai_service import generate_response
+from openai_service import generate_response, stream_response, generate_embeddings
+from knowledge_store import KnowledgeStore, CorpusSnapshot
+from knowledge_graph import GRAPH_MAX_HOPS
+from hybrid_retriever import HybridRetriever
+from page_store import iter_pages
+from metrics import stage_timer
 
 # Load environment variables from .env file (e.g., API keys, paths)
 load_dotenv()
@@ -16,20 +20,31 @@ logger = logging.getLogger(__name__)
 # Path to the graph-based knowledge file (typically extracted/filtered product info)
 GRAPH_DATA_PATH = os.getenv("GRAPH_DATA_PATH", "./Scraped/scraped_content.json")
 
+# Extra facts taken from pages reached by graph expansion, on top of the BM25 seed hits
+GRAPH_EXPANSION_FACTS = int(os.getenv("GRAPH_EXPANSION_FACTS", "2"))
+
+# Default seed retrieval for GraphRAG: "keyword" (BM25), "vector" or "hybrid" (both, fused with RRF)
+GRAPHRAG_RETRIEVAL = os.getenv("GRAPHRAG_RETRIEVAL", "hybrid").lower()
+
+# Process-resident corpus; loaded at startup and hot-reloaded when the file changes
+knowledge_store = KnowledgeStore(GRAPH_DATA_PATH)
+
+# Lexical + dense retrieval over the resident corpus and the local FAISS index
+retriever = HybridRetriever(knowledge_store, generate_embeddings)
+
 
 def load_graph_data(path: str) -> List[Dict]:
     """
     Loads JSON data representing the product knowledge graph.
 
     Args:
-        path (str): Path to the JSON file.
+        path (str): Path to a legacy JSON file or a sharded JSONL crawl manifest.
 
     Returns:
         List[Dict]: List of dictionary items containing product data.
     """
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = list(iter_pages(path))
         logger.info(f"✅ Loaded {len(data)} graph items from JSON")
         return data
     except Exception as e:
@@ -37,93 +52,119 @@ def load_graph_data(path: str) -> List[Dict]:
         return []
 
 
-def find_relevant_facts(question: str, graph_data: List[Dict], max_hits=5) -> List[str]:
+def find_relevant_facts(question: str, graph_data: Union[CorpusSnapshot, List[Dict]], max_hits=5,
+                        max_hops: int = GRAPH_MAX_HOPS, expansion_facts: int = GRAPH_EXPANSION_FACTS,
+                        seeds: Optional[List[Tuple[int, float]]] = None) -> List[str]:
     """
-    Retrieves the most relevant content chunks from the graph based on keyword matching.
+    Retrieves the most relevant content chunks from the graph: seed passages
+    (BM25 unless given), plus passages from pages reached by multi-hop
+    expansion of the seed pages through the page/entity graph.
 
     Args:
         question (str): User's natural language query.
-        graph_data (List[Dict]): Loaded product data.
-        max_hits (int): Maximum number of matching chunks to return.
+        graph_data (CorpusSnapshot | List[Dict]): Resident corpus snapshot, or raw product data.
+        max_hits (int): Maximum number of seed chunks to return.
+        max_hops (int): Traversal depth of the graph expansion (0 disables it).
+        expansion_facts (int): Maximum number of chunks added from expanded pages.
+        seeds (List[Tuple[int, float]]): Precomputed (passage id, score) seeds, e.g. from
+            `HybridRetriever.retrieve_passages`; BM25 top hits are used when omitted.
 
     Returns:
-        List[str]: Top N content snippets that are relevant to the question.
+        List[str]: Passages (token-bounded page chunks) relevant to the question, seeds first.
     """
-    question_lower = question.lower()
-    relevant = []
+    if not isinstance(graph_data, CorpusSnapshot):
+        graph_data = CorpusSnapshot(graph_data)
+
+    # Vectorized BM25 scoring over the snapshot's sparse passage-term matrix, once for seeds and expansion
+    passage_scores = graph_data.bm25.score(question)
+    if seeds is None:
+        seeds = graph_data.bm25.rank(passage_scores, max_hits)
+    relevant = [graph_data.passages[doc_id] for doc_id, _ in seeds[:max_hits]]
+
+    if seeds and max_hops > 0 and expansion_facts > 0:
+        seed_pages = list(dict.fromkeys(p["page"] for p in relevant))
+        expanded = []
+        for page, graph_score in graph_data.graph.expand(seed_pages, max_hops):
+            # Best passage of the reached page for this question
+            best = max(graph_data.page_passages[page], key=lambda i: passage_scores[i])
+            expanded.append((graph_score * (1.0 + float(passage_scores[best])), best))
+        expanded.sort(key=lambda x: x[0], reverse=True)
+        relevant.extend(graph_data.passages[i] for _, i in expanded[:expansion_facts])
+
+    # Format hits as "title: passage"
+    top_facts = [f"{p['title']}: {p['content']}" for p in relevant]
 
-    for item in graph_data:
-        match_score = 0
+    logger.info(f"📚 Selected {len(top_facts)} context chunks for GraphRAG")
+    return top_facts
 
-        # Try matching based on available content and keywords
-        content = item.get("content", "") or item.get("description", "") or ""
-        keywords = " ".join(item.get("metadata", {}).get("keywords", []))
-        combined = f"{content} {keywords}".lower()
 
-        # Naive keyword match (could be replaced with semantic match later)
-        if any(word in combined for word in question_lower.split()):
-            match_score += 1
+# Returned when retrieval finds nothing relevant
+NO_FACTS_MESSAGE = "I couldn't find anything in the Nestlé knowledge graph related to your question."
 
-        if match_score > 0:
-            relevant.append((match_score, item))
 
-    # Sort by match score in descending order
-    relevant.sort(reverse=True, key=lambda x: x[0])
+async def retrieve_graph_facts(user_question: str, retrieval: Optional[str] = None) -> List[str]:
+    """
+    Retrieves the graph facts used to answer a question.
 
-    # Format top hits as "title: content..."
-    top_facts = [f"{i['title']}: {i['content'][:300]}..." for _, i in relevant[:max_hits]]
+    The facts are sent as the context of the current user turn; the assistant
+    instructions come from the real system message and the prompt budget
+    manager trims facts and history to fit (see `prompt_budget`).
 
-    logger.info(f"📚 Selected {len(top_facts)} context chunks for GraphRAG")
-    return top_facts
+    Args:
+        user_question (str): The user's input question.
+        retrieval (str): Seed retrieval mode, "keyword", "vector" or "hybrid" (defaults to GRAPHRAG_RETRIEVAL).
 
+    Returns:
+        List[str]: Relevant facts, most relevant first; empty when nothing matched.
+    """
+    # Resident knowledge graph data (reloaded only when the backing file changes)
+    graph_data = knowledge_store.snapshot()
 
-async def graph_rag_response(user_question: str) -> str:
+    # Seed passages from lexical and/or dense retrieval, then select the most relevant fact snippets
+    with stage_timer("seed_retrieval"):
+        seeds = await retriever.retrieve_passages(user_question, retrieval or GRAPHRAG_RETRIEVAL)
+    with stage_timer("fact_selection"):
+        return find_relevant_facts(user_question, graph_data, seeds=seeds)
+
+
+async def graph_rag_response(user_question: str, session_id: Optional[str] = None,
+                             retrieval: Optional[str] = None) -> str:
     """
     Main Graph-RAG pipeline: fetches relevant graph-based facts and generates a conversational response.
 
     Args:
         user_question (str): The user's input question.
+        session_id (str): Conversation whose chat history is used.
+        retrieval (str): Seed retrieval mode ("keyword", "vector" or "hybrid").
 
     Returns:
         str: AI-generated answer based on available graph facts and prompt rules.
     """
-    # Load knowledge graph data
-    graph_data = load_graph_data(GRAPH_DATA_PATH)
-
-    # Select most relevant fact snippets
-    context_facts = find_relevant_facts(user_question, graph_data)
-
-    # Fallback if nothing matched
-    if not context_facts:
-        return "I couldn't find anything in the Nestlé knowledge graph related to your question."
-
-    # Merge all selected facts as prompt context
-    context_text = "\n\n".join(context_facts)
-
-    # Construct a system + user prompt with instructions and selected facts
-    prompt = f"""
-"content": "You are NestleBOT, a digital assistant created to provide information about Nestlé products available in Canada. 
-Your purpose is to: 
+    facts = await retrieve_graph_facts(user_question, retrieval)
+    if not facts:
+        return NO_FACTS_MESSAGE
 
-1. Offer details about product ingredients, features, and availability  
-2. Share approved recipes using Nestlé products  
-3. Provide general nutritional information  
-4. Maintain a friendly yet professional tone  
-5. Give concise responses (1-2 paragraphs maximum)  
-6. Always clarify when you don't have information  
+    # Generate AI response from OpenAI or Azure OpenAI service
+    return await generate_response(user_question, session_id=session_id, facts=facts)
 
-Important Rules:
-- Never make claims about health benefits
-- Direct users to official packaging for most accurate info
-- Use Canadian product names and measurements
-- When unsure, suggest contacting Nestlé Canada directly",
 
-Facts:
-{context_text}
+async def graph_rag_stream(user_question: str, session_id: Optional[str] = None,
+                           retrieval: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Streaming variant of graph_rag_response: yields answer tokens as they arrive.
 
-Question: {user_question}
+    Args:
+        user_question (str): The user's input question.
+        session_id (str): Conversation whose chat history is used.
+        retrieval (str): Seed retrieval mode ("keyword", "vector" or "hybrid").
 
-Answer:"""
+    Yields:
+        str: Content deltas of the AI-generated answer.
+    """
+    facts = await retrieve_graph_facts(user_question, retrieval)
+    if not facts:
+        yield NO_FACTS_MESSAGE
+        return
 
-    # Generate AI response from OpenAI or Azure OpenAI service
-    return generate_response(prompt)
+    async for token in stream_response(user_question, session_id=session_id, facts=facts):
+        yield token
@@ -0,0 +1,149 @@
+"""
+Write-behind persistence for chat history.
+
+Messages are appended to an in-process queue on the request path and a
+background thread flushes them in batches to an append-only SQLite table,
+so no request rewrites a file and multiple workers can share one database.
+Reads touch SQLite and block; async callers run them with asyncio.to_thread.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+
+from dotenv import load_dotenv
+
+from metrics import stage_timer
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HISTORY_DB_PATH = Path(os.getenv("HISTORY_DB_PATH", "./Scraped/chat_history.sqlite3"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1.0"))
+LEGACY_HISTORY_FILE = Path("./Scraped/chat_history.json")
+
+
+class HistoryStore:
+    """
+    Append-only SQLite message log with batched background flushing.
+
+    Args:
+        path (Path): SQLite database file.
+        flush_interval (float): Seconds between background flushes.
+    """
+
+    def __init__(self, path: Path = HISTORY_DB_PATH, flush_interval: float = HISTORY_FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple] = []
+        self._pending_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+        self._conn.commit()
+        self._import_legacy_file()
+
+        self._flusher = threading.Thread(target=self._run, name="history-flusher", daemon=True)
+        self._flusher.start()
+
+    def _import_legacy_file(self) -> None:
+        """One-time import of the old single-user chat_history.json into the default session."""
+        if not LEGACY_HISTORY_FILE.exists():
+            return
+        with self._db_lock:
+            if self._conn.execute("SELECT 1 FROM messages LIMIT 1").fetchone():
+                return
+            try:
+                with open(LEGACY_HISTORY_FILE, "r") as f:
+                    history = json.load(f)
+            except Exception as e:
+                logger.error("❌ Error importing legacy chat history", exc_info=e)
+                return
+            now = time.time()
+            self._conn.executemany(
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                [("default", m["role"], m["content"], now) for m in history]
+            )
+            self._conn.commit()
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        """Queues a message for the next flush. Never touches the disk."""
+        with self._pending_lock:
+            self._pending.append(("append", session_id, role, content, time.time()))
+
+    def clear(self, session_id: str) -> None:
+        """Queues deletion of a session's history for the next flush."""
+        with self._pending_lock:
+            self._pending.append(("clear", session_id, None, None, None))
+
+    def read_recent(self, session_id: str, limit: int) -> List[Dict]:
+        """Returns the latest `limit` persisted messages of a session, oldest first."""
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def latest_id(self, session_id: str) -> Optional[int]:
+        """Id of the session's newest persisted message (None when it has none), to detect writes by other workers."""
+        with self._db_lock:
+            row = self._conn.execute("SELECT MAX(id) FROM messages WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0]
+
+    def flush(self) -> None:
+        """Writes all queued operations in a single transaction."""
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        with self._db_lock, stage_timer("history_flush"):
+            try:
+                for op, session_id, role, content, created_at in batch:
+                    if op == "append":
+                        self._conn.execute(
+                            "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                            (session_id, role, content, created_at)
+                        )
+                    else:
+                        self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self._conn.commit()
+            except Exception as e:
+                self._conn.rollback()
+                logger.error("❌ Error flushing chat history", exc_info=e)
+                # Put the batch back so it is retried on the next flush
+                with self._pending_lock:
+                    self._pending = batch + self._pending
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stops the background flusher and writes anything still queued."""
+        self._stop.set()
+        self._flusher.join(timeout=self.flush_interval * 2)
+        self.flush()
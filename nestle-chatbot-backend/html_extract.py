@@ -0,0 +1,94 @@
+"""
+HTML -> page data extraction for the crawler.
+
+Kept free of the crawler's heavy imports (Playwright, Azure) so it can run
+in worker processes: `scraper` ships rendered HTML to a process pool and
+gets plain dicts back, keeping parsing off the asyncio event loop.
+
+Every element the extraction needs is collected in a single traversal
+instead of one `find_all` walk per field. The tree builder stays
+html.parser, so extracted content (and with it content hashes and
+incremental re-indexing) is the same as before.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List
+
+from bs4 import BeautifulSoup, Tag
+
+# BeautifulSoup tree builder; another builder repairs malformed markup differently and changes content hashes
+HTML_PARSER = "html.parser"
+
+# Block elements whose text makes up the page content
+TEXT_TAGS = frozenset({"p", "li", "h1", "h2", "h3", "h4"})
+# Everything the extraction looks at, gathered in one pass
+COLLECTED_TAGS = frozenset(TEXT_TAGS | {"meta", "script", "style", "img", "a"})
+
+KEYWORD_PATTERN = re.compile(r"\b\w{4,}\b")
+TOP_KEYWORDS = 10
+
+
+def extract_page_data(url: str, html: str, parser: str = HTML_PARSER) -> Dict:
+    """
+    Parses a rendered HTML document into the fields of a scraped page.
+
+    Args:
+        url (str): Page URL.
+        html (str): Rendered HTML.
+        parser (str): BeautifulSoup tree builder.
+
+    Returns:
+        Dict: url, title, content, links, images and metadata (description, keywords, categories).
+    """
+    soup = BeautifulSoup(html, parser)
+    title = soup.title.string.strip() if soup.title and soup.title.string else "Untitled"
+
+    # Single traversal: bucket the elements we need by tag name, text blocks in document order
+    elements: Dict[str, List] = {name: [] for name in COLLECTED_TAGS}
+    text_elements = []
+    for element in soup.descendants:
+        if not isinstance(element, Tag) or element.name not in COLLECTED_TAGS:
+            continue
+        if element.name in TEXT_TAGS:
+            text_elements.append(element)
+        else:
+            elements[element.name].append(element)
+
+    description, keywords = "", []
+    described = keyworded = False
+    for meta in elements["meta"]:
+        name = meta.get("name")
+        if name == "description" and not described:
+            description = meta.get("content", "")
+            described = True
+        elif name == "keywords" and not keyworded:
+            keywords = meta.get("content", "").split(',')
+            keyworded = True
+
+    # Drop script/style bodies so they do not leak into the text of enclosing blocks
+    for element in elements["script"] + elements["style"]:
+        element.decompose()
+
+    texts = [element.get_text(strip=True) for element in text_elements]
+    content = ' '.join(t for t in texts if len(t) > 5).strip()
+
+    word_freq = Counter(KEYWORD_PATTERN.findall(content.lower()))
+    top_keywords = [word for word, _ in word_freq.most_common(TOP_KEYWORDS)]
+    all_keywords = list(set(keywords + top_keywords))
+
+    images = [img.get("src") for img in elements["img"] if img.get("src")]
+    links = [a.get("href") for a in elements["a"] if a.get("href")]
+
+    return {
+        "url": url,
+        "title": title,
+        "content": content,
+        "links": list(set(links)),
+        "images": list(set(images)),
+        "metadata": {
+            "description": description,
+            "keywords": all_keywords,
+            "categories": []
+        }
+    }
@@ -0,0 +1,139 @@
+"""
+In-process hybrid retrieval over the scraped corpus.
+
+Lexical retrieval (BM25 / keyword scoring) and dense retrieval (query
+embedding + FAISS kNN over the index built by `indexer_service`) run
+concurrently and are fused with reciprocal rank fusion, so /graphrag and
+/search get hybrid ranking without a round trip to Azure Cognitive Search.
+Dense retrieval degrades to lexical-only when no local vector index exists
+or the query cannot be embedded, including in "vector" mode.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional, Callable, Any
+
+from dotenv import load_dotenv
+
+from knowledge_store import KnowledgeStore
+from query_cache import current_index_generation
+from vector_store import LocalVectorSearchService, reciprocal_rank_fusion, DATA_DIR, RRF_K
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_MODES = ("keyword", "vector", "hybrid")
+
+# Candidates taken from each ranked list before fusion
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+
+
+class HybridRetriever:
+    """
+    Runs lexical and dense retrieval in parallel and fuses them with RRF.
+
+    Args:
+        store (KnowledgeStore): Source of the passage-level BM25 index.
+        embed (Callable): Embeds a query string; returns an empty list on failure.
+        data_dir (Path): Directory of the persisted local FAISS index.
+        candidates (int): Hits taken from each retriever before fusion.
+        rrf_k (int): Rank damping constant of reciprocal rank fusion.
+    """
+
+    def __init__(self, store: KnowledgeStore, embed: Callable[[str], List[float]], data_dir: Path = DATA_DIR,
+                 candidates: int = RETRIEVAL_CANDIDATES, rrf_k: int = RRF_K):
+        self.store = store
+        self.embed = embed
+        self.data_dir = Path(data_dir)
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self._vector_index: Optional[LocalVectorSearchService] = None
+        self._vector_generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def vector_index(self) -> LocalVectorSearchService:
+        """
+        Returns the local FAISS index, reloading it when indexing has produced a new generation.
+        A reload builds a new service and swaps it in; searches still running keep the
+        instance they started with, whose index and documents always match.
+        """
+        generation = current_index_generation()
+        with self._lock:
+            if self._vector_index is None or generation != self._vector_generation:
+                # First use, or another worker finished indexing: pick up the new FAISS index
+                self._vector_index = LocalVectorSearchService.from_disk(self.data_dir)
+                self._vector_generation = generation
+            return self._vector_index
+
+    async def _dense_hits(self, query: str, filter_expr: Optional[str] = None, top_k: Optional[int] = None) -> List[tuple]:
+        """Embeds the query and runs kNN against the local index, off the event loop."""
+        index = await asyncio.to_thread(self.vector_index)
+        if index.index is None or index.index.ntotal == 0:
+            return []
+        vector = await asyncio.to_thread(self.embed, query)
+        if not vector:
+            return []
+        return await asyncio.to_thread(index.vector_hits, vector, filter_expr, top_k)
+
+    async def search(self, query: str, filter_expr: Optional[str] = None, mode: str = "hybrid") -> Dict[str, Any]:
+        """
+        Document search over the local index, shaped like an Azure Search response.
+
+        Args:
+            query (str): Search text.
+            filter_expr (str): Optional OData-style filter ("field eq 'value'" clauses).
+            mode (str): "keyword", "vector" or "hybrid".
+        """
+        index = await asyncio.to_thread(self.vector_index)
+        lexical = asyncio.to_thread(index.keyword_hits, query, filter_expr) if mode != "vector" else None
+        dense = self._dense_hits(query, filter_expr) if mode != "keyword" else None
+
+        # Both retrievers run concurrently; the embedding round trip overlaps keyword scoring
+        hit_lists = await asyncio.gather(*(task for task in (lexical, dense) if task is not None))
+        if len(hit_lists) == 1:
+            return index.format_results(hit_lists[0])
+        return index.fuse_hits(hit_lists, self.rrf_k)
+
+    async def retrieve_passages(self, query: str, mode: str = "hybrid", k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Ranks passages of the current knowledge store snapshot.
+
+        Dense hits are chunk documents of the local index and are mapped back to
+        snapshot passages by (URL, chunk index); hits from pages no longer in the
+        snapshot are dropped. When the dense ranking is unavailable (no local
+        index, or the query could not be embedded) the BM25 ranking is used, even
+        in "vector" mode.
+
+        Returns:
+            List[Tuple[int, float]]: (passage id, score) pairs, best first.
+        """
+        snapshot = self.store.snapshot()
+        lexical = asyncio.to_thread(snapshot.bm25.top_k, query, self.candidates) if mode != "vector" else None
+        dense = self._dense_hits(query, top_k=self.candidates) if mode != "keyword" else None
+
+        results = await asyncio.gather(*(task for task in (lexical, dense) if task is not None))
+        rankings = []
+        if lexical is not None:
+            rankings.append([passage_id for passage_id, _ in results.pop(0)])
+        if dense is not None:
+            passages = []
+            for _, doc in results.pop(0):
+                passage_id = snapshot.passage_ids.get((doc.get("url", ""), doc.get("chunk_index") or 0))
+                if passage_id is not None and passage_id not in passages:
+                    passages.append(passage_id)
+            if passages:
+                rankings.append(passages)
+            elif lexical is None:
+                logger.info("ℹ️ Dense retrieval unavailable, falling back to BM25")
+                hits = await asyncio.to_thread(snapshot.bm25.top_k, query, self.candidates)
+                rankings.append([passage_id for passage_id, _ in hits])
+
+        if len(rankings) == 1:
+            # Single retriever: keep its own order, scored by rank
+            return [(passage_id, 1.0 / (self.rrf_k + rank + 1)) for rank, passage_id in enumerate(rankings[0][:k])]
+        return reciprocal_rank_fusion(rankings, self.rrf_k)[:k]
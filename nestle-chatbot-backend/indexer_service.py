@@ -1,102 +1,369 @@
 # indexer_service.py
 
+import os
+import json
 import logging
-from scraper import get_scraped_content
-from search_service import AzureSearchService
-from openai_service import generate_embeddings
+from pathlib import Path
+from itertools import islice
+from typing import Iterable, Iterator, Callable
+from scraper import iter_scraped_content, content_hash, BASE_URL
+from chunker import chunk_page
+from search_service import get_search_service
+from openai_service import generate_embeddings_batch, embedding_backend
+from vector_store import LocalVectorSearchService
+from query_cache import bump_index_generation
+from content_cleaner import CorpusCleaner, CONTENT_CLEANING_ENABLED
+from jobs import JobCancelled
 
 # Configure basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Also build the in-process FAISS index alongside the Azure upload
+LOCAL_VECTOR_INDEX = os.getenv("LOCAL_VECTOR_INDEX", "true").lower() == "true"
 
-def prepare_search_documents(products: list) -> list:
+# Without an endpoint only the local FAISS index is built
+AZURE_SEARCH_CONFIGURED = bool(os.getenv("AZURE_SEARCH_ENDPOINT"))
+
+# Pages embedded and uploaded per streaming step
+INDEX_CHUNK_SIZE = int(os.getenv("INDEX_CHUNK_SIZE", "256"))
+
+# URL -> {"hash": content hash, "chunks": chunk count} of every page currently in the search index
+INDEXED_STATE_PATH = Path("./Scraped/indexed_state.json")
+
+
+def document_id(url: str) -> str:
+    """Derives the search document key from a page URL."""
+    return url.replace(f"{BASE_URL}/", "")
+
+
+def chunk_id(parent_id: str, index: int) -> str:
+    """Search document key of one chunk of a page."""
+    return f"{parent_id}_chunk{index}"
+
+
+def _state_hash(entry) -> str:
+    # Entries written before chunking were bare content hashes
+    return entry.get("hash") if isinstance(entry, dict) else entry
+
+
+def _indexed_ids(url: str, entry) -> list:
+    """Search document keys currently stored for a page."""
+    parent_id = document_id(url)
+    if not isinstance(entry, dict):
+        return [parent_id]  # Whole-page document from before chunking
+    return [chunk_id(parent_id, i) for i in range(entry.get("chunks", 0))]
+
+
+def load_indexed_state() -> dict:
+    """Loads the URL -> content hash / chunk count map of the last successful indexing run."""
+    if not INDEXED_STATE_PATH.exists():
+        return {}
+    with open(INDEXED_STATE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_indexed_state(state: dict) -> None:
+    with open(INDEXED_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def prepare_search_documents(products: list, progress: Callable[[int], None] = None) -> tuple:
     """
-    Converts scraped product data into documents suitable for Azure Cognitive Search.
-    
+    Splits scraped pages into token-bounded chunks and converts them into
+    documents suitable for Azure Cognitive Search.
+
+    Each chunk becomes its own search document carrying its parent page's id,
+    URL and metadata plus the chunk's character offsets in the page content.
+    The embedded text is the page title followed by the chunk; the first chunk
+    also carries the description and keywords.
+
     Args:
         products (list): List of scraped product dictionaries.
-    
+        progress (Callable): Receives the number of chunks embedded so far before
+            each embedding request; it may raise to abort.
+
     Returns:
-        list: List of structured and vectorized documents ready for indexing.
+        tuple: (documents, failed) - structured and vectorized chunk documents
+        ready for indexing, and the URLs whose embeddings could not be generated.
+        A page is only indexed when every one of its chunks was embedded.
     """
     documents = []
+    texts = []
 
     for product in products:
         try:
             # Extract unique ID from the product URL
             product_url = product.get("url", "")
-            product_id = product_url.replace("https://www.madewithnestle.ca/", "")
+            parent_id = document_id(product_url)
 
             # Extract metadata for enrichment
             metadata = product.get("metadata", {})
-            category = metadata.get("categories", ["unknown"])[0]
+            category = (metadata.get("categories") or ["unknown"])[0]
             keywords = metadata.get("keywords", [])
             description = metadata.get("description", "")
-
-            # Combine text fields to generate semantic embeddings
-            content = product.get("content", "")
             title = product.get("title", "")
-            content_to_embed = f"{title} {content} {description} {' '.join(keywords)}"
-
-            # Generate OpenAI embedding vector for semantic search
-            vector_field = generate_embeddings(content_to_embed)
 
-            # Append the formatted document
-            documents.append({
-                "id": product_id,
-                "url": product_url,
-                "title": title,
-                "content": content,
-                "category": category,
-                "keywords": keywords,
-                "description": description,
-                "vectorField": vector_field
-            })
+            for chunk in chunk_page(product):
+                # Combine text fields to generate semantic embeddings
+                if chunk["index"] == 0:
+                    texts.append(f"{title} {chunk['text']} {description} {' '.join(keywords)}")
+                else:
+                    texts.append(f"{title} {chunk['text']}")
 
-            logger.info(f"Prepared document for: {title}")
+                documents.append({
+                    "id": chunk_id(parent_id, chunk["index"]),
+                    "parent_id": parent_id,
+                    "url": product_url,
+                    "title": title,
+                    "content": chunk["text"],
+                    "chunk_index": chunk["index"],
+                    "chunk_start": chunk["start"],
+                    "chunk_end": chunk["end"],
+                    "category": category,
+                    "keywords": keywords,
+                    "description": description,
+                })
 
         except Exception as e:
             logger.error(f"Error preparing document for {product.get('title', 'Unknown')}:", exc_info=e)
 
-    return documents
+    # Generate OpenAI embedding vectors for semantic search in batched, concurrent requests
+    vectors = generate_embeddings_batch(texts, progress)
+
+    failed_urls = set()
+    for document, vector in zip(documents, vectors):
+        if vector:
+            document["vectorField"] = vector
+        else:
+            failed_urls.add(document["url"])
 
+    prepared = []
+    for document in documents:
+        if document["url"] in failed_urls:
+            continue
+        prepared.append(document)
+    for url in sorted(failed_urls):
+        logger.warning(f"Embedding failed, not indexing: {url}")
+    logger.info(f"Prepared {len(prepared)} chunk documents for {len(products) - len(failed_urls)} pages")
 
-def index_scraped_content():
+    return prepared, sorted(failed_urls)
+
+
+def _chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Groups an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def index_scraped_content(delta: dict = None, full: bool = False, progress: Callable[..., None] = None):
     """
-    Main function to index all scraped content into Azure Cognitive Search.
+    Main function to index scraped content into Azure Cognitive Search.
     
     This function will:
-    - Load the scraped data from local storage
-    - Prepare documents (including OpenAI embeddings)
-    - Create the Azure search index (if needed)
-    - Upload documents to Azure Cognitive Search
+    - Strip cross-page boilerplate and drop near-duplicate pages (see `content_cleaner`)
+    - Stream the scraped data from storage in chunks of INDEX_CHUNK_SIZE pages
+    - Work out which pages were added, changed or removed since the last run
+    - Prepare documents (including OpenAI embeddings) for new and changed pages only
+    - Update the local FAISS index (LOCAL_VECTOR_INDEX)
+    - Create the Azure search index (if needed), upload new/changed documents
+      and delete removed ones, when Azure Search is configured
+
+    The local index does not depend on Azure: it is built and saved even when
+    Azure Search is not configured or an Azure call fails. In the latter case
+    the Azure error is raised afterwards and the indexed state is not saved, so
+    the next run retries the same pages.
+
+    Changes are detected on the raw scraped page and only the pages that get
+    embedded are cleaned, so a shift in the corpus-wide boilerplate model does
+    not re-embed unchanged pages.
+
+    Args:
+        delta (dict): Optional added/changed/removed URL lists (e.g. from
+            `scraper.scrape_incremental`). Computed against the last indexed
+            state when omitted.
+        full (bool): Re-embed and upload every page regardless of changes.
+        progress (Callable): Optional callback receiving `pages_scanned`, `docs_embedded`,
+            `docs_uploaded`, `batches_uploaded` and `docs_removed` counters after every
+            embedding request and upload batch; it may raise to abort the run (e.g. when
+            a background job is cancelled).
+
+    Returns:
+        dict: Counts of indexed and removed documents, URLs whose embedding failed,
+        and the cleaning report (duplicates dropped, bytes and tokens saved).
     """
+    progress = progress or (lambda **counters: None)
     try:
         logger.info("🚀 Starting to index content...")
 
-        # Ensure the search index exists in Azure
-        AzureSearchService.create_search_index()
+        search_service = None
+        azure_error = None
+        if AZURE_SEARCH_CONFIGURED:
+            try:
+                # Ensure the search index exists in Azure
+                search_service = get_search_service()
+                search_service.create_search_index(embedding_backend.dimensions)
+            except Exception as e:
+                logger.error("❌ Azure Search unavailable, building the local index only", exc_info=e)
+                search_service, azure_error = None, e
+        else:
+            logger.info("ℹ️ Azure Search not configured, building the local index only")
+
+        def azure_call(method, *args) -> None:
+            # Stops using Azure after the first failure; local indexing carries on
+            nonlocal search_service, azure_error
+            if search_service is None:
+                return
+            try:
+                getattr(search_service, method)(*args)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Azure Search {method} failed, skipping Azure for the rest of the run", exc_info=e)
+                search_service, azure_error = None, e
+
+        previous_state = load_indexed_state()
+        indexed_state = {} if full else dict(previous_state)
+        pending = None
+        if delta is not None and not full:
+            pending = set(delta.get("added", [])) | set(delta.get("changed", []))
+
+        # Corpus-wide boilerplate model and near-duplicate map; streams the crawl twice
+        cleaner = CorpusCleaner.fit(
+            lambda: (page.to_dict() for page in iter_scraped_content())
+        ) if CONTENT_CLEANING_ENABLED else None
+
+        seen = set()
+        indexed_count = 0
+        batches_uploaded = 0
+        docs_uploaded = 0
+        failed = []
+
+        # Chunk documents go straight into the local index, so embeddings are not held for the whole run
+        local_index = None
+        if LOCAL_VECTOR_INDEX:
+            local_index = LocalVectorSearchService()
+            if not full:
+                local_index.load()
 
-        # Load the previously scraped content
-        products = get_scraped_content()
-        if not products:
+        # Stream the previously scraped content so memory stays bounded by the chunk size
+        for chunk in _chunked(iter_scraped_content(), INDEX_CHUNK_SIZE):
+            products = [p.to_dict() for p in chunk]
+            if cleaner is not None:
+                # Near-duplicates of a kept page are not indexed
+                products = [p for p in products if p.get("url", "") not in cleaner.duplicates]
+            seen.update(p.get("url", "") for p in products)
+            progress(pages_scanned=len(seen))
+
+            # Changes are detected on the raw page: the boilerplate model is fitted corpus-wide, so
+            # hashing cleaned text would re-embed every page whenever a few pages come or go
+            raw_hashes = {p.get("url", ""): content_hash(p) for p in products}
+            if full:
+                to_index = products
+            elif pending is not None:
+                to_index = [p for p in products if p.get("url", "") in pending]
+            else:
+                to_index = [p for p in products if _state_hash(indexed_state.get(p.get("url", ""))) != raw_hashes[p.get("url", "")]]
+            if not to_index:
+                continue
+            if cleaner is not None:
+                # Only what gets embedded is cleaned
+                to_index = [cleaner.clean(p) for p in to_index]
+
+            # Prepare documents with vector embeddings
+            documents, chunk_failed = prepare_search_documents(
+                to_index, lambda done: progress(docs_embedded=indexed_count + done)
+            )
+            failed.extend(chunk_failed)
+
+            if documents:
+                indexed_count += len(documents)
+                if local_index is not None:
+                    local_index.upsert(documents)
+                # Upload documents to Azure Cognitive Search
+                if search_service is not None:
+                    logger.info(f"Uploading {len(documents)} chunk documents to Azure Search")
+                    azure_call("upload_documents", documents, lambda done: progress(docs_uploaded=docs_uploaded + done))
+                    docs_uploaded += len(documents)
+                    batches_uploaded += 1
+
+            # Record what is now in the index so the next run only handles the delta
+            chunk_counts = {}
+            for doc in documents:
+                chunk_counts[doc["url"]] = chunk_counts.get(doc["url"], 0) + 1
+            stale_ids = []
+            for product in to_index:
+                url = product.get("url", "")
+                if url in chunk_counts:
+                    # A shorter page leaves chunks (or a pre-chunking whole-page document) behind
+                    current = {doc["id"] for doc in documents if doc["url"] == url}
+                    stale_ids.extend(i for i in _indexed_ids(url, previous_state.get(url, {})) if i not in current)
+                    indexed_state[url] = {"hash": raw_hashes[url], "chunks": chunk_counts[url]}
+            if stale_ids:
+                azure_call("delete_documents", stale_ids)
+            progress(docs_embedded=indexed_count, docs_failed=len(failed), batches_uploaded=batches_uploaded)
+
+        if not seen:
             logger.warning("No products found. Please run the scraper first.")
-            return
+            return {"indexed": 0, "removed": 0, "failed": [], "cleaning": None}
 
-        logger.info(f"Found {len(products)} products to index")
+        if failed:
+            logger.warning(f"⚠️ {len(failed)} documents skipped because their embedding failed")
 
-        # Prepare documents with vector embeddings
-        documents = prepare_search_documents(products)
-        if not documents:
-            logger.warning("No documents prepared for indexing")
-            return
+        if delta is not None and not full:
+            removed = list(delta.get("removed", []))
+            if cleaner is not None:
+                # Pages indexed before they became near-duplicates of another page
+                removed.extend(url for url in cleaner.duplicates if url in previous_state and url not in removed)
+        else:
+            removed = [url for url in previous_state if url not in seen]
+
+        removed_ids = [document_id(url) for url in removed]
+        removed_chunk_ids = [i for url in removed for i in _indexed_ids(url, previous_state.get(url, {}))]
+        if removed_chunk_ids:
+            if search_service is not None:
+                logger.info(f"Removing {len(removed_chunk_ids)} chunk documents of {len(removed)} pages from Azure Search")
+                azure_call("delete_documents", removed_chunk_ids)
+            progress(docs_removed=len(removed_chunk_ids))
+        for url in removed:
+            indexed_state.pop(url, None)
+
+        logger.info(
+            f"Processed {len(seen)} products: {indexed_count} chunks indexed, "
+            f"{len(removed)} pages removed, {len(failed)} failed"
+        )
+
+        # Persist the local FAISS index so /search can be served in-process
+        if local_index is not None and (indexed_count or removed_ids):
+            if removed_ids:
+                local_index.upsert([], removed_ids)
+            if local_index.index is not None:
+                local_index.save()
+
+        # New index generation: invalidates cached /search results in every worker
+        if indexed_count or removed_ids:
+            bump_index_generation()
+
+        if azure_error is not None:
+            # Local index is saved; keep the old state so the next run re-sends these pages to Azure
+            raise azure_error
+
+        save_indexed_state(indexed_state)
 
-        # Upload documents to Azure Cognitive Search
-        logger.info(f"Uploading {len(documents)} documents to Azure Search")
-        AzureSearchService.upload_documents(documents)
+        cleaning = None
+        if cleaner is not None:
+            cleaning = cleaner.report()
+            logger.info(
+                f"🧹 Cleaning saved {cleaning['bytes_saved']} bytes / {cleaning['tokens_saved']} tokens "
+                f"across {cleaning['pages']} pages; {cleaning['duplicates_dropped']} near-duplicates dropped"
+            )
 
         logger.info("✅ Indexing completed successfully")
+        return {"indexed": indexed_count, "removed": len(removed_chunk_ids), "failed": failed, "cleaning": cleaning}
 
     except Exception as e:
         logger.error("❌ Error indexing scraped content:", exc_info=e)
@@ -0,0 +1,212 @@
+"""
+Background jobs for long-running ingestion work (/scrape, /index).
+
+A job is submitted from a request handler and runs as an asyncio task on the
+API's event loop; blocking stages (file writes, embedding, uploads) are pushed
+to worker threads so chat traffic is never stalled. Jobs report progress
+counters while they run and can be cancelled: the asyncio task is cancelled
+and the next `report` call from a worker thread raises `JobCancelled`. A
+thread cannot be interrupted, so a job started through `Job.run_blocking`
+keeps its concurrency slot until that thread has actually returned; the next
+queued job never overlaps a cancelled one still writing its files.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Awaitable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "1"))  # Ingestion jobs running at once; the rest wait queued
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))  # Finished jobs kept for GET /jobs/{id}
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation has been requested."""
+
+
+class Job:
+    """
+    State and progress of one background job.
+
+    Args:
+        kind (str): What the job does, e.g. "scrape" or "index".
+        params (dict): Parameters the job was submitted with.
+    """
+
+    def __init__(self, kind: str, params: Dict[str, Any] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._cancel_requested = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def report(self, **counters) -> None:
+        """
+        Updates progress counters. Safe to call from worker threads.
+
+        Raises:
+            JobCancelled: If the job has been cancelled, so blocking stages stop at the next checkpoint.
+        """
+        with self._lock:
+            self.progress.update(counters)
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    async def run_blocking(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs a blocking stage in a worker thread. If the job is cancelled meanwhile,
+        cancellation is requested (so the stage stops at its next `report`) and the
+        thread is waited for before the cancellation propagates.
+        """
+        future = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self._cancel_requested.set()
+            while not future.done():
+                try:
+                    await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    continue  # Cancelled again (e.g. shutdown); the thread still has to finish
+                except Exception:
+                    break
+            if not future.cancelled():
+                future.exception()  # Retrieved: JobCancelled from the stage is expected here
+            raise
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            progress = dict(self.progress)
+        finished = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "cancel_requested": self.cancel_requested,
+            "params": self.params,
+            "progress": progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(finished - self.started_at, 3) if self.started_at else None
+        }
+
+
+class JobManager:
+    """
+    Runs jobs as asyncio tasks, at most `concurrency` at a time, and keeps a
+    bounded history of finished jobs for status queries.
+
+    Args:
+        concurrency (int): Jobs allowed to run at once.
+        history_size (int): Finished jobs kept before the oldest are forgotten.
+    """
+
+    def __init__(self, concurrency: int = JOB_CONCURRENCY, history_size: int = JOB_HISTORY_SIZE):
+        self.concurrency = max(1, concurrency)
+        self.history_size = history_size
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def submit(self, kind: str, work: Callable[[Job], Awaitable[Any]], params: Dict[str, Any] = None) -> Job:
+        """
+        Schedules `work(job)` on the running event loop and returns immediately.
+
+        Args:
+            kind (str): Job type, reported back in the status.
+            work (Callable): Coroutine function receiving the Job, for progress reporting.
+            params (dict): Parameters to echo in the status.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+
+        job = Job(kind, params)
+        self._jobs[job.id] = job
+        self._forget_finished()
+        job.task = asyncio.create_task(self._run(job, work), name=f"job-{kind}-{job.id}")
+        return job
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[Any]]) -> None:
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.started_at = time.time()
+                logger.info(f"▶️ Job {job.id} ({job.kind}) started")
+                job.result = await work(job)
+                job.status = SUCCEEDED
+                logger.info(f"✅ Job {job.id} ({job.kind}) finished")
+        except (asyncio.CancelledError, JobCancelled):
+            job.status = CANCELLED
+            logger.info(f"⏹️ Job {job.id} ({job.kind}) cancelled")
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            logger.error(f"❌ Job {job.id} ({job.kind}) failed", exc_info=e)
+        finally:
+            job.finished_at = time.time()
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Requests cancellation. A queued or awaiting job is cancelled right away;
+        a stage running in a worker thread stops at its next progress report.
+        Must be called from the event loop thread.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished_at is not None:
+            return job
+        job._cancel_requested.set()
+        if job.status == QUEUED:
+            # The task may not have started yet, in which case _run never records the outcome
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        if job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def shutdown(self) -> None:
+        """Cancels unfinished jobs and waits for their tasks to unwind."""
+        tasks = [job.task for job in self._jobs.values() if job.task is not None and not job.task.done()]
+        for job in self._jobs.values():
+            if job.finished_at is None:
+                job._cancel_requested.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
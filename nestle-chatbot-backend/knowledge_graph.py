@@ -0,0 +1,231 @@
+"""
+Page/entity knowledge graph for GraphRAG.
+
+Nodes are scraped pages plus the entities extracted from them: brands and
+products (from the site's /<brand>/<product> URL structure) and keywords
+(from page metadata). Edges are hyperlinks between pages, page -> entity
+mentions, and keyword co-occurrence on the same page. The graph is built with
+networkx once per corpus version; the weighted adjacency lists and PageRank
+scores are persisted next to the scraped content, so workers only rebuild it
+when the corpus changes. Retrieval expands BM25 seed pages through a bounded
+multi-hop traversal over the precomputed adjacency.
+"""
+
+import os
+import json
+import logging
+from pathlib import Path
+from itertools import combinations
+from urllib.parse import urlparse, unquote
+from collections import Counter, defaultdict
+from typing import List, Dict, Tuple, Optional, Iterable
+
+import networkx as nx
+from dotenv import load_dotenv
+
+from bm25_index import STOPWORDS
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GRAPH_CACHE_PATH = Path(os.getenv("GRAPH_CACHE_PATH", "./Scraped/knowledge_graph.json"))
+GRAPH_MAX_HOPS = int(os.getenv("GRAPH_MAX_HOPS", "2"))
+GRAPH_MAX_NEIGHBORS = int(os.getenv("GRAPH_MAX_NEIGHBORS", "16"))   # Fan-out per node during traversal
+GRAPH_MAX_VISITED = int(os.getenv("GRAPH_MAX_VISITED", "256"))      # Hard cap on nodes touched per query
+GRAPH_HOP_DECAY = float(os.getenv("GRAPH_HOP_DECAY", "0.5"))
+# Entities found on more than this share of pages (site navigation, filler words) carry no signal
+GRAPH_MAX_ENTITY_SHARE = float(os.getenv("GRAPH_MAX_ENTITY_SHARE", "0.5"))
+
+# First URL path segments that are site sections rather than brands
+SECTION_SEGMENTS = frozenset({"recipes", "recipe", "articles", "article", "news", "videos", "search", "user", "node"})
+
+# Relative weights of the edge kinds
+EDGE_WEIGHTS = {"link": 1.0, "mentions": 1.0, "cooccurs": 0.25}
+
+
+def page_node(url: str) -> str:
+    return f"page:{url.rstrip('/')}"
+
+
+def page_entities(item: Dict) -> List[str]:
+    """Extracts brand, product and keyword entity nodes from one scraped page."""
+    entities = []
+    segments = [unquote(s) for s in urlparse(item.get("url", "")).path.split("/") if s]
+    if segments and segments[0] not in SECTION_SEGMENTS:
+        entities.append(f"brand:{segments[0]}")
+        if len(segments) > 1:
+            entities.append(f"product:{segments[1]}")
+
+    for keyword in item.get("metadata", {}).get("keywords", []):
+        keyword = keyword.strip().lower()
+        if len(keyword) > 3 and keyword not in STOPWORDS:
+            entities.append(f"keyword:{keyword}")
+    return list(dict.fromkeys(entities))
+
+
+class KnowledgeGraph:
+    """
+    Weighted page/entity graph with precomputed adjacency and PageRank.
+
+    Adjacency lists hold (neighbor, transition weight) pairs, normalized per
+    node and ordered by weight x PageRank, so a traversal can take the best
+    `max_neighbors` of every node without sorting at query time.
+
+    Args:
+        adjacency (Dict): node -> [[neighbor, weight], ...].
+        pagerank (Dict): node -> PageRank score.
+        pages (List[str]): Page node of every corpus item, by position.
+    """
+
+    def __init__(self, adjacency: Dict[str, List[List]], pagerank: Dict[str, float], pages: List[str]):
+        self.adjacency = adjacency
+        self.pagerank = pagerank
+        self.pages = pages
+        self.page_positions = {node: position for position, node in enumerate(pages)}
+
+    @classmethod
+    def build(cls, items: List[Dict]) -> "KnowledgeGraph":
+        """Builds the graph and its PageRank from scraped page dicts."""
+        graph = nx.DiGraph()
+        pages = [page_node(item.get("url", "")) for item in items]
+        graph.add_nodes_from(pages, kind="page")
+
+        def connect(a: str, b: str, kind: str, weight: float = 1.0):
+            # Mentions and co-occurrence are symmetric; hyperlinks keep their direction
+            for u, v in ((a, b), (b, a)) if kind != "link" else ((a, b),):
+                w = graph[u][v]["weight"] if graph.has_edge(u, v) else 0.0
+                graph.add_edge(u, v, weight=w + EDGE_WEIGHTS[kind] * weight)
+
+        # Hyperlinks between pages of the corpus
+        known = set(pages)
+        for node, item in zip(pages, items):
+            for link in item.get("links", []):
+                target = page_node(link)
+                if target in known and target != node:
+                    connect(node, target, "link")
+
+        # Entities, skipping ones spread over most of the site
+        entities_by_page = [page_entities(item) for item in items]
+        document_frequency = Counter(e for entities in entities_by_page for e in entities)
+        max_pages = max(2, GRAPH_MAX_ENTITY_SHARE * len(items))
+        for node, entities in zip(pages, entities_by_page):
+            entities = [e for e in entities if document_frequency[e] <= max_pages]
+            for entity in entities:
+                connect(node, entity, "mentions")
+            keywords = [e for e in entities if e.startswith("keyword:")]
+            cooccurrence = Counter(combinations(sorted(keywords), 2))
+            for (a, b), count in cooccurrence.items():
+                connect(a, b, "cooccurs", count)
+
+        pagerank = nx.pagerank(graph, weight="weight") if graph.number_of_nodes() else {}
+
+        adjacency = {}
+        for node in graph.nodes:
+            edges = graph[node]
+            total = sum(data["weight"] for data in edges.values()) or 1.0
+            neighbors = [[nbr, data["weight"] / total] for nbr, data in edges.items()]
+            neighbors.sort(key=lambda e: e[1] * pagerank.get(e[0], 0.0), reverse=True)
+            adjacency[node] = neighbors
+
+        logger.info(
+            f"🕸️ Built knowledge graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges"
+        )
+        return cls(adjacency, pagerank, pages)
+
+    def save(self, path: Path, digest: str) -> None:
+        """Persists adjacency and PageRank, tagged with the corpus digest they were built from."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "digest": digest,
+                "pages": self.pages,
+                "pagerank": self.pagerank,
+                "adjacency": self.adjacency
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, digest: str) -> Optional["KnowledgeGraph"]:
+        """Loads a persisted graph if it was built from the same corpus version."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error("❌ Error loading knowledge graph", exc_info=e)
+            return None
+        if data.get("digest") != digest:
+            return None
+        return cls(data["adjacency"], data["pagerank"], data["pages"])
+
+    @classmethod
+    def for_corpus(cls, items: List[Dict], digest: str, path: Path = GRAPH_CACHE_PATH) -> "KnowledgeGraph":
+        """Returns the persisted graph for this corpus version, building and saving it when missing."""
+        if not items:
+            return cls({}, {}, [])
+        if digest:
+            graph = cls.load(path, digest)
+            if graph is not None and len(graph.pages) == len(items):
+                return graph
+
+        graph = cls.build(items)
+        if digest:
+            try:
+                graph.save(path, digest)
+            except Exception as e:
+                logger.error("❌ Error saving knowledge graph", exc_info=e)
+        return graph
+
+    def expand(self, seed_pages: Iterable[int], max_hops: int = GRAPH_MAX_HOPS,
+               max_neighbors: int = GRAPH_MAX_NEIGHBORS, max_visited: int = GRAPH_MAX_VISITED) -> List[Tuple[int, float]]:
+        """
+        Spreads relevance from seed pages through their neighborhood.
+
+        Each hop passes a node's score to its top `max_neighbors` neighbors in
+        proportion to the edge weight, damped by GRAPH_HOP_DECAY; traversal stops
+        after `max_hops` hops or once `max_visited` nodes have been reached. Page
+        scores are then weighted by PageRank, so well-connected pages win ties.
+
+        Args:
+            seed_pages (Iterable[int]): Corpus positions of the seed pages.
+
+        Returns:
+            List[Tuple[int, float]]: (corpus position, score) of reached non-seed pages, best first.
+        """
+        seeds = [self.pages[i] for i in seed_pages if 0 <= i < len(self.pages)]
+        if not seeds:
+            return []
+
+        scores: Dict[str, float] = defaultdict(float)
+        frontier = {node: 1.0 / len(seeds) for node in seeds}
+        visited = set(seeds)
+
+        for _ in range(max_hops):
+            next_frontier: Dict[str, float] = defaultdict(float)
+            for node, mass in frontier.items():
+                for neighbor, weight in self.adjacency.get(node, [])[:max_neighbors]:
+                    if neighbor not in visited and len(visited) >= max_visited:
+                        continue
+                    visited.add(neighbor)
+                    next_frontier[neighbor] += mass * weight * GRAPH_HOP_DECAY
+            for node, mass in next_frontier.items():
+                scores[node] += mass
+            frontier = next_frontier
+            if not frontier:
+                break
+
+        node_count = len(self.adjacency) or 1
+        seed_set = set(seeds)
+        ranked = [
+            (self.page_positions[node], mass * (self.pagerank.get(node, 0.0) * node_count) ** 0.5)
+            for node, mass in scores.items()
+            if node in self.page_positions and node not in seed_set
+        ]
+        ranked.sort(key=lambda x: x[1], reverse=True)
+        return ranked
@@ -0,0 +1,173 @@
+"""
+Process-resident knowledge store for GraphRAG.
+
+Loads the scraped corpus once, splits every page into token-bounded
+passages, indexes them for BM25 retrieval, and atomically swaps in a fresh
+snapshot when the backing JSON file changes on disk (mtime + content hash).
+Reloads triggered by readers run on a background thread; readers keep the
+current snapshot until the new one is ready.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from bm25_index import BM25Index
+from chunker import chunk_page
+from knowledge_graph import KnowledgeGraph
+from page_store import iter_pages, latest_crawl
+from metrics import stage_timer
+from content_cleaner import clean_pages, CONTENT_CLEANING_ENABLED
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Minimum number of seconds between two stat() checks of the backing file
+RELOAD_CHECK_INTERVAL = float(os.getenv("KNOWLEDGE_RELOAD_INTERVAL", "2.0"))
+
+
+class CorpusSnapshot:
+    """
+    Immutable view of one version of the corpus with precomputed fields.
+    Readers hold a reference to a snapshot, so a concurrent reload never
+    exposes a half-built corpus.
+    """
+
+    def __init__(self, items: List[Dict], source: Optional[Path] = None, digest: str = ""):
+        self.items = items
+        self.source = source
+        self.digest = digest
+        self.keywords: List[str] = []
+        # Retrieval units: chunks of page content with their parent page and offsets
+        self.passages: List[Dict] = []
+        self.page_passages: List[List[int]] = []  # Passage ids of every page
+        self.passage_ids: Dict[tuple, int] = {}  # (url, chunk index) -> passage id, to map vector hits back
+        passage_texts: List[str] = []
+
+        for position, item in enumerate(items):
+            keywords = " ".join(item.get("metadata", {}).get("keywords", []))
+            self.keywords.append(keywords.lower())
+            if not item.get("content") and item.get("description"):
+                item = {**item, "content": item["description"]}
+            self.page_passages.append([])
+            for chunk in chunk_page(item):
+                self.page_passages[position].append(len(self.passages))
+                self.passage_ids[(item.get("url", ""), chunk["index"])] = len(self.passages)
+                self.passages.append({
+                    "page": position,
+                    "title": item.get("title", ""),
+                    "url": item.get("url", ""),
+                    "content": chunk["text"],
+                    "start": chunk["start"],
+                    "end": chunk["end"]
+                })
+                passage_texts.append(f"{item.get('title', '')} {chunk['text']} {keywords}".lower())
+
+        # Inverted index over title + passage + keywords, built once per snapshot
+        self.bm25 = BM25Index(passage_texts)
+
+        # Page/entity graph for multi-hop expansion; reused from disk while the corpus is unchanged
+        self.graph = KnowledgeGraph.for_corpus(items, digest)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class KnowledgeStore:
+    """
+    Holds the current CorpusSnapshot and reloads it when the backing file changes.
+
+    If the configured path does not exist, the latest crawl (sharded JSONL
+    manifest or `scraped_content_*.json`) in the same directory is used instead, so new crawls are picked up without
+    reconfiguration.
+    """
+
+    def __init__(self, path: str, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._snapshot = CorpusSnapshot([])
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _resolve_path(self) -> Optional[Path]:
+        """Returns the configured file, or the newest crawl (manifest or JSON file) next to it."""
+        if self.path.is_file():
+            return self.path
+        return latest_crawl(self.path.parent)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reloads the corpus if the backing file's mtime and hash have changed.
+
+        Args:
+            force (bool): Skip the check interval and mtime shortcut.
+
+        Returns:
+            bool: True if a new snapshot was swapped in.
+        """
+        with self._lock:
+            return self._refresh_locked(force)
+
+    def _refresh_locked(self, force: bool = False) -> bool:
+        """Performs the reload check; the caller must hold the lock."""
+        self._last_check = time.monotonic()
+
+        path = self._resolve_path()
+        if path is None:
+            logger.warning(f"No knowledge file found for {self.path}")
+            return False
+
+        try:
+            mtime = path.stat().st_mtime
+            if not force and path == self._snapshot.source and mtime == self._mtime:
+                return False
+
+            raw = path.read_bytes()
+            digest = hashlib.sha1(raw).hexdigest()
+            if not force and path == self._snapshot.source and digest == self._snapshot.digest:
+                # Touched but unchanged: remember the new mtime and keep the snapshot
+                self._mtime = mtime
+                return False
+
+            # For sharded crawls the manifest carries every shard's hash, so its digest covers the data
+            with stage_timer("corpus_load"):
+                items = list(iter_pages(path))
+                if CONTENT_CLEANING_ENABLED:
+                    # Same cleaning as the indexer, so dense hits map onto identical chunks
+                    items, _ = clean_pages(items)
+                snapshot = CorpusSnapshot(items, path, digest)
+        except Exception as e:
+            logger.error("❌ Error loading graph JSON", exc_info=e)
+            return False
+
+        self._snapshot = snapshot
+        self._mtime = mtime
+        logger.info(f"✅ Loaded {len(snapshot)} graph items from {path}")
+        return True
+
+    def snapshot(self) -> CorpusSnapshot:
+        """
+        Returns the current snapshot immediately. Once the check interval has
+        elapsed, a reload check is started on a background thread and its
+        result is swapped in when ready; callers never wait on it.
+        """
+        if time.monotonic() - self._last_check >= self.check_interval and self._lock.acquire(blocking=False):
+            self._last_check = time.monotonic()
+            try:
+                threading.Thread(target=self._background_refresh, name="knowledge-reload", daemon=True).start()
+            except Exception:
+                self._lock.release()
+                raise
+        return self._snapshot
+
+    def _background_refresh(self) -> None:
+        """Runs a reload check, releasing the lock taken by `snapshot`."""
+        try:
+            self._refresh_locked()
+        finally:
+            self._lock.release()
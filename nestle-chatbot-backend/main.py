@@ -1,19 +1,70 @@
+import os
+import json
 import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, AsyncIterator, Callable, Awaitable
 from fastapi.middleware.cors import CORSMiddleware
 
-from scraper import save_to_blob, scrape_website, save_locally
+from scraper import save_to_blob, scrape_website, scrape_incremental, save_locally
 from indexer_service import index_scraped_content
-from openai_service import generate_response
-from search_service import AzureSearchService
-from graphRAG import graph_rag_response
+from openai_service import (
+    generate_response, stream_response, generate_embeddings, history_store,
+    get_session_history, embedding_cache, embedding_backend
+)
+from search_service import aget_search_service, close_search_service
+from query_cache import QueryCache, current_index_generation
+from graphRAG import (
+    graph_rag_response, graph_rag_stream, knowledge_store, retriever, NO_FACTS_MESSAGE, GRAPHRAG_RETRIEVAL
+)
+from hybrid_retriever import RETRIEVAL_MODES
+from semantic_cache import SemanticAnswerCache, SEMANTIC_CACHE_ENABLED
+from jobs import JobManager, Job
+from metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware, register_cache_metrics, stage_timer
 
 import uvicorn
 
+# Default search backend for /search: "azure" (remote service) or "local" (in-process FAISS index)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "azure").lower()
+SEARCH_BACKENDS = ("azure", "local")
+
+# Result cache for /search, invalidated whenever indexing completes a new generation
+search_cache = QueryCache()
+
+# Paraphrase-tolerant answer cache for /chat and /graphrag
+answer_cache = SemanticAnswerCache()
+
+# Background runner for /scrape and /index so ingestion never blocks request handling
+job_manager = JobManager()
+
+# Hit/miss tallies of every cache, exposed on /metrics
+register_cache_metrics({"search": search_cache, "answers": answer_cache, "embeddings": embedding_cache})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Loads process-resident data once at startup and flushes pending writes on shutdown."""
+    await asyncio.to_thread(knowledge_store.refresh, True)
+    await asyncio.to_thread(embedding_backend.warm_up)  # Load the local embedding model, if configured
+    if SEARCH_BACKEND == "local" or GRAPHRAG_RETRIEVAL != "keyword":
+        await asyncio.to_thread(retriever.vector_index)  # Load the local FAISS index before traffic arrives
+    if SEARCH_BACKEND == "azure" and os.getenv("AZURE_SEARCH_ENDPOINT"):
+        # Open the pooled client and negotiate the API version before traffic arrives
+        try:
+            await aget_search_service()
+        except Exception as e:
+            # Azure Search being unreachable must not keep the app from starting
+            print(f"❌ Could not initialize Azure Search client: {e}")
+    yield
+    await job_manager.shutdown()  # Cancel ingestion jobs still running
+    history_store.close()  # Flush any chat history still queued for write-behind
+    await close_search_service()  # Whether it was created at startup or on first request
+
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS (Cross-Origin Resource Sharing)
 # Allow all origins, headers, and methods – modify in production for security
@@ -25,6 +76,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request latency histogram for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # -------------------------------
 # Request Models for API Endpoints
 # -------------------------------
@@ -32,12 +86,16 @@ app.add_middleware(
 class ChatRequest(BaseModel):
     """Request body model for chat endpoint."""
     message: str
+    session_id: Optional[str] = None  # Conversation id; omitted requests share the default session
+    retrieval: Optional[str] = None  # /graphrag seed retrieval: "keyword", "vector" or "hybrid"
 
 
 class SearchRequest(BaseModel):
     """Request body model for Azure Cognitive Search query."""
     query: str
     filter: Optional[str] = None  # Optional filter condition
+    mode: str = "keyword"  # "keyword", "vector" or "hybrid"
+    backend: Optional[str] = None  # "azure" or "local"; defaults to SEARCH_BACKEND
 
 
 class GraphQuery(BaseModel):
@@ -49,37 +107,156 @@ class GraphQuery(BaseModel):
 # API Endpoints
 # -------------------------------
 
-@app.post("/scrape")
-async def run_scraper():
+async def scrape_job(job: Job, incremental: bool) -> dict:
+    """Crawls the site on the event loop, then writes the crawl from a worker thread."""
+    delta = None
+    if incremental:
+        scraped_pages, delta = await scrape_incremental(progress=job.report)
+    else:
+        scraped_pages = await scrape_website(progress=job.report)
+    await job.run_blocking(save_locally, scraped_pages, delta)
+    # await asyncio.to_thread(save_to_blob, scraped_pages)  # Optional: Uncomment to enable Azure Blob upload
+    return {
+        "message": f"{len(scraped_pages)} pages scraped and saved.",
+        "delta": {k: len(v) for k, v in delta.items()} if delta else None
+    }
+
+
+async def index_job(job: Job, full: bool) -> dict:
+    """Runs the blocking embed-and-upload pipeline in a worker thread."""
+    summary = await job.run_blocking(index_scraped_content, full=full, progress=job.report)
+    return {"message": "Documents indexed in Azure Search.", **summary}
+
+
+def job_accepted(job: Job) -> dict:
+    return {"status": "accepted", "job_id": job.id, "status_url": f"/jobs/{job.id}"}
+
+
+@app.post("/scrape", status_code=202)
+async def run_scraper(incremental: bool = True):
     """
     Endpoint to scrape the 'Made With Nestlé' website.
     Saves scraped content locally (and optionally to Azure Blob).
+    With `incremental`, unchanged pages are skipped via conditional requests
+    and the added/changed/removed delta is reported and stored in the index file.
+    Runs as a background job; poll GET /jobs/{job_id} for progress and the result.
     """
-    try:
-        scraped_pages = asyncio.run(scrape_website())
-        save_locally(scraped_pages)
-        # save_to_blob(scraped_pages)  # Optional: Uncomment to enable Azure Blob upload
-        return {
-            "status": "success",
-            "message": f"{len(scraped_pages)} pages scraped and saved."
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    job = job_manager.submit("scrape", lambda job: scrape_job(job, incremental), {"incremental": incremental})
+    return job_accepted(job)
 
 
-@app.post("/index")
-async def run_indexer():
+@app.post("/index", status_code=202)
+async def run_indexer(full: bool = False):
     """
     Endpoint to index previously scraped content into Azure Cognitive Search.
+    Only pages added, changed or removed since the last run are processed unless `full` is set.
+    Runs as a background job; poll GET /jobs/{job_id} for progress and the result.
     """
-    try:
-        index_scraped_content()
-        return {
-            "status": "success",
-            "message": "Documents indexed in Azure Search."
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    job = job_manager.submit("index", lambda job: index_job(job, full), {"full": full})
+    return job_accepted(job)
+
+
+@app.get("/jobs")
+def list_jobs():
+    """
+    Lists queued, running and recently finished background jobs, newest first.
+    """
+    return job_manager.list()
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Reports a job's status, progress counters and, once finished, its result or error.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Cancels a queued or running job. A stage running in a worker thread stops at its next checkpoint.
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+# -------------------------------
+# Semantic Answer Cache Helpers
+# -------------------------------
+
+def corpus_version() -> str:
+    """Identifies the corpus answers were produced against (index generation + scraped file hash)."""
+    return f"{current_index_generation()}:{knowledge_store.snapshot().digest}"
+
+
+async def embed_question(question: str) -> list:
+    """Embeds a question for cache lookup off the event loop; empty when the cache is disabled."""
+    if not SEMANTIC_CACHE_ENABLED:
+        return []
+    return await asyncio.to_thread(generate_embeddings, question)
+
+
+async def conversation_context(session_id: Optional[str]) -> str:
+    """
+    Fingerprint of the session's history: cached answers are only reused in the same
+    conversational context, so a follow-up question never gets another session's answer.
+    """
+    return (await get_session_history(session_id)).fingerprint()
+
+
+async def record_cached_turn(session_id: Optional[str], question: str, answer: str) -> None:
+    """Keeps the session history consistent when an answer is served from the cache."""
+    message_history = await get_session_history(session_id)
+    message_history.add_message("user", question)
+    message_history.add_message("assistant", answer)
+
+
+async def answer_with_cache(namespace: str, request: ChatRequest, produce: Callable[[], Awaitable[str]]) -> str:
+    """Returns a cached answer for a paraphrased question, or produces and caches a new one."""
+    vector = await embed_question(request.message)
+    version = corpus_version()
+    context = await conversation_context(request.session_id)
+    if vector:
+        with stage_timer("answer_cache_lookup"):
+            cached = answer_cache.lookup(namespace, vector, version, context)
+        if cached is not None:
+            await record_cached_turn(request.session_id, request.message, cached)
+            return cached
+
+    answer = await produce()
+    if vector and answer != NO_FACTS_MESSAGE:
+        answer_cache.store(namespace, request.message, vector, answer, version, context)
+    return answer
+
+
+async def stream_with_cache(namespace: str, request: ChatRequest,
+                            produce: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+    """Streaming counterpart of answer_with_cache; a cached answer is sent as a single token."""
+    vector = await embed_question(request.message)
+    version = corpus_version()
+    context = await conversation_context(request.session_id)
+    if vector:
+        with stage_timer("answer_cache_lookup"):
+            cached = answer_cache.lookup(namespace, vector, version, context)
+        if cached is not None:
+            await record_cached_turn(request.session_id, request.message, cached)
+            yield cached
+            return
+
+    parts = []
+    async for token in produce():
+        parts.append(token)
+        yield token
+
+    answer = "".join(parts)
+    if vector and answer and answer != NO_FACTS_MESSAGE:
+        answer_cache.store(namespace, request.message, vector, answer, version, context)
 
 
 @app.post("/chat")
@@ -89,7 +266,10 @@ async def ask_chat(request: ChatRequest):
     Keeps track of chat history and appends user/assistant messages.
     """
     try:
-        response = generate_response(request.message)
+        response = await answer_with_cache(
+            "chat", request,
+            lambda: generate_response(request.message, session_id=request.session_id)
+        )
         
         if response.startswith("Error:"):
             raise HTTPException(
@@ -113,32 +293,142 @@ async def ask_chat(request: ChatRequest):
         )
 
 
+async def sse_events(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Wraps a token stream as Server-Sent Events.
+    Each token is sent as a JSON `data` event; the stream ends with `[DONE]`.
+    """
+    try:
+        async for token in tokens:
+            yield f"data: {json.dumps({'token': token})}\n\n"
+    except Exception as e:
+        print(f"Streaming error: {str(e)}")
+        yield f"event: error\ndata: {json.dumps({'detail': 'An unexpected error occurred'})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def sse_response(tokens: AsyncIterator[str]) -> StreamingResponse:
+    """Builds an un-buffered text/event-stream response."""
+    return StreamingResponse(
+        sse_events(tokens),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/chat/stream")
+async def stream_chat(request: ChatRequest):
+    """
+    Streaming variant of /chat: forwards NestleBOT's reply token by token via Server-Sent Events.
+    """
+    return sse_response(stream_with_cache(
+        "chat", request,
+        lambda: stream_response(request.message, session_id=request.session_id)
+    ))
+
+
+def validate_option(name: str, value: Optional[str], allowed: tuple) -> None:
+    if value is not None and value not in allowed:
+        raise HTTPException(status_code=400, detail=f"{name} must be one of: {', '.join(allowed)}")
+
+
+async def execute_search(request: SearchRequest, backend: str) -> dict:
+    """Runs a search against the given backend, bypassing the result cache."""
+    if backend == "local":
+        # Keyword and vector retrieval run concurrently in-process and are fused with RRF
+        return await retriever.search(request.query, request.filter, request.mode)
+
+    search_service = await aget_search_service()
+    if request.mode == "keyword":
+        return await search_service.search_documents(request.query, request.filter)
+
+    vector = await asyncio.to_thread(generate_embeddings, request.query)
+    if request.mode == "vector":
+        return await search_service.vector_search(vector, request.filter)
+    return await search_service.hybrid_search(request.query, vector, request.filter)
+
+
 @app.post("/search")
 async def run_search(request: SearchRequest):
     """
     Endpoint to search Azure Cognitive Search index for matching content.
+    With backend "local" (or SEARCH_BACKEND=local), the query is served from the in-process FAISS index.
     Returns ranked search results.
     """
+    validate_option("mode", request.mode, RETRIEVAL_MODES)
+    validate_option("backend", request.backend, SEARCH_BACKENDS)
+    backend = request.backend or SEARCH_BACKEND
     try:
-        results = AzureSearchService.search_documents(request.query, request.filter)
+        cache_mode = f"{backend}:{request.mode}"
+        results = search_cache.get(request.query, request.filter, cache_mode)
+        if results is None:
+            results = await execute_search(request, backend)
+            search_cache.put(request.query, request.filter, cache_mode, results)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/search/stats")
+def search_stats():
+    """
+    Returns hit ratio and occupancy of the /search result cache.
+    """
+    return search_cache.stats()
+
+
 @app.post("/graphrag")
 async def run_graphrag(request: ChatRequest):
     """
     Endpoint for Graph-based Retrieval-Augmented Generation (GraphRAG).
     Executes vector + graph-enhanced search logic with OpenAI.
+    Seed retrieval ("keyword", "vector" or "hybrid") can be chosen per request.
     """
+    validate_option("retrieval", request.retrieval, RETRIEVAL_MODES)
+    retrieval = request.retrieval or GRAPHRAG_RETRIEVAL
     try:
-        response = await graph_rag_response(request.message)
+        response = await answer_with_cache(
+            f"graphrag:{retrieval}", request,
+            lambda: graph_rag_response(request.message, request.session_id, retrieval)
+        )
         return {"response": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/graphrag/stream")
+async def stream_graphrag(request: ChatRequest):
+    """
+    Streaming variant of /graphrag: forwards the answer token by token via Server-Sent Events.
+    """
+    validate_option("retrieval", request.retrieval, RETRIEVAL_MODES)
+    retrieval = request.retrieval or GRAPHRAG_RETRIEVAL
+    return sse_response(stream_with_cache(
+        f"graphrag:{retrieval}", request,
+        lambda: graph_rag_stream(request.message, request.session_id, retrieval)
+    ))
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Returns hit/miss statistics for the search, semantic answer and embedding caches.
+    """
+    return {
+        "search": search_cache.stats(),
+        "answers": answer_cache.stats(),
+        "embeddings": embedding_cache.stats() if embedding_cache is not None else None
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Exposes request, pipeline stage, token, embedding, cache and scraper metrics in the Prometheus text format.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 def home():
     """
@@ -0,0 +1,290 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Counters, gauges and histograms are kept in a process-wide registry and
+rendered by `GET /metrics`. Pipeline stages are timed into one histogram,
+`nestle_stage_duration_seconds`, labelled by stage, so a slow answer can be
+attributed to corpus loading, retrieval, history I/O, the LLM call or Azure
+Search. Values are per process: with several uvicorn workers, Prometheus
+scrapes each worker and aggregates.
+"""
+
+import abc
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Callable, Iterator, Sequence
+
+# Latency buckets in seconds, wide enough for LLM calls and crawls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(abc.ABC):
+    """
+    Base of all metric types: a name, help text and a fixed set of label names.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): HELP text.
+        labelnames (Sequence[str]): Names of the labels every sample carries.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Sample lines of the metric in the text exposition format."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down; the latest `set` wins."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class CallbackCounter(Metric):
+    """
+    Counter read from existing state at scrape time, e.g. the hit/miss tallies
+    the caches already keep.
+
+    Args:
+        collect (Callable): Returns {label values tuple: current count}.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Dict[Tuple[str, ...], float]]):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in self.collect().items()
+        ]
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values over fixed cumulative buckets.
+
+    Args:
+        buckets (Sequence[float]): Upper bounds, ascending; +Inf is implied.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][position] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observes the wall-clock duration of the block, whether or not it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+        lines = []
+        for key, (counts, total) in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics, rendered together for a scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# -------------------------------
+# Metrics shared across modules
+# -------------------------------
+
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "nestle_stage_duration_seconds", "Duration of request pipeline stages.", ["stage"]
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "nestle_http_request_duration_seconds", "HTTP request duration, until the last body byte is sent.",
+    ["method", "route", "status"]
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "nestle_llm_tokens_total", "Chat completion tokens, as reported by the API.", ["direction"]
+))
+EMBEDDING_CALLS = REGISTRY.register(Counter(
+    "nestle_embedding_calls_total", "Embedding backend calls (one per batch).", ["backend", "result"]
+))
+EMBEDDING_INPUTS = REGISTRY.register(Counter(
+    "nestle_embedding_inputs_total", "Texts sent to the embedding backend.", ["backend"]
+))
+SCRAPER_PAGES = REGISTRY.register(Counter(
+    "nestle_scraper_pages_total", "Pages handled by the crawler.", ["result"]
+))
+SCRAPER_PAGES_PER_SECOND = REGISTRY.register(Gauge(
+    "nestle_scraper_pages_per_second", "Throughput of the most recent crawl."
+))
+
+
+def stage_timer(stage: str):
+    """Times a pipeline stage into nestle_stage_duration_seconds: `with stage_timer("fact_selection"): ...`"""
+    return STAGE_LATENCY.time(stage=stage)
+
+
+def register_cache_metrics(caches: Dict[str, object]) -> None:
+    """
+    Exposes the hit/miss tallies caches already keep as nestle_cache_lookups_total.
+
+    Args:
+        caches (Dict[str, object]): Cache name -> object with `hits` and `misses` attributes (None is skipped).
+    """
+    def collect() -> Dict[Tuple[str, ...], float]:
+        values = {}
+        for name, cache in caches.items():
+            if cache is not None:
+                values[(name, "hit")] = cache.hits
+                values[(name, "miss")] = cache.misses
+        return values
+
+    REGISTRY.register(CallbackCounter(
+        "nestle_cache_lookups_total", "Cache lookups by outcome.", ["cache", "result"], collect
+    ))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into nestle_http_request_duration_seconds.
+
+    Pure ASGI rather than BaseHTTPMiddleware so streaming responses are timed
+    until their last chunk, and labelled by route template (`/jobs/{job_id}`)
+    to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_LATENCY.observe(
+                time.perf_counter() - started,
+                method=scope.get("method", ""),
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"])
+            )
@@ -4,7 +4,7 @@ NestleBOT Chatbot - Azure OpenAI-based Assistant for Nestlé Canada
 This module defines a FastAPI-compatible chatbot service that interacts with 
 Azure OpenAI services to provide contextual answers about Nestlé products 
 available in Canada. It uses chat history (user + assistant messages) 
-for context retention and embeds basic prompt management and file-based history storage.
+for context retention and embeds basic prompt management and per-session history storage.
 
 Author: Ishan Pansuriya
 License: MIT
@@ -12,13 +12,24 @@ License: MIT
 
 import os
 import json
-from pathlib import Path
-from collections import deque
-from typing import List, Dict, Deque
+import asyncio
+import time
+import random
+import threading
+import hashlib
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Deque, Optional, Callable, AsyncIterator
 
 from dotenv import load_dotenv
 from fastapi import HTTPException
-from openai import AzureOpenAI
+from openai import AzureOpenAI, AsyncAzureOpenAI, APIStatusError, APIConnectionError, APITimeoutError
+
+from embedding_cache import EmbeddingCache
+from embedding_backends import EmbeddingBackend, SentenceTransformerBackend, EMBEDDING_BACKEND
+from history_store import HistoryStore
+from prompt_budget import assemble_messages
+from metrics import stage_timer, STAGE_LATENCY, LLM_TOKENS, EMBEDDING_CALLS, EMBEDDING_INPUTS
 
 # Load environment variables from .env
 load_dotenv()
@@ -28,108 +39,202 @@ AZURE_OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 AZURE_OPENAI_ENDPOINT = os.getenv("OPENAI_ENDPOINT", "https://c0903-mb86l1hp-eastus2.cognitiveservices.azure.com/")
 AZURE_DEPLOYMENT_NAME = os.getenv("OPENAI_DEPLOYMENT_NAME", "gpt-4.1")
 EMBEDDING_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-ada-002")
+EMBEDDING_DIMENSIONS = int(os.getenv("AZURE_OPENAI_EMBEDDING_DIMENSIONS", "1536"))
 API_VERSION = os.getenv("OPENAI_API_VERSION", "2024-12-01-preview")
 
-# Initialize the Azure OpenAI client
+# Batched embedding pipeline tuning
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "60000"))   # Token budget per request
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))         # Max inputs per request
+EMBEDDING_MAX_INPUT_TOKENS = int(os.getenv("EMBEDDING_MAX_INPUT_TOKENS", "8000"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+# Chat history: messages kept per session and number of sessions held in memory
+DEFAULT_SESSION = "default"
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "10"))
+MAX_RESIDENT_SESSIONS = int(os.getenv("MAX_RESIDENT_SESSIONS", "1000"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+# Initialize the Azure OpenAI clients: sync for batch embedding jobs, async for request-path chat calls
 client = AzureOpenAI(
     api_key=AZURE_OPENAI_KEY,
     api_version=API_VERSION,
     azure_endpoint=AZURE_OPENAI_ENDPOINT
 )
+async_client = AsyncAzureOpenAI(
+    api_key=AZURE_OPENAI_KEY,
+    api_version=API_VERSION,
+    azure_endpoint=AZURE_OPENAI_ENDPOINT
+)
+
+# Disk-backed embedding cache keyed by (deployment, text hash)
+embedding_cache = EmbeddingCache() if EMBEDDING_CACHE_ENABLED else None
 
 class MessageHistory:
     """
-    Manages the chat history to retain context over interactions with the assistant.
-    Saves and loads history from a JSON file.
+    Manages the chat history of one session to retain context over interactions with the assistant.
+    Held in memory as a bounded ring buffer; persistence is delegated to a write-behind HistoryStore.
     """
 
-    def __init__(self, max_messages: int = 10):
+    def __init__(self, max_messages: int = 10, session_id: str = DEFAULT_SESSION, store: Optional[HistoryStore] = None):
         self.max_messages = max_messages
+        self.session_id = session_id
+        self.store = store
         self.history: Deque[Dict] = deque(maxlen=max_messages)
-        self.history_file = Path("./Scraped/chat_history.json")
+        self.synced_id: Optional[int] = None  # Newest store row reflected in `history`
 
     def add_message(self, role: str, content: str) -> None:
-        """Adds a message to the history and saves it to disk."""
+        """Adds a message to the history and queues it for persistence."""
         self.history.append({"role": role, "content": content})
-        self._trim_history()
-        self._save_history()
+        if self.store is not None:
+            self.store.append(self.session_id, role, content)
 
     def get_history(self) -> List[Dict]:
         """Returns the message history."""
         return list(self.history)
 
+    def fingerprint(self) -> str:
+        """Hash of the current history; empty for a conversation with no turns yet."""
+        if not self.history:
+            return ""
+        return hashlib.sha1(json.dumps(list(self.history), sort_keys=True).encode("utf-8")).hexdigest()
+
     def clear_history(self) -> None:
         """Clears the message history."""
         self.history.clear()
-        self._save_history()
-
-    def _save_history(self) -> None:
-        """Saves the message history to a JSON file."""
-        with open(self.history_file, 'w') as f:
-            json.dump(list(self.history), f)
+        if self.store is not None:
+            self.store.clear(self.session_id)
 
     def load_history(self) -> None:
-        """Loads history from a JSON file, if it exists."""
-        if self.history_file.exists():
-            with open(self.history_file, 'r') as f:
-                history = json.load(f)
-                self.history.extend(history[-self.max_messages:])
+        """(Re)loads the session's latest persisted messages, if any. Blocking: SQLite I/O."""
+        if self.store is None:
+            return
+        self.store.flush()
+        synced_id = self.store.latest_id(self.session_id)
+        # Swapped in whole, so readers never see a half-loaded history
+        self.history = deque(self.store.read_recent(self.session_id, self.max_messages), maxlen=self.max_messages)
+        self.synced_id = synced_id
+
+    def revalidate(self) -> bool:
+        """
+        Reloads the history if the store has messages this copy has not seen, e.g.
+        turns of the same session served by another worker. Blocking: SQLite I/O.
+
+        Returns:
+            bool: True if the history was reloaded.
+        """
+        if self.store is None or self.store.latest_id(self.session_id) == self.synced_id:
+            return False
+        self.load_history()
+        return True
+
+
+# Write-behind persistence shared by all sessions
+history_store = HistoryStore()
+
+# Resident session histories, least recently used first
+_sessions: "OrderedDict[str, MessageHistory]" = OrderedDict()
+
+
+async def get_session_history(session_id: Optional[str] = None) -> MessageHistory:
+    """
+    Returns the in-memory history for a session, loading it from the store on first use.
+    At most MAX_RESIDENT_SESSIONS histories are kept in memory (LRU). A resident
+    history is revalidated against the store's newest message id on every use, so
+    turns written by another worker are picked up. Store I/O runs off the event loop.
+    """
+    session_id = session_id or DEFAULT_SESSION
+    message_history = _sessions.get(session_id)
+    if message_history is None:
+        message_history = MessageHistory(HISTORY_MAX_MESSAGES, session_id, history_store)
+        await asyncio.to_thread(message_history.load_history)
+        # Another request may have loaded the session meanwhile; keep a single copy
+        message_history = _sessions.setdefault(session_id, message_history)
+        while len(_sessions) > MAX_RESIDENT_SESSIONS:
+            _sessions.popitem(last=False)
+    else:
+        _sessions.move_to_end(session_id)
+        await asyncio.to_thread(message_history.revalidate)
+    return message_history
+
+
+# System prompt to guide assistant behavior
+SYSTEM_PROMPT = (
+    "You are NestleBOT, a digital assistant created to provide information "
+    "about Nestlé products available in Canada. Your purpose is to:\n"
+    "1. Offer details about product ingredients, features, and availability\n"
+    "2. Share approved recipes using Nestlé products\n"
+    "3. Provide general nutritional information\n"
+    "4. Maintain a friendly yet professional tone\n"
+    "5. Give concise responses (1-2 paragraphs maximum)\n"
+    "6. Always clarify when you don't have information\n\n"
+    "Important Rules:\n"
+    "- Never make claims about health benefits\n"
+    "- Direct users to official packaging for most accurate info\n"
+    "- Use Canadian product names and measurements\n"
+    "- When unsure, suggest contacting Nestlé Canada directly"
+)
 
-    def _trim_history(self):
-        """Keeps only the latest 10 messages (5 user-assistant pairs)."""
-        while len(self.history) > self.max_messages:
-            self.history.popleft()
+# Sampling parameters shared by the blocking and streaming chat calls
+COMPLETION_PARAMS = {
+    "max_tokens": 800,
+    "temperature": 0.7,
+    "top_p": 0.95
+}
 
 
-def generate_response(prompt: str, context_info: str = "") -> str:
+async def _start_turn(prompt: str, context_info: str = "", session_id: Optional[str] = None,
+                      facts: Optional[List[str]] = None) -> tuple:
+    """
+    Assembles the completion messages within the prompt token budget, then
+    records the user message. Only the question is kept in the history;
+    facts are sent with the current turn alone.
+
+    Returns:
+        tuple: (history, messages) for the completion call.
+    """
+    with stage_timer("history_load"):
+        message_history = await get_session_history(session_id)
+
+    facts = list(facts or []) + ([context_info] if context_info else [])
+    with stage_timer("prompt_assembly"):
+        messages, _ = assemble_messages(SYSTEM_PROMPT, message_history.get_history(), prompt, facts)
+
+    message_history.add_message("user", prompt)
+    return message_history, messages
+
+
+def _record_usage(usage) -> None:
+    """Counts the prompt and completion tokens reported for a chat completion."""
+    if usage is None:
+        return
+    LLM_TOKENS.inc(usage.prompt_tokens or 0, direction="prompt")
+    LLM_TOKENS.inc(usage.completion_tokens or 0, direction="completion")
+
+
+async def generate_response(prompt: str, context_info: str = "", session_id: Optional[str] = None,
+                            facts: Optional[List[str]] = None) -> str:
     """
     Generates a response from the assistant based on the provided prompt and optional context.
 
     Args:
         prompt (str): The user question or instruction.
         context_info (str): Optional additional context to prepend.
+        session_id (str): Conversation whose history is used and extended.
+        facts (List[str]): Retrieved facts, most relevant first; trimmed to the token budget.
 
     Returns:
         str: The assistant's reply.
     """
     try:
-        message_history = MessageHistory(max_messages=10)
-        message_history.load_history()
-
-        user_input = f"Context: {context_info}\n\nQuestion: {prompt}" if context_info else prompt
-        message_history.add_message("user", user_input)
-
-        # System prompt to guide assistant behavior
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "You are NestleBOT, a digital assistant created to provide information "
-                    "about Nestlé products available in Canada. Your purpose is to:\n"
-                    "1. Offer details about product ingredients, features, and availability\n"
-                    "2. Share approved recipes using Nestlé products\n"
-                    "3. Provide general nutritional information\n"
-                    "4. Maintain a friendly yet professional tone\n"
-                    "5. Give concise responses (1-2 paragraphs maximum)\n"
-                    "6. Always clarify when you don't have information\n\n"
-                    "Important Rules:\n"
-                    "- Never make claims about health benefits\n"
-                    "- Direct users to official packaging for most accurate info\n"
-                    "- Use Canadian product names and measurements\n"
-                    "- When unsure, suggest contacting Nestlé Canada directly"
-                )
-            }
-        ]
-
-        messages.extend(message_history.get_history())
-
-        response = client.chat.completions.create(
-            model=AZURE_DEPLOYMENT_NAME,
-            messages=messages,
-            max_tokens=800,
-            temperature=0.7,
-            top_p=0.95
-        )
+        message_history, messages = await _start_turn(prompt, context_info, session_id, facts)
+
+        with stage_timer("llm_completion"):
+            response = await async_client.chat.completions.create(
+                model=AZURE_DEPLOYMENT_NAME,
+                messages=messages,
+                **COMPLETION_PARAMS
+            )
+        _record_usage(response.usage)
 
         assistant_reply = response.choices[0].message.content
         message_history.add_message("assistant", assistant_reply)
@@ -142,9 +247,74 @@ def generate_response(prompt: str, context_info: str = "") -> str:
         )
 
 
+async def stream_response(prompt: str, context_info: str = "", session_id: Optional[str] = None,
+                          facts: Optional[List[str]] = None) -> AsyncIterator[str]:
+    """
+    Streams the assistant's reply token by token as the model produces it.
+    The full reply is added to the history once the stream completes.
+
+    Args:
+        prompt (str): The user question or instruction.
+        context_info (str): Optional additional context to prepend.
+        session_id (str): Conversation whose history is used and extended.
+        facts (List[str]): Retrieved facts, most relevant first; trimmed to the token budget.
+
+    Yields:
+        str: Content deltas of the assistant's reply.
+    """
+    message_history, messages = await _start_turn(prompt, context_info, session_id, facts)
+
+    started = time.perf_counter()
+    stream = await async_client.chat.completions.create(
+        model=AZURE_DEPLOYMENT_NAME,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},  # Final chunk carries the token usage
+        **COMPLETION_PARAMS
+    )
+
+    parts = []
+    async for chunk in stream:
+        _record_usage(chunk.usage)
+        # Azure sends content-filter and usage chunks with no choices; skip them
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            if not parts:
+                STAGE_LATENCY.observe(time.perf_counter() - started, stage="llm_first_token")
+            parts.append(delta)
+            yield delta
+    STAGE_LATENCY.observe(time.perf_counter() - started, stage="llm_stream")
+
+    message_history.add_message("assistant", "".join(parts))
+
+
+def _embed_with_metrics(texts: List[str], stage: str) -> List[list]:
+    """Calls the embedding backend, recording its latency under `stage` and the call outcome."""
+    backend = embedding_backend.name
+    try:
+        with stage_timer(stage):
+            vectors = embedding_backend.embed_batch(texts)
+    except Exception:
+        EMBEDDING_CALLS.inc(backend=backend, result="error")
+        raise
+    EMBEDDING_CALLS.inc(backend=backend, result="ok")
+    EMBEDDING_INPUTS.inc(len(texts), backend=backend)
+    return vectors
+
+
+def embedding_input(text: str) -> str:
+    """
+    The exact string sent to the embedding backend (and used as the cache key):
+    empty texts become a space and long ones are cut to EMBEDDING_MAX_INPUT_TOKENS.
+    """
+    return (text or " ")[:EMBEDDING_MAX_INPUT_TOKENS * 4]
+
+
 def generate_embeddings(text: str) -> list:
     """
-    Generates text embeddings using Azure OpenAI.
+    Generates text embeddings with the configured backend (Azure OpenAI by default).
 
     Args:
         text (str): The input text.
@@ -152,12 +322,134 @@ def generate_embeddings(text: str) -> list:
     Returns:
         list: Embedding vector.
     """
+    text = embedding_input(text)
     try:
-        response = client.embeddings.create(
-            input=text,
-            model=EMBEDDING_DEPLOYMENT
-        )
-        return response.data[0].embedding
+        if embedding_cache is not None:
+            cached = embedding_cache.get(embedding_backend.name, text)
+            if cached is not None:
+                return cached
+
+        vector = _embed_with_metrics([text], "embedding_query")[0]
+        if embedding_cache is not None:
+            embedding_cache.put(embedding_backend.name, text, vector)
+        return vector
     except Exception as e:
         print(f"Error generating embeddings: {str(e)}")
         return []
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def _batch_inputs(texts: List[str]) -> List[List[int]]:
+    """Groups input positions into batches under the per-request token and size limits."""
+    batches, current, current_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = min(estimate_tokens(text), EMBEDDING_MAX_INPUT_TOKENS)
+        if current and (current_tokens + tokens > EMBEDDING_BATCH_TOKENS or len(current) >= EMBEDDING_BATCH_SIZE):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _is_retryable(error: Exception) -> bool:
+    """429s, 5xx responses and transport failures are worth retrying."""
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _embed_batch(inputs: List[str]) -> List[list]:
+    """Sends one Azure OpenAI embeddings request, retrying throttling and server errors with backoff."""
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        try:
+            response = client.embeddings.create(input=inputs, model=EMBEDDING_DEPLOYMENT)
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+        except Exception as e:
+            if attempt == EMBEDDING_MAX_RETRIES or not _is_retryable(e):
+                raise
+            # Honour Retry-After when the service sends it, else exponential backoff with jitter
+            retry_after = None
+            if isinstance(e, APIStatusError):
+                retry_after = e.response.headers.get("retry-after")
+            delay = float(retry_after) if retry_after else min(2 ** attempt, 30) + random.random()
+            print(f"Embedding batch failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+class AzureOpenAIEmbeddingBackend(EmbeddingBackend):
+    """Embeddings from the Azure OpenAI deployment, with retries and concurrent batches."""
+
+    name = EMBEDDING_DEPLOYMENT
+    dimensions = EMBEDDING_DIMENSIONS
+    max_concurrency = max(1, EMBEDDING_CONCURRENCY)
+
+    def embed_batch(self, texts: List[str]) -> List[list]:
+        return _embed_batch(texts)
+
+
+def create_embedding_backend(kind: str = EMBEDDING_BACKEND) -> EmbeddingBackend:
+    """Instantiates the embedding backend selected by EMBEDDING_BACKEND ("azure" or "local")."""
+    if kind == "local":
+        return SentenceTransformerBackend()
+    if kind == "azure":
+        return AzureOpenAIEmbeddingBackend()
+    raise Exception(f"Unsupported embedding backend: {kind}")
+
+
+# Backend used by every embedding call in the app
+embedding_backend = create_embedding_backend()
+
+
+def generate_embeddings_batch(texts: List[str], progress: Optional[Callable[[int], None]] = None) -> List[Optional[list]]:
+    """
+    Generates embeddings for many texts using batched, concurrent requests.
+
+    Args:
+        texts (List[str]): Input texts.
+        progress (Callable): Called with the number of texts embedded so far before
+            each request; it may raise to abort (e.g. when a background job is cancelled).
+
+    Returns:
+        List[Optional[list]]: One vector per input, or None where embedding failed.
+    """
+    inputs = [embedding_input(text) for text in texts]
+    vectors: List[Optional[list]] = [None] * len(texts)
+
+    # Serve what we can from the cache; only the misses go to the API
+    if embedding_cache is not None:
+        for i, vector in embedding_cache.get_many(embedding_backend.name, inputs).items():
+            vectors[i] = vector
+    pending = [i for i, vector in enumerate(vectors) if vector is None]
+
+    embedded = [len(texts) - len(pending)]  # Cache hits count as done
+    embedded_lock = threading.Lock()
+
+    def run(batch: List[int]) -> None:
+        if progress is not None:
+            progress(embedded[0])  # Cancellation checkpoint: raises out of pool.map
+        try:
+            batch_inputs = [inputs[pending[j]] for j in batch]
+            batch_vectors = _embed_with_metrics(batch_inputs, "embedding_batch")
+            for j, vector in zip(batch, batch_vectors):
+                vectors[pending[j]] = vector
+            with embedded_lock:
+                embedded[0] += len(batch)
+            if embedding_cache is not None:
+                embedding_cache.put_many(embedding_backend.name, batch_inputs, batch_vectors)
+        except Exception as e:
+            print(f"Error generating embeddings for batch of {len(batch)}: {str(e)}")
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=embedding_backend.max_concurrency) as pool:
+            list(pool.map(run, _batch_inputs([inputs[i] for i in pending])))
+
+    return vectors
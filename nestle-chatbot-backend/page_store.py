@@ -0,0 +1,183 @@
+"""
+Streaming, sharded storage for scraped pages.
+
+A crawl is written as JSON Lines split into size-bounded shards, optionally
+gzip- or zstd-compressed, plus a manifest holding a byte-offset index by URL:
+
+    scraped_content_<ts>-000.jsonl[.gz|.zst]
+    scraped_content_<ts>-001.jsonl[.gz|.zst]
+    scraped_content_<ts>.manifest.json
+
+Readers iterate pages one line at a time, so memory stays constant as the
+crawl grows, and `get_page` seeks straight to a single record. Legacy
+single-file `scraped_content_<ts>.json` crawls are still readable.
+"""
+
+import io
+import os
+import gzip
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterator, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+try:
+    import zstandard
+except ImportError:  # Optional: only needed for SCRAPED_COMPRESSION=zstd
+    zstandard = None
+
+SCRAPED_COMPRESSION = os.getenv("SCRAPED_COMPRESSION", "gzip").lower()  # "none", "gzip" or "zstd"
+SCRAPED_SHARD_BYTES = int(os.getenv("SCRAPED_SHARD_BYTES", str(16 * 1024 * 1024)))
+
+SHARD_SUFFIXES = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def _open_write(path: Path, compression: str):
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise Exception("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=10).stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+def _open_read(path: Path, compression: str):
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise Exception("zstd compression requires the 'zstandard' package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    return open(path, "rb")
+
+
+def write_pages(pages: Iterable[Dict], data_dir: Path, timestamp: int,
+                compression: str = SCRAPED_COMPRESSION, shard_bytes: int = SCRAPED_SHARD_BYTES) -> Path:
+    """
+    Writes page dicts as sharded JSON Lines and returns the manifest path.
+
+    Offsets in the manifest are positions in the uncompressed shard stream.
+    """
+    if compression not in SHARD_SUFFIXES:
+        raise Exception(f"Unsupported compression: {compression}")
+
+    data_dir = Path(data_dir)
+    suffix = SHARD_SUFFIXES[compression]
+    shards: List[Dict] = []
+    offsets: Dict[str, List[int]] = {}
+    writer = None
+    position = 0
+    digest = None
+
+    def close_shard():
+        if writer is not None:
+            writer.close()
+            shards[-1].update({"bytes": position, "sha1": digest.hexdigest()})
+
+    try:
+        for page in pages:
+            line = (json.dumps(page, ensure_ascii=False) + "\n").encode("utf-8")
+            if writer is None or (position > 0 and position + len(line) > shard_bytes):
+                close_shard()
+                name = f"scraped_content_{timestamp}-{len(shards):03d}{suffix}"
+                writer = _open_write(data_dir / name, compression)
+                shards.append({"file": name})
+                position = 0
+                digest = hashlib.sha1()
+            writer.write(line)
+            digest.update(line)
+            offsets[page.get("url", "")] = [len(shards) - 1, position, len(line)]
+            position += len(line)
+    finally:
+        close_shard()
+
+    manifest_path = data_dir / f"scraped_content_{timestamp}{MANIFEST_SUFFIX}"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "format": "jsonl",
+            "compression": compression,
+            "pageCount": len(offsets),
+            "shards": shards,
+            "offsets": offsets
+        }, f)
+    return manifest_path
+
+
+def crawl_timestamp(path: Path) -> Optional[int]:
+    """Extracts the crawl timestamp from a legacy JSON file or a manifest path."""
+    name = path.name
+    if name.endswith(MANIFEST_SUFFIX):
+        name = name[:-len(MANIFEST_SUFFIX)]
+    elif name.endswith(".json"):
+        name = name[:-len(".json")]
+    else:
+        return None
+    stamp = name.split("_")[-1]
+    return int(stamp) if stamp.isdigit() else None
+
+
+def latest_crawl(data_dir: Path) -> Optional[Path]:
+    """Returns the newest crawl (manifest or legacy JSON file) in a directory."""
+    candidates = [
+        f for f in Path(data_dir).glob("scraped_content_*.json")
+        if f.is_file() and crawl_timestamp(f) is not None
+    ]
+    if not candidates:
+        return None
+    # Prefer the manifest when both formats exist for one timestamp
+    return max(candidates, key=lambda f: (crawl_timestamp(f), f.name.endswith(MANIFEST_SUFFIX)))
+
+
+def _load_manifest(path: Path) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_pages(path: Path) -> Iterator[Dict]:
+    """
+    Yields the page dicts of a crawl one at a time.
+
+    Args:
+        path (Path): A crawl manifest, or a legacy single-file JSON crawl.
+    """
+    path = Path(path)
+    if not path.name.endswith(MANIFEST_SUFFIX):
+        # Legacy format: one JSON array, has to be parsed whole
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    manifest = _load_manifest(path)
+    for shard in manifest["shards"]:
+        with _open_read(path.parent / shard["file"], manifest["compression"]) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def get_page(path: Path, url: str) -> Optional[Dict]:
+    """Random access to one page through the manifest's byte-offset index."""
+    path = Path(path)
+    if not path.name.endswith(MANIFEST_SUFFIX):
+        return next((page for page in iter_pages(path) if page.get("url") == url), None)
+
+    manifest = _load_manifest(path)
+    location = manifest["offsets"].get(url)
+    if location is None:
+        return None
+
+    shard_index, offset, length = location
+    shard = manifest["shards"][shard_index]
+    with _open_read(path.parent / shard["file"], manifest["compression"]) as f:
+        # Compressed streams seek by decompressing forward; plain files seek directly
+        if manifest["compression"] == "zstd":
+            f.read(offset)
+        else:
+            f.seek(offset)
+        return json.loads(f.read(length))
@@ -0,0 +1,179 @@
+"""
+Token budget manager for chat prompt assembly.
+
+Every completion request is assembled from four parts: the system prompt,
+the session history, retrieved facts and the current question. Tokens are
+counted with the chat model's tokenizer (tiktoken) and a fixed input budget is
+shared out between the parts. When they do not fit, the lowest-value content
+goes first: the lowest-ranked facts are dropped (the last one that partly
+fits is truncated), and the oldest history turns are dropped and replaced by
+a one-line extractive summary of what the user asked earlier.
+"""
+
+import os
+import re
+from typing import List, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+try:
+    import tiktoken
+except ImportError:  # Fallback: word/punctuation count, close to BPE counts for English prose
+    tiktoken = None
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))      # Input tokens per completion request
+PROMPT_FACTS_SHARE = float(os.getenv("PROMPT_FACTS_SHARE", "0.6"))       # Share of the flexible budget for facts
+PROMPT_MIN_FACT_TOKENS = int(os.getenv("PROMPT_MIN_FACT_TOKENS", "48"))  # Shorter remnants are dropped, not truncated
+PROMPT_SUMMARY_TOKENS = int(os.getenv("PROMPT_SUMMARY_TOKENS", "80"))    # Cap on the summary of dropped history
+PROMPT_ENCODING = os.getenv("PROMPT_ENCODING", "o200k_base")             # Tokenizer of the gpt-4.1 family
+
+# Fixed per-message cost of the chat format (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TOKEN_SPAN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding(PROMPT_ENCODING)
+        except ValueError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Counts the tokens of `text` with the chat model's tokenizer."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(TOKEN_SPAN_PATTERN.findall(text or ""))
+    return len(encoding.encode(text or "", disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts `text` down to its first `max_tokens` tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        spans = [m.span() for m in TOKEN_SPAN_PATTERN.finditer(text)]
+        return text if len(spans) <= max_tokens else text[:spans[max_tokens - 1][1]]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+def message_tokens(message: Dict) -> int:
+    return count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def format_user_turn(question: str, facts: List[str]) -> str:
+    """The current user message: selected facts (if any) followed by the question."""
+    if not facts:
+        return question
+    return "Facts:\n" + "\n\n".join(facts) + f"\n\nQuestion: {question}"
+
+
+def _summarize_dropped(messages: List[Dict], max_tokens: int) -> Optional[Dict]:
+    """Extractive summary of dropped history: the first sentence of each earlier user question."""
+    questions = []
+    for message in messages:
+        if message["role"] == "user":
+            first_sentence = re.split(r"(?<=[.?!])\s", message["content"].strip(), maxsplit=1)[0]
+            questions.append(first_sentence)
+    if not questions or max_tokens <= MESSAGE_OVERHEAD_TOKENS:
+        return None
+    text = truncate_to_tokens("Earlier in this conversation the user asked: " + " | ".join(questions),
+                              max_tokens - MESSAGE_OVERHEAD_TOKENS)
+    return {"role": "system", "content": text}
+
+
+def assemble_messages(system_prompt: str, history: List[Dict], question: str, facts: Optional[List[str]] = None,
+                      budget: int = PROMPT_TOKEN_BUDGET, facts_share: float = PROMPT_FACTS_SHARE) -> Tuple[List[Dict], Dict]:
+    """
+    Builds the messages of a completion request within a token budget.
+
+    The system prompt and the question are always sent. The rest of the budget
+    is split between facts (`facts_share`) and history, and whatever one side
+    leaves unused goes to the other. Facts are kept in rank order; history is
+    kept newest first, with dropped turns summarized in one line.
+
+    Args:
+        system_prompt (str): Assistant instructions.
+        history (List[Dict]): Previous turns of the session, oldest first.
+        question (str): The current user question.
+        facts (List[str]): Retrieved facts, most relevant first.
+        budget (int): Total input tokens allowed.
+        facts_share (float): Share of the flexible budget reserved for facts.
+
+    Returns:
+        Tuple[List[Dict], Dict]: The messages, and token counts per part plus what was dropped.
+    """
+    facts = facts or []
+    system_message = {"role": "system", "content": system_prompt}
+    fixed = message_tokens(system_message) + message_tokens({"content": question})
+    flexible = max(0, budget - fixed)
+
+    history_tokens = [message_tokens(m) for m in history]
+    fact_tokens = [count_tokens(f) + 2 for f in facts]  # + separator
+    facts_wanted = sum(fact_tokens) + (count_tokens("Facts:\nQuestion: ") if facts else 0)
+
+    # Split the flexible budget, handing each side's unused share to the other
+    facts_budget = int(flexible * facts_share) if facts else 0
+    history_budget = flexible - facts_budget
+    if facts_wanted < facts_budget:
+        history_budget += facts_budget - facts_wanted
+        facts_budget = facts_wanted
+    history_wanted = sum(history_tokens)
+    if history_wanted < history_budget:
+        facts_budget += history_budget - history_wanted
+        history_budget = history_wanted
+
+    # Facts: best first, truncate the one that straddles the limit, drop the rest
+    kept_facts = []
+    remaining = facts_budget - (count_tokens("Facts:\nQuestion: ") if facts else 0)
+    for fact, tokens in zip(facts, fact_tokens):
+        if tokens <= remaining:
+            kept_facts.append(fact)
+            remaining -= tokens
+        elif remaining >= PROMPT_MIN_FACT_TOKENS:
+            kept_facts.append(truncate_to_tokens(fact, remaining - 2))
+            remaining = 0
+        else:
+            break
+
+    # History: newest turns first; everything older is summarized
+    kept_history: List[Dict] = []
+    remaining = history_budget
+    cut = len(history)
+    for i in range(len(history) - 1, -1, -1):
+        if history_tokens[i] > remaining:
+            break
+        kept_history.insert(0, history[i])
+        remaining -= history_tokens[i]
+        cut = i
+    if kept_history and kept_history[0]["role"] == "assistant":
+        # Never start the kept window with an orphaned reply
+        remaining += message_tokens(kept_history.pop(0))
+        cut += 1
+    summary = _summarize_dropped(history[:cut], min(remaining, PROMPT_SUMMARY_TOKENS)) if cut else None
+
+    user_message = {"role": "user", "content": format_user_turn(question, kept_facts)}
+    messages = [system_message] + ([summary] if summary else []) + kept_history + [user_message]
+
+    stats = {
+        "budget": budget,
+        "system": message_tokens(system_message),
+        "history": sum(message_tokens(m) for m in kept_history) + (message_tokens(summary) if summary else 0),
+        "facts": count_tokens(format_user_turn("", kept_facts)) if kept_facts else 0,
+        "question": message_tokens({"content": question}),
+        "dropped_history": cut,
+        "dropped_facts": len(facts) - len(kept_facts),
+        "truncated_fact": bool(kept_facts) and kept_facts[-1] != facts[len(kept_facts) - 1]
+    }
+    stats["total"] = sum(message_tokens(m) for m in messages)
+    return messages, stats
@@ -0,0 +1,179 @@
+"""
+Result cache for /search.
+
+Results are cached in-process (LRU + TTL) under a normalized
+(query, filter, mode) key, optionally backed by SQLite so several workers
+share hits. Every entry is tagged with the index generation it was computed
+against; `index_scraped_content` bumps the generation when it finishes, which
+invalidates all older entries at once.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "600"))
+QUERY_CACHE_DB = os.getenv("QUERY_CACHE_DB", "")  # Optional SQLite file shared across workers
+INDEX_GENERATION_PATH = Path(os.getenv("INDEX_GENERATION_PATH", "./Scraped/index_generation.json"))
+
+
+_generation_lock = threading.Lock()
+_generation_cache: Tuple[Optional[int], int] = (None, 0)
+
+
+def current_index_generation() -> int:
+    """Returns the current index generation, re-reading the file only when it changed."""
+    global _generation_cache
+    try:
+        mtime = INDEX_GENERATION_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+    cached_mtime, generation = _generation_cache
+    if mtime == cached_mtime:
+        return generation
+
+    try:
+        with open(INDEX_GENERATION_PATH, "r", encoding="utf-8") as f:
+            generation = int(json.load(f).get("generation", 0))
+    except Exception:
+        return generation
+    _generation_cache = (mtime, generation)
+    return generation
+
+
+def bump_index_generation() -> int:
+    """Marks a completed index build; all cached results from earlier generations become stale."""
+    with _generation_lock:
+        generation = current_index_generation() + 1
+        INDEX_GENERATION_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = INDEX_GENERATION_PATH.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation, "updatedAt": time.time()}, f)
+        os.replace(tmp_path, INDEX_GENERATION_PATH)
+        return generation
+
+
+def normalize_key(query: str, filter_expr: Optional[str], mode: str) -> str:
+    """Case- and whitespace-insensitive cache key."""
+    normalized_query = " ".join(query.lower().split())
+    normalized_filter = " ".join((filter_expr or "").split())
+    return json.dumps([normalized_query, normalized_filter, mode.lower()])
+
+
+class QueryCache:
+    """
+    LRU + TTL cache of search responses, invalidated by index generation.
+
+    Args:
+        max_entries (int): In-process capacity.
+        ttl (float): Seconds an entry stays valid.
+        db_path (str): Optional SQLite file for sharing entries across workers.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL, db_path: str = QUERY_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS query_results (
+                    key TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    def get(self, query: str, filter_expr: Optional[str], mode: str) -> Optional[Any]:
+        """Returns a cached response for the current index generation, or None."""
+        key = normalize_key(query, filter_expr, mode)
+        generation = current_index_generation()
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_generation, expires_at, value = entry
+                if entry_generation == generation and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT payload FROM query_results WHERE key = ? AND generation = ? AND expires_at > ?",
+                    (key, generation, now)
+                ).fetchone()
+                if row:
+                    value = json.loads(row[0])
+                    self._store_local(key, generation, now + self.ttl, value)
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, filter_expr: Optional[str], mode: str, value: Any) -> None:
+        """Caches a response under the current index generation."""
+        key = normalize_key(query, filter_expr, mode)
+        generation = current_index_generation()
+        expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._store_local(key, generation, expires_at, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_results VALUES (?, ?, ?, ?)",
+                    (key, generation, expires_at, json.dumps(value))
+                )
+                self._conn.execute(
+                    "DELETE FROM query_results WHERE generation < ? OR expires_at <= ?",
+                    (generation, time.time())
+                )
+                self._conn.commit()
+
+    def _store_local(self, key: str, generation: int, expires_at: float, value: Any) -> None:
+        self._entries[key] = (generation, expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM query_results")
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "generation": current_index_generation()
+        }
@@ -1,21 +1,45 @@
 import os
-import re
+import asyncio
 import json
 import time
+import gzip
+import hashlib
 import datetime
 from pathlib import Path
-from bs4 import BeautifulSoup
-from typing import List, Dict
-from azure.storage.blob import BlobServiceClient
+from urllib.parse import urlparse
+import itertools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Executor
+from typing import List, Dict, Set, Iterator, Callable
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
 from playwright.async_api import async_playwright
 from dotenv import load_dotenv
 
+from page_store import write_pages, iter_pages, latest_crawl
+from html_extract import extract_page_data
+from metrics import stage_timer, SCRAPER_PAGES, SCRAPER_PAGES_PER_SECOND
+
 load_dotenv()
 
 BASE_URL = 'https://www.madewithnestle.ca'
+# For local testing point this at Azurite, e.g. "UseDevelopmentStorage=true"
 STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING", "")
+BLOB_CONCURRENCY = int(os.getenv("BLOB_CONCURRENCY", "16"))
+BLOB_MAX_RETRIES = int(os.getenv("BLOB_MAX_RETRIES", "5"))
+BLOB_UPLOAD_MODE = os.getenv("BLOB_UPLOAD_MODE", "pages")  # "pages" or "bundle"
 CONTAINER_NAME = 'nestle-scraped-content'
 DATA_DIR = Path("./Scraped/")
+MANIFEST_PATH = DATA_DIR / "scrape_manifest.json"
+SCRAPED_FORMAT = os.getenv("SCRAPED_FORMAT", "jsonl").lower()  # "jsonl" (sharded) or legacy "json"
+
+# Crawler tuning: pages fetched in parallel, min delay between hits on one host, per-page limits
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "4"))
+HOST_DELAY_SECONDS = float(os.getenv("SCRAPER_HOST_DELAY", "0.25"))
+PAGE_TIMEOUT_MS = int(os.getenv("SCRAPER_PAGE_TIMEOUT_MS", "45000"))
+SETTLE_DELAY_MS = int(os.getenv("SCRAPER_SETTLE_DELAY_MS", "2000"))
+# Processes parsing HTML while the browser keeps fetching; 0 parses in a thread of this process instead
+PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", str(min(SCRAPER_CONCURRENCY, os.cpu_count() or 1))))
 
 # Ensure the data directory exists
 DATA_DIR.mkdir(exist_ok=True)
@@ -39,8 +63,252 @@ class ScrapedPage:
             "metadata": self.metadata,
         }
 
-async def scrape_website(limit_pages: int = 200) -> List[ScrapedPage]:
-    pages: List[ScrapedPage] = []
+class HostRateLimiter:
+    """Politeness limiter: enforces a minimum delay between requests to the same host."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._last_request: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def wait(self, url: str):
+        host = urlparse(url).netloc
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            elapsed = time.monotonic() - self._last_request.get(host, 0.0)
+            if elapsed < self.min_interval:
+                await asyncio.sleep(self.min_interval - elapsed)
+            self._last_request[host] = time.monotonic()
+
+
+def content_hash(page) -> str:
+    """Hashes a page's whitespace- and case-normalized text fields."""
+    data = page.to_dict() if isinstance(page, ScrapedPage) else page
+    parts = [
+        data.get("title", "") or "",
+        data.get("content", "") or "",
+        data.get("metadata", {}).get("description", "") or ""
+    ]
+    normalized = " ".join(" ".join(parts).lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class PageGone(Exception):
+    """The server reported the page as permanently gone (404 / 410)."""
+
+
+def compute_delta(pages: list, known_hashes: Dict[str, str], failed: Set[str] = None) -> Dict[str, List[str]]:
+    """
+    Compares pages against previously seen content hashes.
+
+    A known URL only counts as removed when the crawl no longer reaches it or
+    the server answered 404/410; URLs in `failed` (timeouts, 5xx, browser
+    errors) are reported separately and left untouched.
+
+    Args:
+        pages (list): ScrapedPage objects or page dicts from the current crawl.
+        known_hashes (Dict[str, str]): URL -> content hash from the previous run.
+        failed (Set[str]): URLs whose fetch failed transiently in this crawl.
+
+    Returns:
+        Dict[str, List[str]]: URLs grouped into added, changed, removed, unchanged and failed.
+    """
+    failed = failed or set()
+    delta = {"added": [], "changed": [], "removed": [], "unchanged": [], "failed": sorted(failed)}
+    seen = set()
+    for page in pages:
+        url = page.url if isinstance(page, ScrapedPage) else page.get("url", "")
+        seen.add(url)
+        digest = content_hash(page)
+        if url not in known_hashes:
+            delta["added"].append(url)
+        elif known_hashes[url] != digest:
+            delta["changed"].append(url)
+        else:
+            delta["unchanged"].append(url)
+    delta["removed"] = [url for url in known_hashes if url not in seen and url not in failed]
+    return delta
+
+
+class ScrapeManifest:
+    """
+    Per-URL record of HTTP validators (ETag / Last-Modified) and content hashes,
+    used to skip unchanged pages on re-scrape and to emit a change delta.
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict] = {}
+        self.failed: Set[str] = set()  # URLs whose fetch failed in the current crawl
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Returns If-None-Match / If-Modified-Since headers for a known URL."""
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("lastModified"):
+            headers["If-Modified-Since"] = entry["lastModified"]
+        return headers
+
+    def record_validators(self, url: str, headers: Dict[str, str]) -> None:
+        """Stores the validators returned with a fresh response."""
+        entry = self.entries.setdefault(url, {})
+        entry["etag"] = headers.get("etag", "")
+        entry["lastModified"] = headers.get("last-modified", "")
+
+    def apply(self, pages: List[ScrapedPage]) -> Dict[str, List[str]]:
+        """
+        Computes the delta against the stored hashes and updates the manifest in place.
+        Entries of URLs that failed to load are carried forward unchanged.
+        """
+        delta = compute_delta(pages, {url: e.get("hash", "") for url, e in self.entries.items()}, self.failed)
+        for page in pages:
+            self.entries.setdefault(page.url, {})["hash"] = content_hash(page)
+        for url in delta["removed"]:
+            self.entries.pop(url, None)
+        return delta
+
+    def save(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+
+
+def load_latest_local() -> Dict[str, ScrapedPage]:
+    """Loads the most recent local crawl, keyed by URL."""
+    latest = latest_crawl(DATA_DIR)
+    if latest is None:
+        return {}
+    return {page["url"]: ScrapedPage(**page) for page in iter_pages(latest)}
+
+
+def extract_page(url: str, html: str) -> ScrapedPage:
+    """Parses a rendered HTML document into a ScrapedPage."""
+    return ScrapedPage(**extract_page_data(url, html))
+
+
+async def _fetch_html(page, url: str):
+    """
+    Loads a URL and returns its rendered HTML with the response headers,
+    or (None, {}) if it redirected elsewhere. Raises PageGone on 404/410 and
+    an exception on any other error status.
+    """
+    response = await page.goto(url, timeout=PAGE_TIMEOUT_MS, wait_until="networkidle")
+    if response is not None and response.status in (404, 410):
+        raise PageGone(f"HTTP {response.status}")
+    if response is not None and response.status >= 400:
+        raise Exception(f"HTTP {response.status}")
+    if page.url != url:
+        print(f"Redirected to {page.url}, skipping.")
+        return None, {}
+    if SETTLE_DELAY_MS:
+        await page.wait_for_timeout(SETTLE_DELAY_MS)
+    return await page.content(), (response.headers if response else {})
+
+
+async def _not_modified(context, url: str, manifest: ScrapeManifest) -> bool:
+    """Issues a conditional HEAD request; True if the server answered 304."""
+    headers = manifest.conditional_headers(url)
+    if not headers:
+        return False
+    response = await context.request.head(url, headers=headers, timeout=PAGE_TIMEOUT_MS)
+    return response.status == 304
+
+
+async def _crawl_worker(context, queue: asyncio.Queue, results: Dict[int, ScrapedPage], limiter: HostRateLimiter,
+                        manifest: ScrapeManifest = None, previous: Dict[str, ScrapedPage] = None,
+                        progress: Callable[..., None] = None, parser: Executor = None, failed: Set[str] = None,
+                        crawled: Iterator[int] = None):
+    """
+    Pulls URLs off the queue and scrapes them with a dedicated page.
+    HTML is parsed in `parser` (the default thread pool when None), so other
+    workers keep driving the browser meanwhile. URLs that fail transiently
+    are added to `failed` and keep their copy from the previous crawl.
+    `crawled` is shared by all workers and numbers every URL taken off the
+    queue, whatever its outcome, for progress reporting.
+    """
+    failed = failed if failed is not None else set()
+    crawled = crawled or itertools.count(1)
+    loop = asyncio.get_running_loop()
+    previous = previous or {}
+    progress = progress or (lambda **counters: None)
+    page = await context.new_page()
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                queue.task_done()
+                return
+            position, url = item
+            try:
+                await limiter.wait(url)
+
+                # Reuse the previous crawl's copy when the server confirms it is unchanged
+                if manifest is not None and url in previous and await _not_modified(context, url, manifest):
+                    print(f"Not modified: {url}")
+                    results[position] = previous[url]
+                    SCRAPER_PAGES.inc(result="not_modified")
+                    continue
+
+                print(f"Scraping: {url}")
+                # Hard per-page budget covering navigation, settling and serialization
+                with stage_timer("scrape_fetch"):
+                    html, headers = await asyncio.wait_for(
+                        _fetch_html(page, url),
+                        timeout=(PAGE_TIMEOUT_MS + SETTLE_DELAY_MS) / 1000 + 5
+                    )
+                if html is not None:
+                    with stage_timer("scrape_extract"):
+                        data = await loop.run_in_executor(parser, extract_page_data, url, html)
+                    results[position] = ScrapedPage(**data)
+                    if manifest is not None:
+                        manifest.record_validators(url, headers)
+                    SCRAPER_PAGES.inc(result="scraped")
+                else:
+                    SCRAPER_PAGES.inc(result="failed")
+            except PageGone as e:
+                print(f"Gone: {url} ({e})")
+                SCRAPER_PAGES.inc(result="gone")
+            except Exception as e:
+                print(f"Failed to scrape {url}: {e}")
+                SCRAPER_PAGES.inc(result="failed")
+                # A timeout or server error is not a removal: keep the last good copy
+                failed.add(url)
+                if url in previous:
+                    results[position] = previous[url]
+            finally:
+                queue.task_done()
+                # Scraped, not modified, gone or failed: every dequeued URL advances progress
+                progress(pages_crawled=next(crawled))
+    finally:
+        await page.close()
+
+
+async def scrape_website(limit_pages: int = 200, concurrency: int = None,
+                         manifest: ScrapeManifest = None, progress: Callable[..., None] = None) -> List[ScrapedPage]:
+    """
+    Crawls the site with a bounded pool of browser pages fed by an asyncio queue.
+
+    Args:
+        limit_pages (int): Maximum number of pages to scrape.
+        concurrency (int): Number of pages fetched in parallel (defaults to SCRAPER_CONCURRENCY).
+        manifest (ScrapeManifest): When given, pages answering a conditional request with
+            304 Not Modified are reused from the previous local crawl instead of re-rendered.
+        progress (Callable): Optional callback receiving `pages_total` / `pages_crawled` counters.
+
+    Returns:
+        List[ScrapedPage]: Scraped pages, in link discovery order.
+    """
+    concurrency = max(1, concurrency or SCRAPER_CONCURRENCY)
+    results: Dict[int, ScrapedPage] = {}
+    failed: Set[str] = set()
+    crawled = itertools.count(1)
+    # Previous crawl: reused for 304 responses and as the fallback for pages that fail to load
+    previous = load_latest_local()
+
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
         context = await browser.new_context(user_agent="Mozilla/5.0")
@@ -50,67 +318,72 @@ async def scrape_website(limit_pages: int = 200) -> List[ScrapedPage]:
         await page.wait_for_timeout(2000)
 
         links = await page.eval_on_selector_all("a[href]", "elements => elements.map(el => el.href)")
+        await page.close()
         filtered_links = list(set(
             l for l in links if BASE_URL in l and '#' not in l and '?' not in l
         ))[:limit_pages]
+        if progress is not None:
+            progress(pages_total=len(filtered_links), pages_crawled=0)
 
-        for url in filtered_links:
-            try:
-                print(f"Scraping: {url}")
-                await page.goto(url, timeout=45000, wait_until="networkidle")
-                if page.url != url:
-                    print(f"Redirected to {page.url}, skipping.")
-                    continue
-                await page.wait_for_timeout(2000)
-                html = await page.content()
-                soup = BeautifulSoup(html, "html.parser")
-
-                title = soup.title.string.strip() if soup.title else "Untitled"
-                meta_desc = soup.find("meta", attrs={"name": "description"})
-                meta_keywords = soup.find("meta", attrs={"name": "keywords"})
-
-                description = meta_desc["content"] if meta_desc else ""
-                keywords = meta_keywords["content"].split(',') if meta_keywords else []
-
-                for s in soup(["script", "style"]):
-                    s.decompose()
-
-                texts = [el.get_text(strip=True) for el in soup.find_all(["p", "li", "h1", "h2", "h3", "h4"])]
-                content = ' '.join(t for t in texts if len(t) > 5).strip()
-
-                word_freq = {}
-                for word in re.findall(r"\b\w{4,}\b", content.lower()):
-                    word_freq[word] = word_freq.get(word, 0) + 1
-
-                top_keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
-                all_keywords = list(set(keywords + [kw[0] for kw in top_keywords]))
-
-                images = [img.get("src") for img in soup.find_all("img") if img.get("src")]
-                links = [l.get("href") for l in soup.find_all("a") if l.get("href")]
-
-                pages.append(ScrapedPage(
-                    url=url,
-                    title=title,
-                    content=content,
-                    links=list(set(links)),
-                    images=list(set(images)),
-                    metadata={
-                        "description": description,
-                        "keywords": all_keywords,
-                        "categories": []
-                    }
-                ))
-            except Exception as e:
-                print(f"Failed to scrape {url}: {e}")
+        queue: asyncio.Queue = asyncio.Queue()
+        for position, url in enumerate(filtered_links):
+            queue.put_nowait((position, url))
+
+        pool_size = min(concurrency, len(filtered_links)) or 1
+        for _ in range(pool_size):
+            queue.put_nowait(None)  # One stop sentinel per worker
+
+        limiter = HostRateLimiter(HOST_DELAY_SECONDS)
+        # "spawn" keeps workers independent of this process's threads; they only import html_extract
+        parser = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        ) if PARSE_WORKERS > 0 else None
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(
+                _crawl_worker(context, queue, results, limiter, manifest, previous, progress, parser, failed, crawled)
+                for _ in range(pool_size)
+            ))
+        finally:
+            if parser is not None:
+                parser.shutdown(wait=False, cancel_futures=True)
+        if manifest is not None:
+            manifest.failed = failed
+        elapsed = time.perf_counter() - started
+        if elapsed > 0:
+            SCRAPER_PAGES_PER_SECOND.set(len(results) / elapsed)
 
         await browser.close()
-    return pages
+    return [results[i] for i in sorted(results)]
+
+async def scrape_incremental(limit_pages: int = 200, concurrency: int = None, progress: Callable[..., None] = None):
+    """
+    Re-scrapes the site using the stored manifest and reports what changed.
 
-def save_locally(pages: List[ScrapedPage]):
+    Returns:
+        Tuple[List[ScrapedPage], Dict[str, List[str]]]: The full crawl and its delta
+        (added / changed / removed / unchanged URLs, plus the URLs that failed to load
+        and were kept from the previous run) against the previous run.
+    """
+    manifest = ScrapeManifest()
+    pages = await scrape_website(limit_pages, concurrency, manifest=manifest, progress=progress)
+    delta = manifest.apply(pages)
+    manifest.save()
+    print(
+        f"🔁 Delta: {len(delta['added'])} added, {len(delta['changed'])} changed, "
+        f"{len(delta['removed'])} removed, {len(delta['unchanged'])} unchanged, {len(delta['failed'])} failed"
+    )
+    return pages, delta
+
+def save_locally(pages: List[ScrapedPage], delta: Dict[str, List[str]] = None):
     timestamp = int(time.time())
-    file_path = DATA_DIR / f"scraped_content_{timestamp}.json"
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump([p.to_dict() for p in pages], f, indent=2)
+    if SCRAPED_FORMAT == "json":
+        file_path = DATA_DIR / f"scraped_content_{timestamp}.json"
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump([p.to_dict() for p in pages], f, indent=2)
+    else:
+        # Sharded JSON Lines with a byte-offset index by URL
+        file_path = write_pages((p.to_dict() for p in pages), DATA_DIR, timestamp)
     print(f"✅ Saved to {file_path}")
 
     index_path = DATA_DIR / f"index_{timestamp}.json"
@@ -119,36 +392,160 @@ def save_locally(pages: List[ScrapedPage]):
         "pageCount": len(pages),
         "pages": [{"url": p.url, "title": p.title} for p in pages]
     }
+    if delta is not None:
+        index["delta"] = delta
     with open(index_path, "w", encoding="utf-8") as f:
         json.dump(index, f, indent=2)
     print(f"🗂️ Index saved to {index_path}")
 
-def save_to_blob(pages: List[ScrapedPage]):
+def save_to_blob(pages: List[ScrapedPage], mode: str = None, concurrency: int = None):
+    """
+    Uploads a crawl to Azure Blob Storage.
+
+    Args:
+        pages (List[ScrapedPage]): Scraped pages.
+        mode (str): "pages" for one blob per page uploaded concurrently, or "bundle"
+            for a single gzip-compressed JSONL blob (defaults to BLOB_UPLOAD_MODE).
+        concurrency (int): Maximum parallel page uploads (defaults to BLOB_CONCURRENCY).
+    """
     if not STORAGE_CONNECTION_STRING:
         print("⚠️ No Azure Storage connection string found. Skipping blob upload.")
         return
 
     print("☁️ Uploading to Azure Blob Storage...")
-    blob_service = BlobServiceClient.from_connection_string(STORAGE_CONNECTION_STRING)
-    container = blob_service.get_container_client(CONTAINER_NAME)
-    if not container.exists():
-        container.create_container()
+    result = run_blocking(upload_to_blob(pages, mode, concurrency))
+    print(f"✅ Content uploaded to Azure Blob Storage ({result['blobs']} blobs, {result['mode']} mode).")
+    return result
 
-    timestamp = int(time.time())
-    for i, page in enumerate(pages):
-        blob_name = f"page_{i}_{timestamp}.json"
-        blob = container.get_blob_client(blob_name)
-        content = json.dumps(page.to_dict())
-        blob.upload_blob(content, overwrite=True)
 
-    index_blob = container.get_blob_client(f"index_{timestamp}.json")
-    index = {
-        "scrapeTime": datetime.datetime.now().isoformat(),
-        "pageCount": len(pages),
-        "pages": [{"url": p.url, "title": p.title} for p in pages]
-    }
-    index_blob.upload_blob(json.dumps(index), overwrite=True)
-    print("✅ Content uploaded to Azure Blob Storage.")
+async def upload_to_blob(pages: List[ScrapedPage], mode: str = None, concurrency: int = None,
+                         timestamp: int = None) -> Dict:
+    """
+    Async upload path behind save_to_blob. The index blob is written last, so
+    readers only ever see complete crawls. Transient failures are retried by
+    the SDK's exponential retry policy (BLOB_MAX_RETRIES attempts).
+
+    Returns:
+        Dict: The crawl timestamp, upload mode and number of blobs written.
+    """
+    mode = (mode or BLOB_UPLOAD_MODE).lower()
+    concurrency = max(1, concurrency or BLOB_CONCURRENCY)
+    timestamp = timestamp or int(time.time())
+
+    async with AsyncBlobServiceClient.from_connection_string(
+        STORAGE_CONNECTION_STRING, retry_total=BLOB_MAX_RETRIES
+    ) as service:
+        container = service.get_container_client(CONTAINER_NAME)
+        try:
+            await container.create_container()
+        except ResourceExistsError:
+            pass
+
+        if mode == "bundle":
+            lines = (json.dumps(page.to_dict()) + "\n" for page in pages)
+            data = gzip.compress("".join(lines).encode("utf-8"))
+            await container.upload_blob(f"bundle_{timestamp}.jsonl.gz", data, overwrite=True)
+            blobs = 1
+        else:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def put(i: int, page: ScrapedPage):
+                async with semaphore:
+                    await container.upload_blob(f"page_{i}_{timestamp}.json", json.dumps(page.to_dict()), overwrite=True)
+
+            await asyncio.gather(*(put(i, page) for i, page in enumerate(pages)))
+            blobs = len(pages)
+
+        index = {
+            "scrapeTime": datetime.datetime.now().isoformat(),
+            "pageCount": len(pages),
+            "pages": [{"url": p.url, "title": p.title} for p in pages]
+        }
+        await container.upload_blob(f"index_{timestamp}.json", json.dumps(index), overwrite=True)
+
+    return {"timestamp": timestamp, "mode": mode, "blobs": blobs + 1}
+
+
+def _parse_blob_name(name: str):
+    """Splits 'page_<i>_<ts>.json', 'index_<ts>.json' and 'bundle_<ts>.jsonl.gz' into their parts."""
+    stem = name.split('.')[0]
+    parts = stem.split('_')
+    if not all(part.isdigit() for part in parts[1:]):
+        return None
+    if parts[0] == 'page' and len(parts) == 3:
+        return 'page', int(parts[2]), int(parts[1])
+    if parts[0] in ('index', 'bundle') and len(parts) == 2:
+        return parts[0], int(parts[1]), None
+    return None
+
+
+async def download_from_blob(concurrency: int = None) -> List[ScrapedPage]:
+    """
+    Downloads the latest crawl from Azure Blob Storage.
+
+    The container is listed once to map the latest timestamp to its index,
+    optional bundle and page blobs (by page number). A bundle is preferred
+    when present; otherwise page blobs are fetched concurrently, at most
+    `concurrency` at a time. Works against Azurite for local testing.
+    """
+    concurrency = max(1, concurrency or BLOB_CONCURRENCY)
+
+    async with AsyncBlobServiceClient.from_connection_string(STORAGE_CONNECTION_STRING) as service:
+        container = service.get_container_client(CONTAINER_NAME)
+        if not await container.exists():
+            print('No scraped content found in blob storage')
+            return []
+
+        # Single listing pass: timestamp -> index / bundle / {page number: blob}
+        crawls: Dict[int, Dict] = {}
+        async for blob in container.list_blobs():
+            parsed = _parse_blob_name(blob.name)
+            if parsed is None:
+                continue
+            kind, timestamp, number = parsed
+            crawl = crawls.setdefault(timestamp, {"pages": {}})
+            if kind == 'page':
+                crawl["pages"][number] = blob.name
+            else:
+                crawl[kind] = blob.name
+
+        indexed = [ts for ts, crawl in crawls.items() if "index" in crawl]
+        if not indexed:
+            print('No index file found in blob storage')
+            return []
+        crawl = crawls[max(indexed)]
+
+        if "bundle" in crawl:
+            data = await (await container.get_blob_client(crawl["bundle"]).download_blob()).readall()
+            lines = gzip.decompress(data).decode('utf-8').splitlines()
+            return [ScrapedPage(**json.loads(line)) for line in lines if line.strip()]
+
+        index_data = await (await container.get_blob_client(crawl["index"]).download_blob()).readall()
+        index = json.loads(index_data.decode('utf-8'))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(number: int):
+            blob_name = crawl["pages"].get(number)
+            if blob_name is None:
+                print(f'Missing page blob {number} for crawl {max(indexed)}')
+                return None
+            async with semaphore:
+                downloader = await container.get_blob_client(blob_name).download_blob()
+                return ScrapedPage(**json.loads((await downloader.readall()).decode('utf-8')))
+
+        pages = await asyncio.gather(*(fetch(i) for i in range(len(index['pages']))))
+        return [page for page in pages if page is not None]
+
+
+def run_blocking(coro):
+    """Runs a coroutine to completion from sync code, even when an event loop is already running."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
 
 def get_scraped_content() -> List[ScrapedPage]:
     """Retrieves the scraped content from Azure Blob Storage or local file"""
@@ -156,81 +553,46 @@ def get_scraped_content() -> List[ScrapedPage]:
         # If we have Azure storage configured, retrieve from there
         if STORAGE_CONNECTION_STRING:
             print('Retrieving content from Azure Blob Storage...')
-            blob_service_client = BlobServiceClient.from_connection_string(STORAGE_CONNECTION_STRING)
-            container_client = blob_service_client.get_container_client(CONTAINER_NAME)
-            
-            # Check if container exists
-            if not container_client.exists():
-                print('No scraped content found in blob storage')
-                return []
-            
-            # Find the latest index file
-            latest_index = None
-            latest_time = 0
-            
-            for blob in container_client.list_blobs():
-                if blob.name.startswith('index_'):
-                    timestamp = int(blob.name.split('_')[1].split('.')[0])
-                    if timestamp > latest_time:
-                        latest_time = timestamp
-                        latest_index = blob.name
-            
-            if not latest_index:
-                print('No index file found in blob storage')
-                return []
-            
-            # Download and parse the index file
-            index_blob_client = container_client.get_blob_client(latest_index)
-            index_content = index_blob_client.download_blob().readall().decode('utf-8')
-            index = json.loads(index_content)
-            
-            # Download each page
-            scraped_pages = []
-            for page_info in index['pages']:
-                # Find the corresponding page blob
-                for blob in container_client.list_blobs():
-                    if blob.name.startswith('page_') and str(latest_time) in blob.name:
-                        page_blob_client = container_client.get_blob_client(blob.name)
-                        page_content = page_blob_client.download_blob().readall().decode('utf-8')
-                        page_data = json.loads(page_content)
-                        scraped_pages.append(ScrapedPage(**page_data))
-                        break
-            
-            return scraped_pages
+            return run_blocking(download_from_blob())
         
         else:
             # If no Azure storage, check for local file
             print('Retrieving content from local file...')
             
-            data_dir = Path(__file__).parent.parent / 'Scraped'
-            if not data_dir.exists():
+            if not DATA_DIR.exists():
                 print('Scraped directory does not exist')
                 return []
             
-            # Find the latest scraped content file
-            scraped_files = [
-                f for f in data_dir.glob('scraped_content_*.json')
-                if f.is_file()
-            ]
-            
-            if not scraped_files:
+            # Find the latest crawl (sharded JSONL manifest or legacy JSON file)
+            latest_file = latest_crawl(DATA_DIR)
+            if latest_file is None:
                 print('No scraped content files found')
                 return []
             
-            # Sort by timestamp (descending)
-            scraped_files.sort(key=lambda f: int(f.stem.split('_')[-1]), reverse=True)
-            
-            # Read the latest file
-            latest_file = scraped_files[0]
             print(f'Reading content from {latest_file}')
-            
-            with open(latest_file, 'r', encoding='utf-8') as f:
-                content = json.load(f)
+            content = [ScrapedPage(**page) for page in iter_pages(latest_file)]
             
             print(f'Found {len(content)} pages in the file')
-            return [ScrapedPage(**page) for page in content]
+            return content
     
     except Exception as e:
         print(f'Error retrieving scraped content: {str(e)}')
         return []
-    
+
+
+def iter_scraped_content() -> Iterator[ScrapedPage]:
+    """
+    Streams the pages of the latest crawl. Local sharded crawls are read one
+    page at a time; the blob storage path falls back to get_scraped_content.
+    """
+    if STORAGE_CONNECTION_STRING:
+        yield from get_scraped_content()
+        return
+
+    latest = latest_crawl(DATA_DIR)
+    if latest is None:
+        print('No scraped content files found')
+        return
+    print(f'Streaming content from {latest}')
+    for page in iter_pages(latest):
+        yield ScrapedPage(**page)
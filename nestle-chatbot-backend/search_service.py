@@ -1,23 +1,71 @@
 import os
-import requests
-from typing import List, Dict, Optional, Any
+import json
+import time
+import random
+import asyncio
+import threading
+from pathlib import Path
+import httpx
+from typing import List, Dict, Optional, Any, Callable
 from dotenv import load_dotenv
 
+from metrics import stage_timer
+
 load_dotenv()
 
+# HTTP client tuning for the long-lived search connection pool
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("AZURE_SEARCH_TIMEOUT", "10"))
+SEARCH_MAX_RETRIES = int(os.getenv("AZURE_SEARCH_MAX_RETRIES", "3"))
+SEARCH_MAX_CONNECTIONS = int(os.getenv("AZURE_SEARCH_MAX_CONNECTIONS", "20"))
+
+# Negotiated API versions, keyed by endpoint, so probing happens once per deployment
+API_VERSION_CACHE = Path(os.getenv("AZURE_SEARCH_API_VERSION_CACHE", "./Scraped/search_api_version.json"))
+# Used when no version can be probed (service unreachable); not cached, so the next process probes again
+DEFAULT_API_VERSION = os.getenv("AZURE_SEARCH_DEFAULT_API_VERSION", "2023-11-01")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
 class AzureSearchService:
     def __init__(self):
         self.search_endpoint = os.getenv("AZURE_SEARCH_ENDPOINT", "")
         self.search_api_key = os.getenv("AZURE_SEARCH_API_KEY", "")
         self.search_index_name = os.getenv("AZURE_SEARCH_INDEX_NAME", "nestle-chat-bot")
-        self.api_version = self._detect_api_version()  # Auto-detect best API version
         self.headers = {
             "api-key": self.search_api_key,
             "Content-Type": "application/json"
         }
 
+        # Pooled keep-alive clients: sync for indexing jobs, async for the request path
+        timeout = httpx.Timeout(SEARCH_TIMEOUT_SECONDS)
+        limits = httpx.Limits(max_connections=SEARCH_MAX_CONNECTIONS, max_keepalive_connections=SEARCH_MAX_CONNECTIONS)
+        self.client = httpx.Client(
+            headers=self.headers, timeout=timeout, limits=limits,
+            transport=httpx.HTTPTransport(retries=SEARCH_MAX_RETRIES)
+        )
+        self.async_client = httpx.AsyncClient(
+            headers=self.headers, timeout=timeout, limits=limits,
+            transport=httpx.AsyncHTTPTransport(retries=SEARCH_MAX_RETRIES)
+        )
+
+        self.api_version = self._detect_api_version()  # Cached on disk after the first probe
+
     def _detect_api_version(self) -> str:
-        """Detect the best supported API version"""
+        """Detect the best supported API version, reusing the on-disk cache when possible"""
+        configured = os.getenv("AZURE_SEARCH_API_VERSION")
+        if configured:
+            return configured
+
+        cache = {}
+        if API_VERSION_CACHE.exists():
+            try:
+                with open(API_VERSION_CACHE, "r", encoding="utf-8") as f:
+                    cache = json.load(f)
+            except Exception:
+                cache = {}
+        if cache.get(self.search_endpoint):
+            return cache[self.search_endpoint]
+
         versions_to_try = [
             "2023-11-01",
             "2023-10-01-Preview",
@@ -28,33 +76,59 @@ class AzureSearchService:
         for version in versions_to_try:
             try:
                 url = f"{self.search_endpoint}/indexes?api-version={version}&$top=1"
-                response = requests.get(url, headers={"api-key": self.search_api_key})
+                response = self.client.get(url)
                 if response.status_code == 200:
                     print(f"✅ Using API version: {version}")
+                    cache[self.search_endpoint] = version
+                    API_VERSION_CACHE.parent.mkdir(parents=True, exist_ok=True)
+                    with open(API_VERSION_CACHE, "w", encoding="utf-8") as f:
+                        json.dump(cache, f, indent=2)
                     return version
             except Exception:
                 continue
-        
-        raise Exception("No supported API version found")
 
-    def create_search_index(self) -> None:
-        """Create the search index if it doesn't exist"""
+        print(f"⚠️ Could not probe a supported API version, falling back to {DEFAULT_API_VERSION}")
+        return DEFAULT_API_VERSION
+
+    def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends a request on the pooled client, retrying throttling and server errors"""
+        with stage_timer("azure_search_admin"):
+            for attempt in range(SEARCH_MAX_RETRIES + 1):
+                response = self.client.request(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS or attempt == SEARCH_MAX_RETRIES:
+                    return response
+                time.sleep(min(2 ** attempt, 10) * 0.5 + random.random() * 0.1)
+            return response
+
+    async def _arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Async counterpart of _request for the query hot path"""
+        with stage_timer("azure_search_query"):
+            for attempt in range(SEARCH_MAX_RETRIES + 1):
+                response = await self.async_client.request(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS or attempt == SEARCH_MAX_RETRIES:
+                    return response
+                await asyncio.sleep(min(2 ** attempt, 10) * 0.5 + random.random() * 0.1)
+            return response
+
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        await self.async_client.aclose()
+        self.client.close()
+
+    def create_search_index(self, dimensions: int = 1536) -> None:
+        """Create the search index if it doesn't exist, or add fields missing from an older index"""
         url = f"{self.search_endpoint}/indexes/{self.search_index_name}?api-version={self.api_version}"
         
         # Check if index exists
-        try:
-            response = requests.get(url, headers=self.headers)
-            if response.status_code == 200:
-                print(f"Search index '{self.search_index_name}' already exists")
-                return
-        except requests.exceptions.RequestException as e:
-            if hasattr(e, 'response') and e.response.status_code == 404:
-                pass  # Index doesn't exist, proceed to create
-            else:
-                raise
-
-        # Create index
-        print(f"Creating search index '{self.search_index_name}'...")
+        response = self._request("GET", url)
+        existing_fields = None
+        if response.status_code == 200:
+            existing_fields = {field["name"] for field in response.json().get("fields", [])}
+        elif response.status_code != 404:
+            response.raise_for_status()  # Anything but "not found" is unexpected
+
         index_definition = {
             "name": self.search_index_name,
             "fields": [
@@ -67,6 +141,14 @@ class AzureSearchService:
                     "facetable": False,
                     "sortable": False
                 },
+                {
+                    "name": "parent_id",
+                    "type": "Edm.String",
+                    "searchable": False,
+                    "filterable": True,
+                    "facetable": False,
+                    "sortable": False
+                },
                 {
                     "name": "url",
                     "type": "Edm.String",
@@ -91,6 +173,30 @@ class AzureSearchService:
                     "facetable": False,
                     "sortable": False
                 },
+                {
+                    "name": "chunk_index",
+                    "type": "Edm.Int32",
+                    "searchable": False,
+                    "filterable": True,
+                    "facetable": False,
+                    "sortable": True
+                },
+                {
+                    "name": "chunk_start",
+                    "type": "Edm.Int32",
+                    "searchable": False,
+                    "filterable": False,
+                    "facetable": False,
+                    "sortable": False
+                },
+                {
+                    "name": "chunk_end",
+                    "type": "Edm.Int32",
+                    "searchable": False,
+                    "filterable": False,
+                    "facetable": False,
+                    "sortable": False
+                },
                 {
                     "name": "category",
                     "type": "Edm.String",
@@ -123,7 +229,7 @@ class AzureSearchService:
             index_definition["fields"].append({
                 "name": "vectorField",
                 "type": "Collection(Edm.Single)",
-                "dimensions": 1536,
+                "dimensions": dimensions,
                 "vectorSearchProfile": "vector-profile"
             })
             index_definition["vectorSearch"] = {
@@ -160,14 +266,24 @@ class AzureSearchService:
                 }]
             }
 
-        response = requests.put(url, json=index_definition, headers=self.headers)
-        if response.status_code not in [200, 201]:
+        if existing_fields is not None:
+            missing = [f["name"] for f in index_definition["fields"] if f["name"] not in existing_fields]
+            if not missing:
+                print(f"Search index '{self.search_index_name}' already exists")
+                return
+            # Fields can be added to a live index in place (e.g. the chunk fields)
+            print(f"Adding fields {missing} to search index '{self.search_index_name}'...")
+        else:
+            print(f"Creating search index '{self.search_index_name}'...")
+
+        response = self._request("PUT", url, json=index_definition)
+        if response.status_code not in [200, 201, 204]:
             raise Exception(f"Failed to create index: {response.text}")
         
-        print(f"Search index '{self.search_index_name}' created successfully")
+        print(f"Search index '{self.search_index_name}' is up to date")
 
-    def upload_documents(self, documents: List[Dict[str, Any]]) -> None:
-        """Upload documents to the search index"""
+    def upload_documents(self, documents: List[Dict[str, Any]], progress: Optional[Callable[[int], None]] = None) -> None:
+        """Upload documents to the search index; `progress` gets the count uploaded after each batch and may raise to stop"""
         url = f"{self.search_endpoint}/indexes/{self.search_index_name}/docs/index?api-version={self.api_version}"
         
         # Prepare documents for upload
@@ -177,16 +293,34 @@ class AzureSearchService:
         batch_size = 100
         for i in range(0, len(actions), batch_size):
             batch = actions[i:i + batch_size]
-            response = requests.post(url, json={"value": batch}, headers=self.headers)
+            response = self._request("POST", url, json={"value": batch})
             
             if response.status_code != 200:
                 raise Exception(f"Failed to upload batch: {response.text}")
             
             print(f"Uploaded batch {i//batch_size + 1} of {len(actions)//batch_size + 1}")
+            if progress is not None:
+                progress(i + len(batch))
         
         print("All documents uploaded successfully")
 
-    def search_documents(self, query: str, filter_expr: Optional[str] = None) -> Dict[str, Any]:
+    def delete_documents(self, ids: List[str]) -> None:
+        """Delete documents from the search index by key"""
+        url = f"{self.search_endpoint}/indexes/{self.search_index_name}/docs/index?api-version={self.api_version}"
+
+        actions = [{"@search.action": "delete", "id": doc_id} for doc_id in ids]
+
+        batch_size = 100
+        for i in range(0, len(actions), batch_size):
+            batch = actions[i:i + batch_size]
+            response = self._request("POST", url, json={"value": batch})
+
+            if response.status_code != 200:
+                raise Exception(f"Failed to delete batch: {response.text}")
+
+        print(f"Deleted {len(actions)} documents")
+
+    async def search_documents(self, query: str, filter_expr: Optional[str] = None) -> Dict[str, Any]:
         """Search for documents in the index"""
         url = f"{self.search_endpoint}/indexes/{self.search_index_name}/docs/search?api-version={self.api_version}"
         
@@ -194,7 +328,7 @@ class AzureSearchService:
             "search": query,
             "queryType": "simple",
             "searchFields": "title,content,description,keywords",
-            "select": "id,url,title,content,category,keywords,description",
+            "select": "id,parent_id,url,title,content,chunk_index,chunk_start,chunk_end,category,keywords,description",
             "count": True,
             "top": 10
         }
@@ -202,11 +336,11 @@ class AzureSearchService:
         if filter_expr:
             body["filter"] = filter_expr
         
-        response = requests.post(url, json=body, headers=self.headers)
+        response = await self._arequest("POST", url, json=body)
         response.raise_for_status()
         return response.json()
 
-    def vector_search(self, vector: List[float], filter_expr: Optional[str] = None) -> Dict[str, Any]:
+    async def vector_search(self, vector: List[float], filter_expr: Optional[str] = None) -> Dict[str, Any]:
         """Search using vector similarity"""
         url = f"{self.search_endpoint}/indexes/{self.search_index_name}/docs/search?api-version={self.api_version}"
         
@@ -216,18 +350,18 @@ class AzureSearchService:
                 "fields": "vectorField",
                 "k": 10
             }],
-            "select": "id,url,title,content,category,keywords,description",
+            "select": "id,parent_id,url,title,content,chunk_index,chunk_start,chunk_end,category,keywords,description",
             "count": True
         }
         
         if filter_expr:
             body["filter"] = filter_expr
         
-        response = requests.post(url, json=body, headers=self.headers)
+        response = await self._arequest("POST", url, json=body)
         response.raise_for_status()
         return response.json()
 
-    def hybrid_search(self, query: str, vector: List[float], filter_expr: Optional[str] = None) -> Dict[str, Any]:
+    async def hybrid_search(self, query: str, vector: List[float], filter_expr: Optional[str] = None) -> Dict[str, Any]:
         """Combine keyword and vector search"""
         url = f"{self.search_endpoint}/indexes/{self.search_index_name}/docs/search?api-version={self.api_version}"
         
@@ -240,7 +374,7 @@ class AzureSearchService:
                 "fields": "vectorField",
                 "k": 10
             }],
-            "select": "id,url,title,content,category,keywords,description",
+            "select": "id,parent_id,url,title,content,chunk_index,chunk_start,chunk_end,category,keywords,description",
             "count": True,
             "top": 10
         }
@@ -248,6 +382,35 @@ class AzureSearchService:
         if filter_expr:
             body["filter"] = filter_expr
         
-        response = requests.post(url, json=body, headers=self.headers)
+        response = await self._arequest("POST", url, json=body)
         response.raise_for_status()
-        return response.json()
\ No newline at end of file
+        return response.json()
+
+_search_service: Optional[AzureSearchService] = None
+_search_service_lock = threading.Lock()
+
+
+def get_search_service() -> AzureSearchService:
+    """Returns the process-wide search client, creating it on first use (blocking: may probe the API version)"""
+    global _search_service
+    if _search_service is None:
+        with _search_service_lock:
+            if _search_service is None:
+                _search_service = AzureSearchService()
+    return _search_service
+
+
+async def aget_search_service() -> AzureSearchService:
+    """get_search_service for the event loop: the first call creates the client in a worker thread"""
+    if _search_service is not None:
+        return _search_service
+    return await asyncio.to_thread(get_search_service)
+
+
+async def close_search_service() -> None:
+    """Closes the process-wide search client, if one was created (eagerly or on first use)"""
+    global _search_service
+    with _search_service_lock:
+        service, _search_service = _search_service, None
+    if service is not None:
+        await service.aclose()
@@ -0,0 +1,140 @@
+"""
+Semantic answer cache for /chat and /graphrag.
+
+Stores (question embedding, answer) pairs and serves a previous answer when a
+new question is a close paraphrase (cosine similarity above a threshold).
+Entries expire after a TTL, the cache is bounded (oldest evicted first), and
+every entry is tagged with the corpus version it was answered against so a
+re-scrape or re-index invalidates it. Entries also carry the conversation
+context they were answered in (a fingerprint of the session history), so a
+follow-up like "Tell me more" is only served to a session with the same
+preceding turns.
+"""
+
+import os
+import time
+import threading
+from typing import List, Dict, Optional, Any
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "2000"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+
+
+class SemanticAnswerCache:
+    """
+    Nearest-neighbour cache of answered questions, one namespace per endpoint.
+
+    Vectors are kept L2-normalized in a dense matrix per namespace, so a
+    lookup is one matrix-vector product over at most `max_entries` rows.
+
+    Args:
+        threshold (float): Minimum cosine similarity for a hit.
+        max_entries (int): Capacity per namespace.
+        ttl (float): Seconds an answer stays valid.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_SIZE,
+                 ttl: float = SEMANTIC_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else None
+
+    def _prune(self, namespace: str, version: str) -> None:
+        """Drops expired entries and entries answered against another corpus version."""
+        entries = self._entries.get(namespace, [])
+        now = time.time()
+        keep = [i for i, e in enumerate(entries) if e["version"] == version and e["expires_at"] > now]
+        if len(keep) != len(entries):
+            self._entries[namespace] = [entries[i] for i in keep]
+            self._vectors[namespace] = self._vectors[namespace][keep]
+
+    def lookup(self, namespace: str, vector: List[float], version: str, context: str = "") -> Optional[str]:
+        """
+        Returns the cached answer of the most similar previous question, if close enough.
+
+        Args:
+            namespace (str): Endpoint the answer belongs to (e.g. "chat", "graphrag").
+            vector (List[float]): Embedding of the incoming question.
+            version (str): Current corpus version.
+            context (str): Fingerprint of the conversation history; only entries answered
+                in the same context can match.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            self._prune(namespace, version)
+            matrix = self._vectors.get(namespace)
+            if query is None or matrix is None or not len(matrix):
+                self.misses += 1
+                return None
+
+            similarities = matrix @ query
+            same_context = np.fromiter(
+                (e["context"] == context for e in self._entries[namespace]), dtype=bool, count=len(matrix)
+            )
+            similarities = np.where(same_context, similarities, -1.0)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return self._entries[namespace][best]["answer"]
+
+    def store(self, namespace: str, question: str, vector: List[float], answer: str, version: str,
+              context: str = "") -> None:
+        """Adds an answered question, evicting the oldest entries past capacity."""
+        normalized = self._normalize(vector)
+        if normalized is None:
+            return
+
+        with self._lock:
+            self._prune(namespace, version)
+            matrix = self._vectors.get(namespace)
+            if matrix is None or not len(matrix):
+                matrix = np.empty((0, len(normalized)), dtype=np.float32)
+
+            self._vectors[namespace] = np.vstack([matrix, normalized])[-self.max_entries:]
+            entries = self._entries.setdefault(namespace, [])
+            entries.append({
+                "question": question,
+                "answer": answer,
+                "version": version,
+                "context": context,
+                "expires_at": time.time() + self.ttl
+            })
+            self._entries[namespace] = entries[-self.max_entries:]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors.clear()
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and per-namespace occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": {namespace: len(entries) for namespace, entries in self._entries.items()},
+            "threshold": self.threshold,
+            "ttl": self.ttl
+        }
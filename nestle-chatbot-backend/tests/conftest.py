@@ -0,0 +1,25 @@
+"""
+Shared test setup: run from the backend directory with every cache and
+database redirected to a temporary directory, and no Azure credentials.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.chdir(BACKEND_DIR)
+
+# Must be set before the services are imported: their paths and clients are configured at import time
+TEST_DATA_DIR = Path(tempfile.mkdtemp(prefix="nestle-tests-"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["EMBEDDING_BACKEND"] = "azure"
+os.environ["EMBEDDING_CACHE_PATH"] = str(TEST_DATA_DIR / "embedding_cache.sqlite3")
+os.environ["HISTORY_DB_PATH"] = str(TEST_DATA_DIR / "chat_history.sqlite3")
+os.environ["INDEX_GENERATION_PATH"] = str(TEST_DATA_DIR / "index_generation.json")
+os.environ["GRAPH_CACHE_PATH"] = str(TEST_DATA_DIR / "knowledge_graph.json")
+os.environ["VECTOR_INDEX_DIR"] = str(TEST_DATA_DIR)
+os.environ["AZURE_SEARCH_API_VERSION_CACHE"] = str(TEST_DATA_DIR / "search_api_version.json")
+os.environ["AZURE_SEARCH_ENDPOINT"] = ""
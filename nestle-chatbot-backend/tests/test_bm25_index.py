@@ -0,0 +1,44 @@
+import pytest
+
+from bm25_index import BM25Index
+
+DOCUMENTS = ["KitKat wafer bar", "KitKat KitKat chocolate", "Aero chocolate bubbles bar"]
+
+
+def test_scores_match_hand_computed_bm25():
+    index = BM25Index(DOCUMENTS)
+
+    # N = 3, avgdl = 10 / 3, k1 = 1.5, b = 0.75
+    # idf(kitkat) = idf(chocolate) = ln(1 + (3 - 2 + 0.5) / (2 + 0.5)) = ln(1.6)
+    # norm(len 3) = 1.5 * (0.25 + 0.75 * 3 / (10 / 3)) = 1.3875, norm(len 4) = 1.725
+    # doc 0: ln(1.6) * 1 * 2.5 / (1 + 1.3875)
+    # doc 1: ln(1.6) * 2 * 2.5 / (2 + 1.3875) + ln(1.6) * 1 * 2.5 / (1 + 1.3875)
+    # doc 2: ln(1.6) * 1 * 2.5 / (1 + 1.725)
+    expected = [0.492150, 1.185883, 0.431196]
+
+    assert index.score("kitkat chocolate") == pytest.approx(expected, abs=1e-5)
+    assert [doc_id for doc_id, _ in index.top_k("kitkat chocolate", 3)] == [1, 0, 2]
+
+
+def test_stopword_and_unknown_queries_score_zero():
+    index = BM25Index(DOCUMENTS)
+
+    for query in ("the and of", "nescafe", ""):
+        assert not index.score(query).any()
+        assert index.top_k(query, 3) == []
+
+
+def test_k_larger_than_corpus_returns_every_match():
+    index = BM25Index(DOCUMENTS)
+
+    assert [doc_id for doc_id, _ in index.top_k("bar", 10)] == [0, 2]
+    assert len(index.top_k("kitkat chocolate bar", 10)) == 3
+
+
+def test_empty_corpus():
+    for documents in ([], ["the", "and of"]):
+        index = BM25Index(documents)
+
+        assert index.matrix.shape == (len(documents), 0)
+        assert index.score("kitkat").shape == (len(documents),)
+        assert index.top_k("kitkat", 5) == []
@@ -0,0 +1,59 @@
+import pytest
+
+import chunker
+from chunker import chunk_text, chunk_page, token_spans
+
+TEXT = " ".join(
+    f"KitKat bar {i} has {i * 7} crispy wafer fingers, covered in milk chocolate (made in Canada)." for i in range(40)
+)
+
+
+@pytest.fixture(params=["regex", "tiktoken"])
+def tokenizer(request, monkeypatch):
+    """Runs a test once with the regex fallback and once with tiktoken, when its encoding can be loaded."""
+    monkeypatch.setattr(chunker, "_encoding", None)
+    if request.param == "regex":
+        monkeypatch.setattr(chunker, "tiktoken", None)
+    else:
+        pytest.importorskip("tiktoken")
+        try:
+            chunker._get_encoding()
+        except Exception as e:  # The encoding is downloaded on first use
+            pytest.skip(f"tiktoken encoding unavailable: {e}")
+    return request.param
+
+
+def tokens_in(spans, chunk):
+    return [span for span in spans if chunk["start"] <= span[0] and span[1] <= chunk["end"]]
+
+
+def test_chunks_never_exceed_the_token_limit(tokenizer):
+    spans = token_spans(TEXT)
+    chunks = chunk_text(TEXT, chunk_tokens=50, overlap_tokens=10)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["text"] == TEXT[chunk["start"]:chunk["end"]]
+        assert chunk["tokens"] == len(tokens_in(spans, chunk)) <= 50
+    # Every token lands in a chunk
+    assert chunks[0]["start"] == spans[0][0]
+    assert chunks[-1]["end"] == spans[-1][1]
+
+
+def test_consecutive_chunks_share_the_overlap(tokenizer):
+    spans = token_spans(TEXT)
+    chunks = chunk_text(TEXT, chunk_tokens=50, overlap_tokens=10)
+
+    for current, following in zip(chunks, chunks[1:]):
+        shared = [span for span in tokens_in(spans, current) if span[0] >= following["start"]]
+        assert len(shared) == 10
+    # 40 new tokens per chunk after the first
+    assert len(chunks) == -(-(len(spans) - 10) // 40)
+
+
+def test_short_text_and_empty_page(tokenizer):
+    assert [c["text"] for c in chunk_text("KitKat wafer", chunk_tokens=50, overlap_tokens=10)] == ["KitKat wafer"]
+    assert chunk_text("", chunk_tokens=50) == []
+
+    chunks = chunk_page({"content": "", "title": "Aero", "metadata": {"description": "Bubbly chocolate"}})
+    assert [(c["text"], c["index"]) for c in chunks] == [("Bubbly chocolate", 0)]
@@ -0,0 +1,38 @@
+import openai_service
+from embedding_cache import EmbeddingCache
+
+
+class CountingBackend:
+    name = "counting"
+    dimensions = 2
+    max_concurrency = 1
+
+    def __init__(self):
+        self.inputs = []
+
+    def embed_batch(self, texts):
+        self.inputs.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_duplicate_texts_are_counted_once(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite3")
+
+    cache.put_many("deployment", ["kitkat", "kitkat", "aero"], [[1.0, 2.0], [1.0, 2.0], [3.0, 4.0]])
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 2 * 2 * 4  # Two float32 vectors of two dimensions
+
+
+def test_single_and_batch_paths_share_cache_keys(tmp_path, monkeypatch):
+    backend = CountingBackend()
+    monkeypatch.setattr(openai_service, "embedding_backend", backend)
+    monkeypatch.setattr(openai_service, "embedding_cache", EmbeddingCache(tmp_path / "cache.sqlite3"))
+    long_text = "chocolate " * (openai_service.EMBEDDING_MAX_INPUT_TOKENS)
+
+    batch_vector = openai_service.generate_embeddings_batch([long_text])[0]
+    single_vector = openai_service.generate_embeddings(long_text)
+
+    assert single_vector == batch_vector
+    assert backend.inputs == [openai_service.embedding_input(long_text)]
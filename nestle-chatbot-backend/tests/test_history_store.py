@@ -0,0 +1,30 @@
+import asyncio
+
+import openai_service
+from history_store import HistoryStore
+from openai_service import get_session_history
+
+
+def test_cached_session_sees_turns_from_another_worker():
+    session_id = "history-two-workers"
+    # A second worker process: its own store connection on the same database
+    other_worker = HistoryStore(openai_service.history_store.path, flush_interval=3600)
+    try:
+        history = asyncio.run(get_session_history(session_id))
+        history.add_message("user", "What is Aero?")
+        history.add_message("assistant", "A bubbly chocolate bar.")
+        openai_service.history_store.flush()
+
+        other_worker.append(session_id, "user", "Tell me more")
+        other_worker.append(session_id, "assistant", "It melts in the mouth.")
+        other_worker.flush()
+
+        reloaded = asyncio.run(get_session_history(session_id))
+        assert reloaded is history
+        assert [m["content"] for m in reloaded.get_history()] == [
+            "What is Aero?", "A bubbly chocolate bar.", "Tell me more", "It melts in the mouth."
+        ]
+    finally:
+        other_worker.close()
+        asyncio.run(get_session_history(session_id)).clear_history()
+        openai_service.history_store.flush()
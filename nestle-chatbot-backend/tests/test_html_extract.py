@@ -0,0 +1,39 @@
+from html_extract import extract_page_data, HTML_PARSER
+
+# Malformed on purpose: unclosed <p>/<li>, a <p> inside a table cell, markup inside a script
+MALFORMED_HTML = """<html><head><title>  Aero Bubbly Bar </title>
+<meta name="description" content="Light &amp; bubbly milk chocolate">
+<meta name="keywords" content="aero,chocolate">
+<style>p { color: brown }</style></head>
+<body><script>var p = "<p>not content</p>";</script>
+<h1>Aero   Milk Chocolate</h1>
+<p>Melts in your mouth<br>with every   bubble
+<p>Unclosed paragraph about <b>peppermint</b> Aero bars
+<ul><li>Aero Mint <li>Aero Truffle bar<li>tiny</ul>
+<table><tr><td><p>Chocolate in a table cell</td></tr>
+<a href="/brands/aero">Aero</a><a href="/brands/aero">again</a><img src="/aero.png"><img alt="no src">
+</body></html>"""
+
+# Output of the original per-field find_all extraction with html.parser. Content hashes,
+# and so incremental re-indexing, depend on it staying byte-identical.
+GOLDEN_CONTENT = (
+    "Aero   Milk Chocolate Melts in your mouthwith every   bubbleUnclosed paragraph aboutpeppermintAero barsAero "
+    "MintAero Truffle bartinyChocolate in a table cellAeroagain Unclosed paragraph aboutpeppermintAero barsAero "
+    "MintAero Truffle bartinyChocolate in a table cellAeroagain Aero MintAero Truffle bartiny Aero Truffle bartiny "
+    "Chocolate in a table cell"
+)
+
+
+def test_default_parser_output_is_unchanged():
+    page = extract_page_data("https://x/aero", MALFORMED_HTML)
+
+    assert HTML_PARSER == "html.parser"
+    assert page["title"] == "Aero Bubbly Bar"
+    assert page["content"] == GOLDEN_CONTENT
+    assert page["metadata"]["description"] == "Light & bubbly milk chocolate"
+    assert sorted(page["metadata"]["keywords"]) == [
+        "aboutpeppermintaero", "aero", "barsaero", "bartinychocolate", "cellaeroagain",
+        "chocolate", "mintaero", "paragraph", "table", "truffle"
+    ]
+    assert page["images"] == ["/aero.png"]
+    assert page["links"] == ["/brands/aero"]
@@ -0,0 +1,54 @@
+import asyncio
+
+from knowledge_store import CorpusSnapshot
+from hybrid_retriever import HybridRetriever
+from vector_store import LocalVectorSearchService
+
+PRODUCTS = ["kitkat wafer", "smarties candy", "nescafe coffee", "milo malt", "aero bubbles", "boost drink"]
+
+
+class FixedStore:
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def snapshot(self):
+        return self._snapshot
+
+
+def make_snapshot(pages: int) -> CorpusSnapshot:
+    items = [
+        {
+            "url": f"https://x/{i}",
+            "title": f"Product {i}",
+            "content": f"All about {PRODUCTS[i % len(PRODUCTS)]} number {i}.",
+            "metadata": {"keywords": []}
+        }
+        for i in range(pages)
+    ]
+    return CorpusSnapshot(items)
+
+
+def test_vector_mode_without_index_falls_back_to_bm25(tmp_path):
+    snapshot = make_snapshot(6)
+    retriever = HybridRetriever(FixedStore(snapshot), lambda text: [1.0, 0.0], data_dir=tmp_path)
+
+    passages = asyncio.run(retriever.retrieve_passages("nescafe coffee", mode="vector"))
+
+    assert passages
+    assert [p for p, _ in passages] == [p for p, _ in snapshot.bm25.top_k("nescafe coffee", 5)]
+
+
+def test_dense_candidates_go_past_index_default(tmp_path):
+    snapshot = make_snapshot(30)
+    index = LocalVectorSearchService(tmp_path)
+    index.build([
+        {"id": str(i), "url": f"https://x/{i}", "chunk_index": 0, "vectorField": [1.0, i / 30]}
+        for i in range(30)
+    ])
+    index.save()
+    retriever = HybridRetriever(FixedStore(snapshot), lambda text: [1.0, 0.0], data_dir=tmp_path, candidates=25)
+
+    passages = asyncio.run(retriever.retrieve_passages("anything", mode="vector", k=30))
+
+    assert index.top_k == 10
+    assert len(passages) == 25
@@ -0,0 +1,108 @@
+import pytest
+
+import indexer_service
+from scraper import ScrapedPage
+from vector_store import LocalVectorSearchService
+
+PAGES = [
+    ScrapedPage(url=f"https://x/{name}", title=name, content=f"{name} is a Nestlé product sold across Canada.",
+                links=[], images=[], metadata={"keywords": [name]})
+    for name in ("aero", "kitkat", "smarties")
+]
+
+
+class FailingSearchService:
+    def create_search_index(self, dimensions):
+        raise ConnectionError("Azure Search unreachable")
+
+
+@pytest.fixture
+def indexer(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexer_service, "INDEXED_STATE_PATH", tmp_path / "indexed_state.json")
+    monkeypatch.setattr(indexer_service, "iter_scraped_content", lambda: iter(PAGES))
+    monkeypatch.setattr(indexer_service, "generate_embeddings_batch", lambda texts, progress=None: [[1.0, float(i)] for i, _ in enumerate(texts)])
+    monkeypatch.setattr(indexer_service, "LocalVectorSearchService", lambda: LocalVectorSearchService(tmp_path))
+    monkeypatch.setattr(indexer_service, "CONTENT_CLEANING_ENABLED", False)
+    return tmp_path
+
+
+def test_local_index_is_built_without_azure(indexer, monkeypatch):
+    monkeypatch.setattr(indexer_service, "AZURE_SEARCH_CONFIGURED", False)
+    monkeypatch.setattr(indexer_service, "get_search_service", lambda: pytest.fail("Azure Search must not be used"))
+
+    result = indexer_service.index_scraped_content(full=True)
+
+    assert result["indexed"] == 3
+    assert LocalVectorSearchService.from_disk(indexer).index.ntotal == 3
+    assert (indexer / "indexed_state.json").exists()
+
+
+def test_local_index_is_saved_when_azure_fails(indexer, monkeypatch):
+    monkeypatch.setattr(indexer_service, "AZURE_SEARCH_CONFIGURED", True)
+    monkeypatch.setattr(indexer_service, "get_search_service", FailingSearchService)
+
+    with pytest.raises(ConnectionError):
+        indexer_service.index_scraped_content(full=True)
+
+    assert LocalVectorSearchService.from_disk(indexer).index.ntotal == 3
+    # Not recorded as indexed, so the next run sends the pages to Azure again
+    assert not (indexer / "indexed_state.json").exists()
+
+
+def test_boilerplate_shift_does_not_reembed_unchanged_pages(indexer, monkeypatch):
+    footer = "Shop the Nestlé Canada store for recipes, coupons and brand news."
+    branded = [ScrapedPage(url=p.url, title=p.title, content=f"{p.content} {footer}", links=[], images=[],
+                           metadata=p.metadata) for p in PAGES]
+    embedded = []
+
+    def embed(texts, progress=None):
+        embedded.extend(texts)
+        return [[1.0, float(i)] for i, _ in enumerate(texts)]
+
+    monkeypatch.setattr(indexer_service, "AZURE_SEARCH_CONFIGURED", False)
+    monkeypatch.setattr(indexer_service, "CONTENT_CLEANING_ENABLED", True)
+    monkeypatch.setattr(indexer_service, "generate_embeddings_batch", embed)
+    monkeypatch.setattr(indexer_service, "iter_scraped_content", lambda: iter(branded))
+    indexer_service.index_scraped_content()
+    assert embedded and not any("coupons" in text for text in embedded)
+
+    # Enough new pages without the footer that it is no longer boilerplate
+    recipes = [ScrapedPage(url=f"https://x/recipe-{i}", title=f"Recipe {i}", content=f"Recipe {i} needs {i} cups of flour.",
+                           links=[], images=[], metadata={}) for i in range(8)]
+    monkeypatch.setattr(indexer_service, "iter_scraped_content", lambda: iter(branded + recipes))
+    embedded.clear()
+    result = indexer_service.index_scraped_content()
+
+    assert result["indexed"] == len(recipes)
+    assert all("Recipe" in text for text in embedded)
+
+
+def test_local_index_is_updated_per_chunk(indexer, monkeypatch):
+    directions = {"aero": [1.0, 0.0], "kitkat": [0.0, 1.0], "smarties": [-1.0, 0.0]}
+
+    def embed(texts, progress=None):
+        return [next(v for name, v in directions.items() if name in text.lower()) for text in texts]
+
+    upserted = []
+    upsert = LocalVectorSearchService.upsert
+    monkeypatch.setattr(LocalVectorSearchService, "upsert",
+                        lambda self, documents, removed_ids=(): upserted.append(len(documents)) or upsert(self, documents, removed_ids))
+    monkeypatch.setattr(indexer_service, "AZURE_SEARCH_CONFIGURED", False)
+    monkeypatch.setattr(indexer_service, "INDEX_CHUNK_SIZE", 1)
+    monkeypatch.setattr(indexer_service, "generate_embeddings_batch", embed)
+    indexer_service.index_scraped_content(full=True)
+    assert upserted == [1, 1, 1]
+
+    # A changed page replaces its own vectors; the others keep theirs
+    changed = [p if p.title != "kitkat" else ScrapedPage(url=p.url, title=p.title, content="KitKat: have a break.",
+                                                         links=[], images=[], metadata=p.metadata) for p in PAGES]
+    monkeypatch.setattr(indexer_service, "iter_scraped_content", lambda: iter(changed))
+    result = indexer_service.index_scraped_content()
+
+    index = LocalVectorSearchService.from_disk(indexer)
+    assert result["indexed"] == 1
+    assert index.index.ntotal == len(index.documents) == 3
+    for name, vector in directions.items():
+        _, top = index.vector_hits(vector, top_k=1)[0]
+        assert top["url"] == f"https://x/{name}"
+    assert index.vector_hits(directions["kitkat"], top_k=1)[0][1]["content"] == "KitKat: have a break."
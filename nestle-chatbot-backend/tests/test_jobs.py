@@ -0,0 +1,42 @@
+import time
+import asyncio
+import threading
+
+from jobs import JobManager, CANCELLED, SUCCEEDED
+
+
+def test_cancelled_job_keeps_its_slot_until_the_thread_returns():
+    events = []
+    entered = threading.Event()
+
+    def blocking_stage(report):
+        entered.set()
+        try:
+            for step in range(20):
+                time.sleep(0.05)
+                report(step=step)  # Raises JobCancelled once cancellation is requested
+        finally:
+            events.append("thread returned")
+
+    async def first(job):
+        await job.run_blocking(blocking_stage, job.report)
+
+    async def second(job):
+        events.append("second started")
+        return "done"
+
+    async def scenario():
+        manager = JobManager(concurrency=1)
+        first_job = manager.submit("index", first)
+        await asyncio.to_thread(entered.wait, 5)
+        manager.cancel(first_job.id)
+        second_job = manager.submit("index", second)
+        await asyncio.gather(first_job.task, second_job.task)
+        return first_job, second_job
+
+    first_job, second_job = asyncio.run(scenario())
+
+    assert first_job.status == CANCELLED
+    assert second_job.status == SUCCEEDED
+    assert events == ["thread returned", "second started"]
+    assert first_job.progress["step"] < 19
@@ -0,0 +1,38 @@
+import json
+import time
+import threading
+
+import knowledge_store
+from knowledge_store import KnowledgeStore
+
+
+def write_corpus(path, title):
+    path.write_text(json.dumps([{"url": "https://x/a", "title": title, "content": f"{title} chocolate wafer bar"}]))
+
+
+def test_snapshot_does_not_wait_for_reload(tmp_path, monkeypatch):
+    path = tmp_path / "scraped_content_1.json"
+    write_corpus(path, "KitKat")
+    store = KnowledgeStore(str(path), check_interval=0)
+    store.refresh(force=True)
+    old = store.snapshot()
+
+    release = threading.Event()
+    build = knowledge_store.CorpusSnapshot
+
+    def slow_snapshot(*args, **kwargs):
+        release.wait(5)
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(knowledge_store, "CorpusSnapshot", slow_snapshot)
+    write_corpus(path, "Aero")
+
+    started = time.perf_counter()
+    assert store.snapshot() is old
+    assert time.perf_counter() - started < 0.5
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while store.snapshot() is old and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.snapshot().items[0]["title"] == "Aero"
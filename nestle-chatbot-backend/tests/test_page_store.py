@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import page_store
+from page_store import write_pages, iter_pages, get_page, latest_crawl
+
+PAGES = [
+    {"url": f"https://x/{i}", "title": f"Product {i}", "content": f"Nestlé product {i} " * (i + 1), "metadata": {}}
+    for i in range(20)
+]
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_sharded_round_trip(tmp_path, compression):
+    if compression == "zstd" and page_store.zstandard is None:
+        pytest.skip("zstandard is not installed")
+
+    manifest_path = write_pages(PAGES, tmp_path, 1700000000, compression=compression, shard_bytes=1024)
+    manifest = json.loads(manifest_path.read_text())
+
+    assert len(manifest["shards"]) > 1
+    assert manifest["pageCount"] == len(PAGES)
+    assert list(iter_pages(manifest_path)) == PAGES
+    for page in PAGES:
+        assert get_page(manifest_path, page["url"]) == page
+    assert get_page(manifest_path, "https://x/missing") is None
+
+
+def test_latest_crawl_and_legacy_json(tmp_path):
+    legacy = tmp_path / "scraped_content_1700000100.json"
+    legacy.write_text(json.dumps(PAGES[:3]), encoding="utf-8")
+    write_pages(PAGES, tmp_path, 1700000000, compression="none")
+    (tmp_path / "scraped_content_notes.json").write_text("[]")
+
+    # Newest timestamp wins, whatever its format
+    assert latest_crawl(tmp_path) == legacy
+    assert list(iter_pages(legacy)) == PAGES[:3]
+    assert get_page(legacy, "https://x/1") == PAGES[1]
+    assert get_page(legacy, "https://x/5") is None
+
+    # For one timestamp the manifest is preferred over the legacy file
+    same_time = write_pages(PAGES[3:], tmp_path, 1700000100, compression="gzip")
+    assert latest_crawl(tmp_path) == same_time
+    assert latest_crawl(tmp_path / "empty") is None
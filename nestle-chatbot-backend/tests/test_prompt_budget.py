@@ -0,0 +1,54 @@
+from prompt_budget import assemble_messages, message_tokens, count_tokens
+
+SYSTEM_PROMPT = "You are a helpful assistant for Nestlé Canada."
+QUESTION = "Which KitKat is vegan?"
+HISTORY = [
+    message
+    for i in range(10)
+    for message in (
+        {"role": "user", "content": f"Question {i} about KitKat flavours? Please list them all."},
+        {"role": "assistant", "content": " ".join(["KitKat comes in many flavours."] * 8)},
+    )
+]
+FACTS = [f"Fact {i}: " + "Aero bars are made with bubbly milk chocolate in Canada. " * 6 for i in range(6)]
+
+
+def test_facts_and_history_are_trimmed_to_the_budget():
+    messages, stats = assemble_messages(SYSTEM_PROMPT, HISTORY, QUESTION, FACTS, budget=400)
+
+    assert stats["total"] == sum(message_tokens(m) for m in messages) <= 400
+    assert stats["dropped_facts"] > 0 and stats["dropped_history"] > 0
+    # Facts are kept best first
+    kept_facts = messages[-1]["content"].split("\n\nQuestion: ")[0]
+    assert "Fact 0:" in kept_facts and f"Fact {len(FACTS) - 1}:" not in kept_facts
+    assert messages[0]["content"] == SYSTEM_PROMPT
+    assert messages[-1]["content"].endswith(f"Question: {QUESTION}")
+
+
+def test_newest_turns_are_kept_and_dropped_ones_summarized():
+    messages, stats = assemble_messages(SYSTEM_PROMPT, HISTORY, QUESTION, FACTS, budget=400)
+
+    summary, history = messages[1], messages[2:-1]
+    assert history == HISTORY[stats["dropped_history"]:]
+    assert history[0]["role"] == "user"
+    assert summary["role"] == "system"
+    assert summary["content"].startswith("Earlier in this conversation the user asked: Question 0 about KitKat flavours?")
+    # Only the first sentence of each dropped question
+    assert "Please list them all" not in summary["content"]
+
+
+def test_everything_is_sent_when_it_fits():
+    messages, stats = assemble_messages(SYSTEM_PROMPT, HISTORY[:4], QUESTION, FACTS[:2], budget=3000)
+
+    assert messages[1:-1] == HISTORY[:4]
+    assert stats["dropped_history"] == stats["dropped_facts"] == 0
+    assert not stats["truncated_fact"]
+    assert stats["facts"] == count_tokens(messages[-1]["content"].replace(QUESTION, ""))
+
+
+def test_history_gets_the_budget_facts_leave_unused():
+    _, with_facts = assemble_messages(SYSTEM_PROMPT, HISTORY, QUESTION, FACTS, budget=400)
+    _, without_facts = assemble_messages(SYSTEM_PROMPT, HISTORY, QUESTION, [], budget=400)
+
+    assert without_facts["dropped_history"] < with_facts["dropped_history"]
+    assert without_facts["total"] <= 400
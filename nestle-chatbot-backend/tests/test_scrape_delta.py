@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+import scraper
+from scraper import ScrapedPage, ScrapeManifest, HostRateLimiter, PageGone, compute_delta, content_hash
+
+
+def make_page(url: str, content: str) -> ScrapedPage:
+    return ScrapedPage(url=url, title=url, content=content, links=[], images=[], metadata={})
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage()
+
+
+class FakePage:
+    async def close(self):
+        pass
+
+
+def crawl(urls, previous, outcomes, monkeypatch, manifest=None, progress=None):
+    """Runs one crawl worker over `urls`; `outcomes` maps URL -> exception to raise, or HTML."""
+    async def fake_fetch(page, url):
+        outcome = outcomes[url]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome, {}
+
+    monkeypatch.setattr(scraper, "_fetch_html", fake_fetch)
+    monkeypatch.setattr(scraper, "extract_page_data", lambda url, html: make_page(url, html).to_dict())
+
+    async def run():
+        queue = asyncio.Queue()
+        for item in enumerate(urls):
+            queue.put_nowait(item)
+        queue.put_nowait(None)
+        results, failed = {}, set()
+        await scraper._crawl_worker(
+            FakeContext(), queue, results, HostRateLimiter(0), manifest=manifest, previous=previous,
+            progress=progress, failed=failed
+        )
+        return [results[i] for i in sorted(results)], failed
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    manifest = ScrapeManifest(tmp_path / "manifest.json")
+    for page in (make_page("https://x/a", "alpha"), make_page("https://x/b", "beta"), make_page("https://x/c", "gamma")):
+        manifest.entries[page.url] = {"hash": content_hash(page), "etag": f'"{page.url}"'}
+    return manifest
+
+
+def test_failed_fetch_keeps_known_page(manifest, monkeypatch):
+    previous = {"https://x/a": make_page("https://x/a", "alpha"), "https://x/b": make_page("https://x/b", "beta")}
+    outcomes = {"https://x/a": "alpha", "https://x/b": asyncio.TimeoutError(), "https://x/c": PageGone("HTTP 404")}
+
+    pages, failed = crawl(list(outcomes), previous, outcomes, monkeypatch)
+    manifest.failed = failed
+    delta = manifest.apply(pages)
+
+    assert failed == {"https://x/b"}
+    assert [p.url for p in pages] == ["https://x/a", "https://x/b"]
+    assert "https://x/b" not in delta["removed"]
+    assert manifest.entries["https://x/b"]["etag"] == '"https://x/b"'
+    # A real 404 is still a removal
+    assert delta["removed"] == ["https://x/c"]
+    assert "https://x/c" not in manifest.entries
+
+
+def test_failed_url_without_previous_copy_is_not_removed(manifest):
+    pages = [make_page("https://x/a", "alpha"), make_page("https://x/c", "gamma")]
+    known = {url: entry["hash"] for url, entry in manifest.entries.items()}
+
+    delta = compute_delta(pages, known, failed={"https://x/b"})
+
+    assert delta["removed"] == []
+    assert delta["failed"] == ["https://x/b"]
+    # Without the failure the page is gone from the crawl frontier
+    assert compute_delta(pages, known)["removed"] == ["https://x/b"]
+
+
+def test_progress_advances_for_every_outcome(manifest, monkeypatch):
+    previous = {"https://x/a": make_page("https://x/a", "alpha"), "https://x/b": make_page("https://x/b", "beta")}
+    outcomes = {
+        "https://x/a": "unused",  # 304 Not Modified
+        "https://x/b": asyncio.TimeoutError(),
+        "https://x/c": PageGone("HTTP 410"),
+        "https://x/d": "delta",
+    }
+
+    async def not_modified(context, url, manifest):
+        return url == "https://x/a"
+
+    monkeypatch.setattr(scraper, "_not_modified", not_modified)
+    reported = []
+    crawl(list(outcomes), previous, outcomes, monkeypatch, manifest=manifest,
+          progress=lambda **counters: reported.append(counters["pages_crawled"]))
+
+    assert reported == [1, 2, 3, 4]
@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import openai_service
+
+QUESTION_VECTORS = {
+    "What is Aero?": [1.0, 0.0, 0.0],
+    "What is Kit Kat?": [0.0, 1.0, 0.0],
+    "Tell me more": [0.0, 0.0, 1.0],
+}
+
+
+class FakeCompletions:
+    """Chat completions that answer with the conversation's first question and count calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, messages, **kwargs):
+        self.calls += 1
+        first_question = next(m["content"] for m in messages if m["role"] == "user")
+        content = f"Answer {self.calls} about: {first_question}"
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5)
+        )
+
+
+@pytest.fixture
+def chat(monkeypatch):
+    completions = FakeCompletions()
+    monkeypatch.setattr(openai_service, "async_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    monkeypatch.setattr(main, "generate_embeddings", lambda text: QUESTION_VECTORS[text])
+    main.answer_cache.clear()
+
+    client = TestClient(main.app)
+
+    def ask(session_id, message):
+        response = client.post("/chat", json={"message": message, "session_id": session_id})
+        assert response.status_code == 200
+        return response.json()["response"]
+
+    yield ask, completions
+    for session_id in ("cache-a", "cache-b", "cache-c", "cache-d"):
+        asyncio.run(openai_service.get_session_history(session_id)).clear_history()
+
+
+def test_follow_up_is_not_served_across_sessions(chat):
+    ask, completions = chat
+    ask("cache-a", "What is Aero?")
+    follow_up_a = ask("cache-a", "Tell me more")
+    ask("cache-b", "What is Kit Kat?")
+    follow_up_b = ask("cache-b", "Tell me more")
+
+    # Same question, different conversations: both follow-ups went to the model
+    assert completions.calls == 4
+    assert "Aero" in follow_up_a
+    assert "Kit Kat" in follow_up_b
+
+
+def test_first_question_is_shared_across_sessions(chat):
+    ask, completions = chat
+    first = ask("cache-c", "What is Aero?")
+    second = ask("cache-d", "What is Aero?")
+
+    assert completions.calls == 1
+    assert second == first
@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from hybrid_retriever import HybridRetriever
+from query_cache import bump_index_generation
+from vector_store import LocalVectorSearchService
+
+
+class BlockingIndex:
+    """Wraps a FAISS index; `search` waits until released, to hold a query in flight."""
+
+    def __init__(self, index):
+        self.index = index
+        self.ntotal = index.ntotal
+        self.d = index.d
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def search(self, query, k):
+        self.started.set()
+        self.release.wait(5)
+        return self.index.search(query, k)
+
+
+def build_index(data_dir, prefix, count):
+    service = LocalVectorSearchService(data_dir)
+    service.build([
+        {"id": f"{prefix}{i}", "url": f"https://x/{prefix}/{i}", "chunk_index": 0, "vectorField": [1.0, i / count]}
+        for i in range(count)
+    ])
+    service.save()
+
+
+def test_reload_does_not_change_index_under_running_search(tmp_path):
+    build_index(tmp_path, "old", 3)
+    retriever = HybridRetriever(None, lambda text: [1.0, 0.0], data_dir=tmp_path)
+    old = retriever.vector_index()
+    blocking = old.index = BlockingIndex(old.index)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        in_flight = pool.submit(old.vector_hits, [1.0, 0.0])
+        assert blocking.started.wait(5)
+
+        # Indexing finishes in another worker while the query is running
+        build_index(tmp_path, "new", 30)
+        bump_index_generation()
+        new = retriever.vector_index()
+
+        blocking.release.set()
+        hits = in_flight.result(timeout=5)
+
+    assert new is not old
+    assert new.index.ntotal == 30
+    assert len(hits) == 3
+    assert all(doc["id"].startswith("old") for _, doc in hits)
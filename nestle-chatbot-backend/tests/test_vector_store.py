@@ -0,0 +1,33 @@
+from vector_store import LocalVectorSearchService
+
+
+def make_doc(i, content, category="Chocolate"):
+    return {"id": f"page{i}", "url": f"https://x/{i}", "title": f"Product {i}", "content": content,
+            "category": category, "keywords": [], "vectorField": [1.0, float(i)]}
+
+
+def test_keyword_hits_rank_with_bm25(tmp_path):
+    service = LocalVectorSearchService(tmp_path, top_k=2)
+    service.build([
+        make_doc(0, "wafer wafer wafer chocolate"),
+        make_doc(1, "chocolate bar"),
+        make_doc(2, "wafer biscuit", category="Biscuits"),
+        make_doc(3, "milk chocolate"),
+    ])
+    service.save()
+    service = LocalVectorSearchService.from_disk(tmp_path)
+
+    assert [doc["id"] for _, doc in service.keyword_hits("wafer")] == ["page0", "page2"]
+    # The filter is applied before the top_k cut
+    assert [doc["id"] for _, doc in service.keyword_hits("wafer", "category eq 'Biscuits'")] == ["page2"]
+    assert service.keyword_hits("the and of") == []
+
+
+def test_keyword_index_follows_upserts(tmp_path):
+    service = LocalVectorSearchService(tmp_path)
+    service.build([make_doc(0, "kitkat wafer"), make_doc(1, "aero bubbles")])
+
+    service.upsert([make_doc(1, "smarties candy")], removed_ids=["page0"])
+
+    assert service.keyword_hits("wafer") == []
+    assert [doc["content"] for _, doc in service.keyword_hits("smarties")] == ["smarties candy"]
@@ -0,0 +1,297 @@
+"""
+Local FAISS-backed vector search engine.
+
+Builds an in-process kNN index from the documents produced by
+`indexer_service.prepare_search_documents` and exposes the same
+search_documents / vector_search / hybrid_search interface as
+`search_service.AzureSearchService`, so `/search` can be served without
+a network round trip to Azure.
+"""
+
+import os
+import re
+import json
+import logging
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+from bm25_index import BM25Index
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(os.getenv("VECTOR_INDEX_DIR", "./Scraped/"))
+INDEX_FILE = "vector_index.faiss"
+DOCS_FILE = "vector_docs.json"
+
+# Fields returned to callers, mirroring the Azure "select" clause
+SELECT_FIELDS = [
+    "id", "parent_id", "url", "title", "content", "chunk_index", "chunk_start", "chunk_end",
+    "category", "keywords", "description"
+]
+SEARCH_FIELDS = ["title", "content", "description", "keywords"]
+
+# Simple OData-style "field eq 'value'" clauses joined by "and"
+FILTER_CLAUSE = re.compile(r"(\w+)\s+eq\s+'((?:[^']|'')*)'", re.IGNORECASE)
+
+# Rank damping constant of reciprocal rank fusion
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+
+def reciprocal_rank_fusion(rankings: List[List[Any]], rrf_k: int = RRF_K) -> List[tuple]:
+    """
+    Fuses ranked lists of keys: each key scores the sum of 1 / (rrf_k + rank) over the lists it appears in.
+
+    Returns:
+        List[tuple]: (key, fused score) pairs, best first.
+    """
+    fused: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+
+class LocalVectorSearchService:
+    """
+    In-process replacement for AzureSearchService backed by a FAISS
+    inner-product index over L2-normalized vectors (i.e. cosine similarity).
+    """
+
+    def __init__(self, data_dir: Path = DATA_DIR, top_k: int = 10):
+        self.data_dir = Path(data_dir)
+        self.top_k = top_k
+        self.index: Optional[faiss.Index] = None
+        self.documents: List[Dict[str, Any]] = []
+        # Keyword index over the document table; rebuilt on build/load, dropped by add/upsert
+        self.bm25: Optional[BM25Index] = None
+
+    @property
+    def index_path(self) -> Path:
+        return self.data_dir / INDEX_FILE
+
+    @property
+    def docs_path(self) -> Path:
+        return self.data_dir / DOCS_FILE
+
+    def build(self, documents: List[Dict[str, Any]]) -> int:
+        """
+        Builds the FAISS index from prepared search documents.
+
+        Args:
+            documents (List[Dict]): Documents carrying a `vectorField` embedding.
+
+        Returns:
+            int: Number of documents added to the index.
+        """
+        self.index = None
+        self.documents = []
+        count = self.add(documents)
+        if not count:
+            logger.warning("No vectors available to build the local index")
+            return 0
+        self.bm25 = self._build_keyword_index()
+
+        logger.info(f"✅ Built local vector index with {count} documents (dim={self.index.d})")
+        return count
+
+    def add(self, documents: List[Dict[str, Any]]) -> int:
+        """
+        Appends prepared search documents to the index, creating it on first use.
+        Only the float32 vectors and the selected fields are kept, so callers can
+        add one batch at a time instead of holding every embedding in memory.
+
+        Returns:
+            int: Number of documents added.
+        """
+        vectors = []
+        kept = []
+        for doc in documents:
+            vector = doc.get("vectorField") or []
+            if not vector:
+                logger.warning(f"Skipping document without embedding: {doc.get('id', 'unknown')}")
+                continue
+            vectors.append(vector)
+            kept.append({field: doc.get(field) for field in SELECT_FIELDS})
+
+        if not vectors:
+            return 0
+
+        matrix = np.asarray(vectors, dtype="float32")
+        faiss.normalize_L2(matrix)
+
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(matrix.shape[1])
+        self.index.add(matrix)
+        self.documents.extend(kept)
+        self.bm25 = None
+        return len(kept)
+
+    def upsert(self, documents: List[Dict[str, Any]], removed_ids: List[str] = ()) -> int:
+        """
+        Replaces documents in place: every chunk of a page in `documents` or
+        `removed_ids` (parent page ids) is dropped from the index, then the new
+        documents are appended. Replacement is per parent page, so every chunk of
+        a changed page is swapped out together. Call `load` first to update the
+        persisted index.
+
+        Returns:
+            int: Number of documents in the index.
+        """
+        replaced = {doc.get("parent_id") or doc.get("id") for doc in documents} | set(removed_ids)
+        if self.index is not None and self.index.ntotal and replaced:
+            positions = [
+                i for i, doc in enumerate(self.documents) if (doc.get("parent_id") or doc.get("id")) in replaced
+            ]
+            if positions:
+                # Flat indexes renumber the remaining vectors, keeping them aligned with the document table
+                self.index.remove_ids(np.asarray(positions, dtype="int64"))
+                dropped = set(positions)
+                self.documents = [doc for i, doc in enumerate(self.documents) if i not in dropped]
+                self.bm25 = None
+
+        self.add(documents)
+        return len(self.documents)
+
+    def save(self) -> None:
+        """Persists the index and its document table next to the scraped content."""
+        if self.index is None:
+            raise Exception("Local vector index has not been built")
+
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(self.index, str(self.index_path))
+        with open(self.docs_path, "w", encoding="utf-8") as f:
+            json.dump(self.documents, f)
+        logger.info(f"🗂️ Local vector index saved to {self.index_path}")
+
+    def load(self) -> bool:
+        """
+        Loads a persisted index into memory. (FAISS only memory-maps the inverted
+        lists of IVF indexes; a flat index is always read in full.)
+
+        Returns:
+            bool: True if an index was loaded.
+        """
+        if not self.index_path.exists() or not self.docs_path.exists():
+            logger.warning(f"No local vector index found in {self.data_dir}")
+            return False
+
+        self.index = faiss.read_index(str(self.index_path))
+
+        with open(self.docs_path, "r", encoding="utf-8") as f:
+            self.documents = json.load(f)
+        self.bm25 = self._build_keyword_index()
+
+        logger.info(f"✅ Loaded local vector index with {len(self.documents)} documents")
+        return True
+
+    @classmethod
+    def from_disk(cls, data_dir: Path = DATA_DIR) -> "LocalVectorSearchService":
+        """Creates a service and loads the persisted index, if any."""
+        service = cls(data_dir)
+        service.load()
+        return service
+
+    def _matches_filter(self, doc: Dict[str, Any], filter_expr: Optional[str]) -> bool:
+        """Evaluates a minimal subset of OData filters ("field eq 'value'" joined by "and")."""
+        if not filter_expr:
+            return True
+
+        for field, value in FILTER_CLAUSE.findall(filter_expr):
+            value = value.replace("''", "'")
+            field_value = doc.get(field)
+            if isinstance(field_value, list):
+                if value not in field_value:
+                    return False
+            elif field_value != value:
+                return False
+        return True
+
+    def format_results(self, hits: List[tuple]) -> Dict[str, Any]:
+        """Shapes (score, doc) pairs like an Azure Search response body."""
+        return {
+            "@odata.count": len(hits),
+            "value": [{"@search.score": float(score), **doc} for score, doc in hits]
+        }
+
+    def _build_keyword_index(self) -> BM25Index:
+        """BM25 index over the searchable fields of the document table, by position."""
+        return BM25Index([
+            " ".join(
+                " ".join(doc.get(field) or []) if field == "keywords" else (doc.get(field) or "")
+                for field in SEARCH_FIELDS
+            )
+            for doc in self.documents
+        ])
+
+    def keyword_hits(self, query: str, filter_expr: Optional[str] = None) -> List[tuple]:
+        """Ranks documents by BM25 over the searchable fields, over-fetching when a filter is applied."""
+        bm25 = self.bm25
+        if bm25 is None:
+            bm25 = self.bm25 = self._build_keyword_index()
+
+        scores = bm25.score(query)
+        k = bm25.doc_count if filter_expr else self.top_k
+        hits = []
+        for idx, score in bm25.rank(scores, k):
+            doc = self.documents[idx]
+            if self._matches_filter(doc, filter_expr):
+                hits.append((score, doc))
+            if len(hits) >= self.top_k:
+                break
+        return hits
+
+    def vector_hits(self, vector: List[float], filter_expr: Optional[str] = None,
+                     top_k: Optional[int] = None) -> List[tuple]:
+        """
+        Runs kNN against the FAISS index, over-fetching when a filter is applied.
+        `top_k` overrides the service's result count (e.g. to feed a fusion stage).
+        """
+        top_k = top_k or self.top_k
+        if self.index is None or self.index.ntotal == 0 or not vector:
+            return []
+        if len(vector) != self.index.d:
+            # Index built with another embedding backend; it needs a full re-index
+            logger.warning(f"Query vector has {len(vector)} dimensions, local index has {self.index.d}")
+            return []
+
+        query = np.asarray([vector], dtype="float32")
+        faiss.normalize_L2(query)
+
+        k = self.index.ntotal if filter_expr else min(top_k, self.index.ntotal)
+        scores, ids = self.index.search(query, k)
+
+        hits = []
+        for score, idx in zip(scores[0], ids[0]):
+            if idx < 0:
+                continue
+            doc = self.documents[idx]
+            if self._matches_filter(doc, filter_expr):
+                hits.append((score, doc))
+            if len(hits) >= top_k:
+                break
+        return hits
+
+    def search_documents(self, query: str, filter_expr: Optional[str] = None) -> Dict[str, Any]:
+        """Search for documents by keyword"""
+        return self.format_results(self.keyword_hits(query, filter_expr))
+
+    def vector_search(self, vector: List[float], filter_expr: Optional[str] = None) -> Dict[str, Any]:
+        """Search using vector similarity"""
+        return self.format_results(self.vector_hits(vector, filter_expr))
+
+    def hybrid_search(self, query: str, vector: List[float], filter_expr: Optional[str] = None, rrf_k: int = RRF_K) -> Dict[str, Any]:
+        """Combine keyword and vector search with reciprocal rank fusion"""
+        return self.fuse_hits([self.keyword_hits(query, filter_expr), self.vector_hits(vector, filter_expr)], rrf_k)
+
+    def fuse_hits(self, hit_lists: List[List[tuple]], rrf_k: int = RRF_K) -> Dict[str, Any]:
+        """Fuses ranked (score, doc) lists with reciprocal rank fusion into a search response"""
+        docs = {doc["id"]: doc for hits in hit_lists for _, doc in hits}
+        ranked = reciprocal_rank_fusion([[doc["id"] for _, doc in hits] for hits in hit_lists], rrf_k)
+        return self.format_results([(score, docs[doc_id]) for doc_id, score in ranked[:self.top_k]])
@@ -8,6 +8,8 @@ const Chatbot = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [isFirstApiCall, setIsFirstApiCall] = useState(true);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  // Per-tab conversation id so the backend keeps a separate history for each user
+  const sessionId = useRef(crypto.randomUUID());
 
   // When chat opens, add welcome message once
   useEffect(() => {
@@ -61,7 +63,7 @@ const Chatbot = () => {
       const response = await fetch(`https://nestle-th3j.onrender.com/chat`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: input }),
+        body: JSON.stringify({ message: input, session_id: sessionId.current }),
       });
       
       const data = await response.json();